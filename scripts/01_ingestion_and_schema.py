@@ -13,11 +13,27 @@ IMPORTANT: This script does NOT modify raw data files.
 
 import pandas as pd
 import numpy as np
+import glob
+import inspect
 import re
 import os
+import time
 from datetime import datetime
 from typing import Dict, List, Tuple, Any, Optional
 
+from ledger_io import (
+    STREAM_MEMORY_LIMIT_MB, HEADER_SCAN_ROWS, open_sheet_stream, iter_data_chunks, chunk_rows_for_budget,
+    sheet_content_hashes, definition_fingerprint, sheet_cache_key, load_cached_sheet, save_cached_sheet,
+    load_schema_registry, save_schema_registry, load_manifest, save_manifest, manifest_changes,
+    write_csv_if_changed, DEFAULT_READER, READER_BACKENDS, resolve_reader, open_workbook,
+    read_raw_sheet
+)
+from pipeline_log import PipelineLog, buffered_console
+from column_profile import (
+    new_column_profile, profile_frame, merge_column_profiles, merge_dtypes, update_column_profile,
+    null_rate_report, dtype_report, numeric_pattern_report
+)
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -27,6 +43,18 @@ CENTRAL_FINANCE_FILE = "data/Central Finance Roles.xlsx"
 QC_OUTPUT_DIR = "outputs/qc"
 ASSUMPTIONS_FILE = "notes/assumptions.md"
 
+# Header detection: rows considered as header candidates, and the values
+# that mark a leading row as metadata rather than a header
+HEADER_CANDIDATE_ROWS = 5
+HEADER_METADATA_MARKERS = ["IN USD", "Maintenance", "Perpetual"]
+
+# Columns expected to hold numbers; their non-numeric values are classified
+# in 06_numeric_pattern_summary.csv
+NUMERIC_PATTERN_COLUMNS = ["2018_total", "benchmark", "hourly_rate_usd", "annual_salary_usd"]
+
+# Timed events of each run (outputs/logs/phase_1.jsonl)
+PIPELINE_LOG = PipelineLog("phase_1")
+
 # =============================================================================
 # UTILITY FUNCTIONS
 # =============================================================================
@@ -67,84 +95,181 @@ def to_snake_case(name: str) -> str:
     return name if name else "unnamed"
 
 
-def is_likely_header_row(row: pd.Series, total_cols: int) -> bool:
+def _number_mask(block: np.ndarray) -> np.ndarray:
     """
-    Determine if a row is likely a header row based on heuristics.
+    Cells of an object block holding a number (not text that parses as
+    one), in array passes over the flattened block: cells pd.to_numeric
+    can parse, less text cells (those equal to their own str()).
+    """
+    cells = block.ravel()
+    parsed = ~pd.isna(pd.to_numeric(cells, errors="coerce"))
+    values = parsed & ~pd.isna(cells)
+    text = np.zeros(len(cells), dtype=bool)
+    text[values] = cells[values].astype(str) == cells[values]
+    return (parsed & ~text).reshape(block.shape)
+
+
+def _marker_mask(block: np.ndarray, cells: np.ndarray) -> np.ndarray:
+    """Cells (of those selected by the `cells` mask) whose stripped text is a metadata marker."""
+    markers = np.zeros(block.shape, dtype=bool)
+    if cells.any():
+        markers[cells] = np.isin(np.char.strip(block[cells].astype(str)), HEADER_METADATA_MARKERS)
+    return markers
+
+
+def header_row_masks(block: np.ndarray, total_cols: int) -> Dict[str, np.ndarray]:
+    """
+    Classify every row of a small object block (the leading rows of a sheet)
+    with NumPy masks.
 
     A header row typically:
     - Has mostly non-null values
     - Contains mostly string values
     - Does not contain metadata markers like "IN USD"
     - Has values that look like column names (not pure numbers)
+
+    Returns:
+        Dict of per-row arrays: non_null_count, numeric_count, likely_header
     """
-    non_null_count = row.notna().sum()
+    not_null = ~pd.isna(block)
+    numeric = _number_mask(block) & not_null
+
+    non_null_count = not_null.sum(axis=1)
+    numeric_count = numeric.sum(axis=1)
+    string_count = non_null_count - numeric_count
 
     # Must have at least 50% non-null values
-    if non_null_count < total_cols * 0.5:
-        return False
+    enough_values = non_null_count >= total_cols * 0.5
 
-    non_null_values = row.dropna()
+    # At least 50% of the non-null values should be string-like
+    mostly_strings = string_count >= non_null_count * 0.5
+
+    # Metadata markers among the first 3 non-null values indicate non-header rows
+    first_three = not_null & (np.cumsum(not_null, axis=1) <= 3)
+    has_marker = _marker_mask(block, first_three).any(axis=1)
+
+    return {
+        "non_null_count": non_null_count,
+        "numeric_count": numeric_count,
+        "likely_header": enough_values & mostly_strings & ~has_marker
+    }
 
-    # Check if most values are strings (not numbers)
-    string_count = sum(1 for v in non_null_values if isinstance(v, str) or
-                       (not pd.isna(v) and not isinstance(v, (int, float))))
 
-    # At least 50% should be string-like
-    if string_count < len(non_null_values) * 0.5:
-        return False
+def is_likely_header_row(row: pd.Series, total_cols: int) -> bool:
+    """
+    Determine if a row is likely a header row based on heuristics.
+
+    See header_row_masks() for the rules; this is the single-row form.
+    """
+    block = row.to_numpy(dtype=object).reshape(1, -1)
+    return bool(header_row_masks(block, total_cols)["likely_header"][0])
 
-    # Check for metadata markers (these indicate non-header rows)
-    metadata_markers = ["IN USD", "Maintenance", "Perpetual"]
-    first_values = [str(v).strip() for v in non_null_values.head(3) if not pd.isna(v)]
 
-    for marker in metadata_markers:
-        if any(marker == v for v in first_values):
-            return False
+def header_block(df_raw: pd.DataFrame) -> np.ndarray:
+    """
+    The leading rows of a raw sheet that header detection looks at, as an
+    object block (header candidates plus the row after the last candidate).
 
-    return True
+    Row-wise extraction keeps each cell's scalar type exactly as a row of
+    df_raw presents it, which is what the numeric/string classification sees.
+    """
+    block_rows = min(HEADER_CANDIDATE_ROWS + 1, df_raw.shape[0])
+    block = np.empty((block_rows, df_raw.shape[1]), dtype=object)
+    for idx in range(block_rows):
+        block[idx] = df_raw.iloc[idx].to_numpy(dtype=object)
+    return block
 
 
 def detect_header_row(df_raw: pd.DataFrame, sheet_name: str) -> Tuple[int, List[str]]:
     """
     Programmatically detect the header row index for a given sheet.
 
+    Only the first HEADER_CANDIDATE_ROWS rows (plus the row after a match)
+    are inspected, so df_raw may be just the leading rows of the sheet
+    (see read_sheet_prefix).
+
     Returns:
         Tuple of (header_row_index, list_of_reasons)
     """
     reasons = []
     total_cols = df_raw.shape[1]
-    max_rows_to_check = min(5, df_raw.shape[0])
+    max_rows_to_check = min(HEADER_CANDIDATE_ROWS, df_raw.shape[0])
 
-    for idx in range(max_rows_to_check):
-        row = df_raw.iloc[idx]
+    block = header_block(df_raw)
+    masks = header_row_masks(block, total_cols)
+    candidates = np.flatnonzero(masks["likely_header"][:max_rows_to_check])
 
-        if is_likely_header_row(row, total_cols):
-            reasons.append(f"Row {idx} identified as header: contains {row.notna().sum()}/{total_cols} non-null values")
+    if len(candidates) > 0:
+        idx = int(candidates[0])
+        reasons.append(f"Row {idx} identified as header: contains {masks['non_null_count'][idx]}/{total_cols} non-null values")
 
-            # Additional check: ensure subsequent row has actual data (numbers or different pattern)
-            if idx + 1 < df_raw.shape[0]:
-                next_row = df_raw.iloc[idx + 1]
-                numeric_count = sum(1 for v in next_row if isinstance(v, (int, float)) and not pd.isna(v))
-                if numeric_count > 0:
-                    reasons.append(f"Confirmed: Row {idx + 1} contains {numeric_count} numeric values (data row)")
+        # Additional check: ensure subsequent row has actual data (numbers or different pattern)
+        if idx + 1 < block.shape[0]:
+            numeric_count = masks["numeric_count"][idx + 1]
+            if numeric_count > 0:
+                reasons.append(f"Confirmed: Row {idx + 1} contains {numeric_count} numeric values (data row)")
 
-            return idx, reasons
+        return idx, reasons
 
     # Fallback: assume row 0 is header
     reasons.append("Fallback: Using row 0 as header (no clear header detected)")
     return 0, reasons
 
 
-def normalize_dataframe(df_raw: pd.DataFrame, header_row: int, sheet_name: str) -> Tuple[pd.DataFrame, Dict]:
+def read_sheet_prefix(source: Any, sheet_name: str, nrows: int = HEADER_SCAN_ROWS) -> pd.DataFrame:
     """
-    Normalize a DataFrame by setting the correct header and converting column names to snake_case.
+    Read only the leading rows of a sheet (header=None), enough for detect_header_row().
+
+    Cells are kept as Python objects, as they appear in a full-sheet read for
+    any column that has a text header.
+    """
+    return read_raw_sheet(source, sheet_name, nrows=nrows, dtype=object)
+
+
+def detect_sheet_layout(source: Any, sheet_name: str) -> Dict[str, Any]:
+    """
+    Detect a sheet's header row and normalized column names from its prefix only.
 
     Returns:
-        Tuple of (normalized_df, metadata_dict)
+        Dict with keys: sheet_name, header_row, detection_reasons,
+        original_columns, normalized_columns
     """
-    # Extract original column names
-    original_columns = df_raw.iloc[header_row].tolist()
+    prefix = read_sheet_prefix(source, sheet_name)
+    header_row, reasons = detect_header_row(prefix, sheet_name)
+    original_columns = prefix.iloc[header_row].tolist() if len(prefix) > header_row else []
+
+    return {
+        "sheet_name": sheet_name,
+        "header_row": header_row,
+        "detection_reasons": reasons,
+        "original_columns": original_columns,
+        "normalized_columns": normalize_column_names(original_columns)
+    }
+
+
+def detect_layouts(workbooks: List[Tuple[str, str]], reader: str = DEFAULT_READER) -> pd.DataFrame:
+    """Prefix-only layout detection for every sheet of every workbook."""
+    records = []
+    for path, label in workbooks:
+        xl = open_workbook(path, reader)
+        for sheet_name in xl.sheet_names:
+            layout = detect_sheet_layout(xl, sheet_name)
+            records.append({
+                "file": label,
+                "sheet_name": sheet_name,
+                "detected_header_row": layout["header_row"],
+                "normalized_columns": ", ".join(layout["normalized_columns"])
+            })
+    return pd.DataFrame(records)
 
+
+def normalize_column_names(original_columns: List[Any]) -> List[str]:
+    """
+    Convert raw header cells to unique snake_case column names.
+
+    Duplicate names are made unique before and after snake_case conversion
+    by appending numeric suffixes.
+    """
     # Handle duplicate column names by making them unique
     seen = {}
     unique_original = []
@@ -171,6 +296,24 @@ def normalize_dataframe(df_raw: pd.DataFrame, header_row: int, sheet_name: str)
             seen_normalized[col] = 0
             final_columns.append(col)
 
+    return final_columns
+
+
+def normalize_dataframe(df_raw: pd.DataFrame, header_row: int, sheet_name: str,
+                        final_columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Normalize a DataFrame by setting the correct header and converting column names to snake_case.
+
+    final_columns may carry an already resolved column mapping (see resolve_layout).
+
+    Returns:
+        Tuple of (normalized_df, metadata_dict)
+    """
+    # Extract original column names
+    original_columns = df_raw.iloc[header_row].tolist()
+    if final_columns is None:
+        final_columns = normalize_column_names(original_columns)
+
     # Create normalized DataFrame (skip rows before and including header)
     df_normalized = df_raw.iloc[header_row + 1:].copy()
     df_normalized.columns = final_columns
@@ -189,92 +332,491 @@ def normalize_dataframe(df_raw: pd.DataFrame, header_row: int, sheet_name: str)
     return df_normalized, metadata
 
 
-def calculate_null_rates(df: pd.DataFrame) -> pd.DataFrame:
-    """Calculate null rates for each column in a DataFrame."""
-    total_rows = len(df)
-    null_counts = df.isnull().sum()
-    null_rates = (null_counts / total_rows * 100).round(2)
+# =============================================================================
+# SCHEMA REGISTRY
+# =============================================================================
+
+def _cell_classes(block: np.ndarray) -> np.ndarray:
+    """Class of every cell of a block: "." null, "#" number, "m" metadata marker, "s" other text."""
+    not_null = ~pd.isna(block)
+    numeric = _number_mask(block) & not_null
+    marker = _marker_mask(block, not_null & ~numeric)
+    return np.where(~not_null, ".", np.where(numeric, "#", np.where(marker, "m", "s")))
+
+
+def layout_fingerprint(df_raw: pd.DataFrame) -> str:
+    """
+    Fingerprint of a sheet's leading rows as header detection sees them.
+
+    Every cell of header_block() is reduced to its class (null, number,
+    metadata marker, other text), which together with the sheet width is
+    everything detect_header_row() decides on. Sheets with the same
+    fingerprint therefore always get the same header row.
+    """
+    block = header_block(df_raw)
+    rows = ["".join(row) for row in _cell_classes(block)] if block.size else []
+    return definition_fingerprint({"width": int(df_raw.shape[1]), "rows": rows})
+
+
+def column_signature(original_columns: List[Any]) -> str:
+    """Fingerprint of raw header cells, as normalize_column_names() reads them."""
+    return definition_fingerprint([None if pd.isna(col) else str(col) for col in original_columns])
+
+
+def resolve_layout(df_raw: pd.DataFrame, sheet_name: str, sheet_id: str,
+                   registry: Optional[Dict] = None) -> Dict[str, Any]:
+    """
+    Resolve a sheet's header row and column mapping, via the registry when possible.
+
+    Known layouts are a dictionary lookup on the layout fingerprint and column
+    signature. Unknown layouts, and sheets whose layout differs from the one
+    last registered for them (drifted), go through detect_header_row() and
+    normalize_column_names().
+
+    Args:
+        df_raw: raw sheet (header=None), or just its leading rows
+        sheet_id: stable id of the sheet across runs ("<file label>/<sheet name>")
+        registry: schema registry (see ledger_io.load_schema_registry); None
+                  disables lookups and always detects (fingerprints are
+                  still computed)
 
-    result = pd.DataFrame({
-        "column": df.columns,
-        "null_count": null_counts.values,
-        "total_rows": total_rows,
-        "null_rate_pct": null_rates.values
-    })
+    Returns:
+        Dict with keys: sheet_id, header_row, detection_reasons,
+        original_columns, normalized_columns, fingerprint, column_signature,
+        layout_status ("known", "new", "drifted"; None without a registry)
+    """
+    use_registry = registry is not None
+    if not use_registry:
+        registry = {"layouts": {}, "columns": {}, "sheets": {}}
 
-    return result
+    fingerprint = layout_fingerprint(df_raw)
+    previous = registry["sheets"].get(sheet_id)
+
+    known = registry["layouts"].get(fingerprint)
+    if known is not None and (previous is None or previous["fingerprint"] == fingerprint):
+        header_row, reasons = known["header_row"], list(known["detection_reasons"])
+    else:
+        header_row, reasons = detect_header_row(df_raw, sheet_name)
+
+    original_columns = df_raw.iloc[header_row].tolist()
+    signature = column_signature(original_columns)
+
+    normalized_columns = registry["columns"].get(signature)
+    drifted = previous is not None and previous != {"fingerprint": fingerprint, "column_signature": signature}
+    if normalized_columns is None or drifted:
+        normalized_columns = normalize_column_names(original_columns)
+
+    if not use_registry:
+        status = None
+    elif drifted:
+        status = "drifted"
+    elif known is not None and signature in registry["columns"]:
+        status = "known"
+    else:
+        status = "new"
+
+    return {
+        "sheet_id": sheet_id,
+        "header_row": header_row,
+        "detection_reasons": reasons,
+        "original_columns": original_columns,
+        "normalized_columns": list(normalized_columns),
+        "fingerprint": fingerprint,
+        "column_signature": signature,
+        "layout_status": status
+    }
+
+
+def register_layouts(registry: Dict, layouts: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Record resolved layouts in the registry (in place).
+
+    Returns:
+        Count of layouts per status
+    """
+    counts = {}
+    for layout in layouts:
+        registry["layouts"][layout["fingerprint"]] = {
+            "header_row": layout["header_row"],
+            "detection_reasons": layout["detection_reasons"]
+        }
+        registry["columns"][layout["column_signature"]] = layout["normalized_columns"]
+        registry["sheets"][layout["sheet_id"]] = {
+            "fingerprint": layout["fingerprint"],
+            "column_signature": layout["column_signature"]
+        }
+        counts[layout["layout_status"]] = counts.get(layout["layout_status"], 0) + 1
+    return counts
+
+
+def generate_layout_status_report(layouts: List[Dict[str, Any]]) -> pd.DataFrame:
+    """One row per sheet: how its layout was resolved, with drifted/new layouts flagged."""
+    records = []
+    for layout in layouts:
+        file_label, sheet_name = layout["sheet_id"].split("/", 1)
+        records.append({
+            "file": file_label,
+            "sheet_name": sheet_name,
+            "layout_status": layout["layout_status"],
+            "detected_header_row": layout["header_row"],
+            "layout_fingerprint": layout["fingerprint"][:12],
+            "column_signature": layout["column_signature"][:12],
+            "flag": "FLAG" if layout["layout_status"] in ("new", "drifted") else "PASS"
+        })
+    return pd.DataFrame(records)
 
 
 # =============================================================================
 # MAIN INGESTION LOGIC
 # =============================================================================
 
-def ingest_excel_file(file_path: str, file_label: str) -> Tuple[Dict[str, pd.DataFrame], List[Dict], List[str]]:
+def stream_sheet(file_path: str, sheet_name: str,
+                 memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB, sheet_id: Optional[str] = None,
+                 registry: Optional[Dict] = None) -> Tuple[Dict, Dict, Dict]:
+    """
+    Ingest one sheet in bounded memory using openpyxl read-only streaming.
+
+    The layout is resolved on the leading rows only; the data rows are then
+    folded chunk by chunk into the column stats and never held in full.
+
+    Returns:
+        Tuple of (layout, metadata_dict, column_stats)
+    """
+    stream = open_sheet_stream(file_path, sheet_name)
+    layout = resolve_layout(stream["prefix"], sheet_name, sheet_id or sheet_name, registry)
+    header_row = layout["header_row"]
+
+    original_columns = layout["original_columns"]
+    final_columns = layout["normalized_columns"]
+    stats = new_column_profile(final_columns, NUMERIC_PATTERN_COLUMNS)
+
+    chunk_rows = chunk_rows_for_budget(len(final_columns), memory_limit_mb)
+    for chunk in iter_data_chunks(stream, header_row, final_columns, chunk_rows):
+        stats = update_column_profile(stats, chunk)
+
+    metadata = {
+        "original_columns": original_columns,
+        "normalized_columns": final_columns,
+        "header_row": header_row,
+        "data_start_row": header_row + 1,
+        "original_row_count": stream["stats"]["row_count"],
+        "original_col_count": stream["stats"]["col_count"],
+        "rows_before_header": header_row,
+        "rows_ingested": stats["row_count"]
+    }
+
+    return layout, metadata, stats
+
+
+def layout_definition() -> Dict:
+    """
+    Definition of the Phase 1 layout logic, used as the cache key input.
+
+    Built from the source of the header detection, column naming and column
+    profiling functions, so any change to the heuristics invalidates cached layouts.
+    """
+    functions = [to_snake_case, header_block, header_row_masks, detect_header_row,
+                 normalize_column_names, profile_frame, merge_column_profiles, merge_dtypes]
+    return {
+        "stage": "phase1_layout",
+        "logic": definition_fingerprint([inspect.getsource(fn) for fn in functions]),
+        "candidate_rows": HEADER_CANDIDATE_ROWS,
+        "markers": HEADER_METADATA_MARKERS
+    }
+
+
+def ingest_workbook_sheet(file_path: str, file_label: str, sheet_name: str,
+                          stream: bool = False, memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB,
+                          use_cache: bool = True, content_hash: Optional[str] = None,
+                          xl: Optional[pd.ExcelFile] = None, keep_frame: bool = True,
+                          registry: Optional[Dict] = None, reader: str = DEFAULT_READER) -> Dict[str, Any]:
     """
-    Ingest all sheets from an Excel file.
+    Ingest one sheet: parse it (at most once), resolve the header row and
+    column names (registry lookup or detection) and build its QC record.
+
+    With use_cache=True the layout, metadata and column stats are cached by
+    the sheet's content hash (see ledger_io.sheet_content_hashes), so a
+    sheet is only re-parsed when it changed; a cached sheet is not parsed at
+    all and returns no frame. The registry is only read here; resolved layouts are
+    returned for the caller to register. Sheets are read with `xl` when
+    given, otherwise with the `reader` backend (streaming always uses
+    openpyxl). Self-contained so it can run in a worker process.
 
     Returns:
-        Tuple of (dict of normalized DataFrames, list of QC records, list of assumptions)
+        Dict with keys: sheet_name, header_row, detection_reasons, metadata,
+        column_stats, layout, qc_record, assumption, df, parsed, cache_hit,
+        content_hash, seconds
+    """
+    start = time.perf_counter()
+    if content_hash is None:
+        content_hash = sheet_content_hashes(file_path, [sheet_name])[sheet_name]
+
+    key = sheet_cache_key(content_hash, sheet_name, layout_definition(), "stream" if stream else "full")
+    cached = load_cached_sheet(key) if use_cache else None
+    df_normalized = None
+
+    sheet_id = f"{file_label}/{sheet_name}"
+
+    if cached is not None:
+        payload = cached[1]
+        metadata = payload["metadata"]
+        stats = payload["column_stats"]
+        layout = payload["layout"]
+        layout["sheet_id"] = sheet_id
+        layout["layout_status"] = None
+        if registry is not None:
+            previous = registry["sheets"].get(sheet_id)
+            current = {"fingerprint": layout["fingerprint"], "column_signature": layout["column_signature"]}
+            layout["layout_status"] = "cached" if previous in (None, current) else "drifted"
+    elif stream:
+        layout, metadata, stats = stream_sheet(file_path, sheet_name, memory_limit_mb, sheet_id, registry)
+    else:
+        # Read raw data without header (the only parse of this sheet)
+        if xl is None:
+            xl = open_workbook(file_path, reader)
+        df_raw = read_raw_sheet(xl, sheet_name)
+        layout = resolve_layout(df_raw, sheet_name, sheet_id, registry)
+
+        # Normalize DataFrame
+        df_normalized, metadata = normalize_dataframe(df_raw, layout["header_row"], sheet_name,
+                                                      layout["normalized_columns"])
+        metadata["original_col_count"] = df_raw.shape[1]
+        del df_raw
+
+        stats = profile_frame(df_normalized, metadata["normalized_columns"], NUMERIC_PATTERN_COLUMNS)
+
+    header_row = layout["header_row"]
+    detection_reasons = layout["detection_reasons"]
+
+    if cached is None and use_cache:
+        save_cached_sheet(key, None, {
+            "metadata": metadata,
+            "column_stats": stats,
+            "layout": layout
+        })
+
+    original_row_count = metadata["original_row_count"]
+
+    # Calculate rows dropped
+    rows_dropped = original_row_count - metadata["rows_ingested"] - 1  # -1 for header row
+
+    # Log assumptions if any
+    assumption = None
+    if header_row > 0:
+        assumption = f"[{file_label}][{sheet_name}] Rows 0-{header_row-1} treated as metadata/non-data rows"
+
+    # Create QC record
+    qc_record = {
+        "file": file_label,
+        "sheet_name": sheet_name,
+        "original_row_count": original_row_count,
+        "detected_header_row": header_row,
+        "data_start_row": metadata["data_start_row"],
+        "rows_ingested": metadata["rows_ingested"],
+        "rows_dropped": rows_dropped,
+        "drop_reason": f"Non-data rows before header (rows 0-{header_row})" if rows_dropped > 0 else "None",
+        "original_col_count": metadata["original_col_count"],
+        "normalized_col_count": len(metadata["normalized_columns"])
+    }
+
+    return {
+        "sheet_name": sheet_name,
+        "header_row": header_row,
+        "detection_reasons": detection_reasons,
+        "metadata": metadata,
+        "column_stats": stats,
+        "layout": layout,
+        "qc_record": qc_record,
+        "assumption": assumption,
+        "df": df_normalized if keep_frame else None,
+        "parsed": cached is None,
+        "cache_hit": cached is not None,
+        "content_hash": content_hash,
+        "seconds": time.perf_counter() - start
+    }
+
+
+def print_sheet_result(result: Dict[str, Any]):
+    """Print the per-sheet ingestion report."""
+    metadata = result["metadata"]
+
+    print(f"\n--- Processing sheet: {result['sheet_name']} ---")
+    if result["cache_hit"]:
+        print("  Loaded layout from cache")
+    print(f"  Raw dimensions: {metadata['original_row_count']} rows x {metadata['original_col_count']} cols")
+
+    print(f"  Detected header row: {result['header_row']}")
+    if result["layout"]["layout_status"]:
+        print(f"  Layout registry: {result['layout']['layout_status']}")
+    for reason in result["detection_reasons"]:
+        print(f"    - {reason}")
+
+    if result["assumption"]:
+        print(f"  Assumption logged: {result['assumption']}")
+
+    print(f"  Rows ingested: {metadata['rows_ingested']}")
+    print(f"  Columns: {metadata['normalized_columns']}")
+
+
+def merge_sheet_results(file_label: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-sheet results (in workbook sheet order) into one workbook result.
+
+    Returns:
+        Dict with keys:
+            normalized_dfs: dict of normalized DataFrames keyed by sheet name
+            qc_records: list of per-sheet QC records
+            assumptions: list of assumption strings
+            metadata: dict of column-mapping metadata keyed by sheet name
+            column_stats: dict of column profiles keyed by sheet name
+            layouts: list of resolved sheet layouts (see resolve_layout)
+            sheet_hashes: content hash of each sheet keyed by sheet name
+            sheets_parsed: number of sheet parses performed (one per uncached sheet)
+            cache_hits: number of sheets served from the layout cache
+    """
+    merged = {
+        "normalized_dfs": {},
+        "qc_records": [],
+        "assumptions": [],
+        "metadata": {},
+        "column_stats": {},
+        "layouts": [],
+        "sheet_hashes": {},
+        "sheets_parsed": 0,
+        "cache_hits": 0
+    }
+
+    for result in results:
+        sheet_name = result["sheet_name"]
+        if result["df"] is not None:
+            merged["normalized_dfs"][sheet_name] = result["df"]
+        merged["qc_records"].append(result["qc_record"])
+        if result["assumption"]:
+            merged["assumptions"].append(result["assumption"])
+        merged["metadata"][sheet_name] = result["metadata"]
+        merged["column_stats"][sheet_name] = result["column_stats"]
+        merged["layouts"].append(result["layout"])
+        merged["sheet_hashes"][sheet_name] = result["content_hash"]
+        merged["sheets_parsed"] += int(result["parsed"])
+        merged["cache_hits"] += int(result["cache_hit"])
+        PIPELINE_LOG.event("ingest_sheet", sheet_name, result["seconds"], result["metadata"]["rows_ingested"],
+                           source=file_label, cache_hit=result["cache_hit"])
+
+    print(f"\n  Sheet parses for {file_label}: {merged['sheets_parsed']} "
+          f"({len(results)} sheets, {merged['cache_hits']} from cache)")
+
+    return merged
+
+
+def ingest_excel_file(file_path: str, file_label: str, stream: bool = False,
+                      memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB,
+                      use_cache: bool = True, registry: Optional[Dict] = None,
+                      reader: str = DEFAULT_READER) -> Dict[str, Any]:
+    """
+    Ingest all sheets from an Excel file in a single pass.
+
+    Each sheet is parsed exactly once; the raw rows feed header detection,
+    normalization, the QC record and the column-mapping metadata. With
+    stream=True sheets are read in chunks sized to memory_limit_mb and only
+    the column stats are kept (normalized_dfs is empty). Cached sheets are
+    not parsed at all and have no entry in normalized_dfs. Sheets are parsed
+    with the `reader` backend (see ledger_io.READER_BACKENDS).
+
+    Returns:
+        Workbook result dict (see merge_sheet_results)
     """
     print(f"\n{'='*60}")
     print(f"Ingesting: {file_path}")
     print(f"{'='*60}")
 
-    xl = pd.ExcelFile(file_path)
-    normalized_dfs = {}
-    qc_records = []
-    assumptions = []
+    xl = open_workbook(file_path, reader)
+    sheet_hashes = sheet_content_hashes(file_path, xl.sheet_names)
+    results = []
 
     for sheet_name in xl.sheet_names:
-        print(f"\n--- Processing sheet: {sheet_name} ---")
+        result = ingest_workbook_sheet(file_path, file_label, sheet_name, stream, memory_limit_mb,
+                                       use_cache, sheet_hashes[sheet_name], xl, registry=registry)
+        print_sheet_result(result)
+        results.append(result)
 
-        # Read raw data without header
-        df_raw = pd.read_excel(xl, sheet_name=sheet_name, header=None)
-        original_row_count = df_raw.shape[0]
-        original_col_count = df_raw.shape[1]
+    return merge_sheet_results(file_label, results)
 
-        print(f"  Raw dimensions: {original_row_count} rows x {original_col_count} cols")
 
-        # Detect header row
-        header_row, detection_reasons = detect_header_row(df_raw, sheet_name)
-        print(f"  Detected header row: {header_row}")
-        for reason in detection_reasons:
-            print(f"    - {reason}")
+# Workbooks opened by this worker process, reused across its sheet tasks
+_worker_workbooks: Dict[str, pd.ExcelFile] = {}
 
-        # Normalize DataFrame
-        df_normalized, metadata = normalize_dataframe(df_raw, header_row, sheet_name)
 
-        # Store normalized DataFrame
-        normalized_dfs[sheet_name] = df_normalized
+def _ingest_sheet_task(task: Tuple) -> Dict[str, Any]:
+    """Process-pool entry point: ingest one (workbook, sheet) pair without returning the frame."""
+    file_path, file_label, sheet_name, stream, memory_limit_mb, use_cache, content_hash, registry, reader = task
 
-        # Calculate rows dropped
-        rows_dropped = original_row_count - metadata["rows_ingested"] - 1  # -1 for header row
+    xl = None
+    if not stream:
+        if file_path not in _worker_workbooks:
+            _worker_workbooks[file_path] = open_workbook(file_path, reader)
+        xl = _worker_workbooks[file_path]
 
-        # Log assumptions if any
-        if header_row > 0:
-            assumption = f"[{file_label}][{sheet_name}] Rows 0-{header_row-1} treated as metadata/non-data rows"
-            assumptions.append(assumption)
-            print(f"  Assumption logged: {assumption}")
+    return ingest_workbook_sheet(file_path, file_label, sheet_name, stream, memory_limit_mb,
+                                 use_cache, content_hash, xl, keep_frame=False, registry=registry)
 
-        # Create QC record
-        qc_record = {
-            "file": file_label,
-            "sheet_name": sheet_name,
-            "original_row_count": original_row_count,
-            "detected_header_row": header_row,
-            "data_start_row": metadata["data_start_row"],
-            "rows_ingested": metadata["rows_ingested"],
-            "rows_dropped": rows_dropped,
-            "drop_reason": f"Non-data rows before header (rows 0-{header_row})" if rows_dropped > 0 else "None",
-            "original_col_count": original_col_count,
-            "normalized_col_count": len(metadata["normalized_columns"])
-        }
-        qc_records.append(qc_record)
 
-        print(f"  Rows ingested: {metadata['rows_ingested']}")
-        print(f"  Columns: {metadata['normalized_columns']}")
+def ingest_workbooks(workbooks: List[Tuple[str, str]], workers: int = 1, stream: bool = False,
+                     memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB,
+                     use_cache: bool = True, registry: Optional[Dict] = None,
+                     reader: str = DEFAULT_READER) -> List[Dict[str, Any]]:
+    """
+    Ingest several workbooks, fanning sheet parsing out across a process pool.
+
+    Every (workbook, sheet) pair is an independent task. Results are merged
+    back in input workbook order and sheet order, so QC records are identical
+    whatever the worker count or completion order. With workers > 1 frames
+    stay in the workers (normalized_dfs is empty); the QC outputs only need
+    the column stats.
 
-    return normalized_dfs, qc_records, assumptions
+    Args:
+        workbooks: list of (file_path, file_label)
+        workers: number of worker processes (1 = sequential, in-process)
+        registry: schema registry snapshot used for layout lookups (read-only)
+        reader: reader backend for sheet parsing ("auto", "calamine", "openpyxl")
+
+    Returns:
+        List of workbook result dicts (see merge_sheet_results), in input order
+    """
+    if workers <= 1:
+        return [ingest_excel_file(path, label, stream, memory_limit_mb, use_cache, registry, reader)
+                for path, label in workbooks]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Resolve once so every worker uses the same engine
+    reader = resolve_reader(reader)
+    tasks = []
+    for path, label in workbooks:
+        sheet_names = open_workbook(path, reader).sheet_names
+        sheet_hashes = sheet_content_hashes(path, sheet_names)
+        for sheet_name in sheet_names:
+            tasks.append((path, label, sheet_name, stream, memory_limit_mb, use_cache,
+                          sheet_hashes[sheet_name], registry, reader))
+
+    print(f"\nIngesting {len(workbooks)} workbooks ({len(tasks)} sheets) with {workers} workers")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Contiguous batches keep a worker on the same workbook, so each
+        # worker opens a given workbook at most a few times
+        chunksize = max(1, len(tasks) // (workers * 4))
+        sheet_results = list(executor.map(_ingest_sheet_task, tasks, chunksize=chunksize))
+
+    merged = []
+    for path, label in workbooks:
+        print(f"\n{'='*60}")
+        print(f"Ingesting: {path}")
+        print(f"{'='*60}")
+        results = [r for task, r in zip(tasks, sheet_results) if task[0] == path]
+        for result in results:
+            print_sheet_result(result)
+        merged.append(merge_sheet_results(label, results))
+
+    return merged
 
 
 def generate_column_mapping_report(all_metadata: Dict[str, Dict]) -> pd.DataFrame:
@@ -293,29 +835,29 @@ def generate_column_mapping_report(all_metadata: Dict[str, Dict]) -> pd.DataFram
     return pd.DataFrame(records)
 
 
-def generate_null_rate_report(normalized_dfs: Dict[str, pd.DataFrame]) -> pd.DataFrame:
-    """Generate a null rate report for all sheets."""
-    all_null_rates = []
-
-    for sheet_name, df in normalized_dfs.items():
-        null_rates = calculate_null_rates(df)
-        null_rates.insert(0, "sheet_name", sheet_name)
-        all_null_rates.append(null_rates)
-
-    if all_null_rates:
-        return pd.concat(all_null_rates, ignore_index=True)
-    return pd.DataFrame()
-
-
 # =============================================================================
 # MAIN EXECUTION
 # =============================================================================
 
-def main():
-    """Main execution function."""
+def main(stream: bool = False, memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB, use_cache: bool = True,
+         inputs: Optional[str] = None, workers: int = 1, layout_only: bool = False,
+         use_registry: bool = True, reader: str = DEFAULT_READER,
+         pnl_source: str = INPUT_PL_FILE, cfr_source: str = CENTRAL_FINANCE_FILE):
+    """
+    Main execution function.
+
+    Ingests the `inputs` glob when given, otherwise the Input P&L and Central
+    Finance Roles sources (workbooks, or CSV/Parquet/JSONL exports of them).
+    """
+    PIPELINE_LOG.start_run()
     print("=" * 60)
     print("PHASE 1: DATA INGESTION, SCHEMA DETECTION & STRUCTURAL QC")
     print(f"Execution timestamp: {datetime.now().isoformat()}")
+    if stream:
+        print(f"Streaming mode: chunks bounded to {memory_limit_mb} MB")
+    else:
+        reader = resolve_reader(reader)
+        print(f"Reader backend: {reader}")
     print("=" * 60)
 
     # Ensure output directories exist
@@ -326,39 +868,61 @@ def main():
     all_qc_records = []
     all_normalized_dfs = {}
     all_metadata = {}
+    all_column_stats = {}
+    pattern_profiles = []
+    all_layouts = []
+    total_sheet_parses = 0
+    total_cache_hits = 0
 
     # ==========================================================================
-    # INGEST INPUT P&L FILE
-    # ==========================================================================
-
-    pnl_dfs, pnl_qc, pnl_assumptions = ingest_excel_file(INPUT_PL_FILE, "Input P&L")
-    all_assumptions.extend(pnl_assumptions)
-    all_qc_records.extend(pnl_qc)
-
-    for sheet_name, df in pnl_dfs.items():
-        all_normalized_dfs[f"pnl_{sheet_name}"] = df
-        # Store metadata for column mapping
-        xl = pd.ExcelFile(INPUT_PL_FILE)
-        df_raw = pd.read_excel(xl, sheet_name=sheet_name, header=None)
-        header_row, _ = detect_header_row(df_raw, sheet_name)
-        _, metadata = normalize_dataframe(df_raw, header_row, sheet_name)
-        all_metadata[f"pnl_{sheet_name}"] = metadata
-
-    # ==========================================================================
-    # INGEST CENTRAL FINANCE ROLES FILE
+    # INGEST WORKBOOKS
     # ==========================================================================
 
-    cfr_dfs, cfr_qc, cfr_assumptions = ingest_excel_file(CENTRAL_FINANCE_FILE, "Central Finance Roles")
-    all_assumptions.extend(cfr_assumptions)
-    all_qc_records.extend(cfr_qc)
-
-    for sheet_name, df in cfr_dfs.items():
-        all_normalized_dfs[f"cfr_{sheet_name}"] = df
-        xl = pd.ExcelFile(CENTRAL_FINANCE_FILE)
-        df_raw = pd.read_excel(xl, sheet_name=sheet_name, header=None)
-        header_row, _ = detect_header_row(df_raw, sheet_name)
-        _, metadata = normalize_dataframe(df_raw, header_row, sheet_name)
-        all_metadata[f"cfr_{sheet_name}"] = metadata
+    if inputs:
+        workbook_paths = sorted(glob.glob(inputs))
+        workbooks = [(path, os.path.splitext(os.path.basename(path))[0]) for path in workbook_paths]
+        key_prefixes = [label for _, label in workbooks]
+    else:
+        workbooks = [(pnl_source, "Input P&L"), (cfr_source, "Central Finance Roles")]
+        key_prefixes = ["pnl", "cfr"]
+
+    if layout_only:
+        # Header detection from each sheet's prefix only; no QC outputs written
+        layouts = detect_layouts(workbooks, reader)
+        print(layouts.to_string(index=False))
+        print(f"Layouts detected: {len(layouts)} sheets across {len(workbooks)} workbooks")
+        return {}, [], []
+
+    registry = load_schema_registry(definition_fingerprint(layout_definition())) if use_registry else None
+    workbook_results = ingest_workbooks(workbooks, workers, stream, memory_limit_mb, use_cache, registry, reader)
+
+    # Compare sheet content with the previous run
+    sheet_hashes = {
+        f"{path}/{sheet_name}": h
+        for (path, _), result in zip(workbooks, workbook_results)
+        for sheet_name, h in result["sheet_hashes"].items()
+    }
+    changes = manifest_changes(load_manifest("phase1"), sheet_hashes)
+    print(f"\nIncremental run: {len(changes['dirty'])} new/changed sheets, {len(changes['clean'])} unchanged")
+    for sheet in changes["dirty"]:
+        print(f"  - changed: {sheet}")
+
+    for prefix, result in zip(key_prefixes, workbook_results):
+        all_assumptions.extend(result["assumptions"])
+        all_qc_records.extend(result["qc_records"])
+        total_sheet_parses += result["sheets_parsed"]
+        total_cache_hits += result["cache_hits"]
+        all_layouts.extend(result["layouts"])
+
+        for sheet_name in result["metadata"]:
+            if sheet_name in result["normalized_dfs"]:
+                all_normalized_dfs[f"{prefix}_{sheet_name}"] = result["normalized_dfs"][sheet_name]
+            all_metadata[f"{prefix}_{sheet_name}"] = result["metadata"][sheet_name]
+            all_column_stats[f"{prefix}_{sheet_name}"] = result["column_stats"][sheet_name]
+            pattern_profiles.append((sheet_name, result["column_stats"][sheet_name]))
+
+    PIPELINE_LOG.lap("ingest_workbooks", rows=sum(r["rows_ingested"] for r in all_qc_records),
+                     sheets=len(all_qc_records), parsed=total_sheet_parses, cache_hits=total_cache_hits)
 
     # ==========================================================================
     # GENERATE QC OUTPUTS
@@ -368,24 +932,28 @@ def main():
     print("GENERATING QC OUTPUTS")
     print("=" * 60)
 
+    # CSVs whose content did not change are left untouched
+    qc_written = 0
+
     # 1. Sheet-level QC summary
     qc_summary_df = pd.DataFrame(all_qc_records)
     qc_summary_path = os.path.join(QC_OUTPUT_DIR, "01_sheet_ingestion_summary.csv")
-    qc_summary_df.to_csv(qc_summary_path, index=False)
+    qc_written += write_csv_if_changed(qc_summary_df, qc_summary_path)
     print(f"\n[QC] Sheet ingestion summary saved to: {qc_summary_path}")
     print(qc_summary_df.to_string(index=False))
 
     # 2. Column mapping report
     column_mapping_df = generate_column_mapping_report(all_metadata)
     column_mapping_path = os.path.join(QC_OUTPUT_DIR, "02_column_name_mapping.csv")
-    column_mapping_df.to_csv(column_mapping_path, index=False)
+    qc_written += write_csv_if_changed(column_mapping_df, column_mapping_path)
     print(f"\n[QC] Column name mapping saved to: {column_mapping_path}")
     print(f"     Total columns mapped: {len(column_mapping_df)}")
 
+    # 3-4, 6. Reports built from the column profiles (one scan per sheet)
     # 3. Null rate report
-    null_rate_df = generate_null_rate_report(all_normalized_dfs)
+    null_rate_df = null_rate_report(all_column_stats)
     null_rate_path = os.path.join(QC_OUTPUT_DIR, "03_null_rate_summary.csv")
-    null_rate_df.to_csv(null_rate_path, index=False)
+    qc_written += write_csv_if_changed(null_rate_df, null_rate_path)
     print(f"\n[QC] Null rate summary saved to: {null_rate_path}")
 
     # Show high null rate columns (>50%)
@@ -396,21 +964,42 @@ def main():
     else:
         print("\n[QC] No columns with >50% null rate detected.")
 
-    # 4. Data type summary
-    dtype_records = []
-    for key, df in all_normalized_dfs.items():
-        for col in df.columns:
-            dtype_records.append({
-                "sheet_key": key,
-                "column": col,
-                "pandas_dtype": str(df[col].dtype),
-                "sample_value": str(df[col].dropna().iloc[0]) if not df[col].dropna().empty else "N/A"
-            })
-    dtype_df = pd.DataFrame(dtype_records)
+    # 4. Data type summary (with value range, distinct estimate, numeric-parse rate)
+    dtype_df = dtype_report(all_column_stats)
     dtype_path = os.path.join(QC_OUTPUT_DIR, "04_data_type_summary.csv")
-    dtype_df.to_csv(dtype_path, index=False)
+    qc_written += write_csv_if_changed(dtype_df, dtype_path)
     print(f"\n[QC] Data type summary saved to: {dtype_path}")
 
+    # 6. Numeric pattern summary
+    pattern_df = numeric_pattern_report(pattern_profiles)
+    pattern_path = os.path.join(QC_OUTPUT_DIR, "06_numeric_pattern_summary.csv")
+    qc_written += write_csv_if_changed(pattern_df, pattern_path)
+    print(f"\n[QC] Numeric pattern summary saved to: {pattern_path}")
+    flagged_patterns = pattern_df[pattern_df["pattern_type"] != "all_numeric"] if not pattern_df.empty else pattern_df
+    if not flagged_patterns.empty:
+        print("\n[FLAG] Non-numeric patterns in numeric columns:")
+        print(flagged_patterns.to_string(index=False))
+    else:
+        print("     All values in numeric columns parse as numbers.")
+
+    # 12. Layout registry status (new and drifted layouts flagged)
+    qc_files = 5
+    if registry is not None:
+        layout_df = generate_layout_status_report(all_layouts)
+        layout_path = os.path.join(QC_OUTPUT_DIR, "12_layout_registry_status.csv")
+        qc_written += write_csv_if_changed(layout_df, layout_path)
+        qc_files += 1
+
+        status_counts = register_layouts(registry, all_layouts)
+        save_schema_registry(registry)
+        print(f"\n[QC] Layout registry status saved to: {layout_path}")
+        print("     " + ", ".join(f"{status}: {count}" for status, count in sorted(status_counts.items())))
+
+        drifted = layout_df[layout_df["layout_status"] == "drifted"]
+        if not drifted.empty:
+            print("\n[FLAG] Sheets whose layout drifted from the registered layout:")
+            print(drifted.to_string(index=False))
+
     # 5. Row count reconciliation
     print("\n" + "-" * 60)
     print("ROW COUNT RECONCILIATION")
@@ -475,13 +1064,21 @@ Generated: {datetime.now().isoformat()}
 2. `outputs/qc/02_column_name_mapping.csv` - Original to normalized column name mapping
 3. `outputs/qc/03_null_rate_summary.csv` - Null rate per column per sheet
 4. `outputs/qc/04_data_type_summary.csv` - Data types detected per column
+5. `outputs/qc/06_numeric_pattern_summary.csv` - Non-numeric patterns in numeric columns
 """
+    if registry is not None:
+        assumptions_content += "6. `outputs/qc/12_layout_registry_status.csv` - Layout registry lookups (new/drifted layouts flagged)\n"
 
     with open(ASSUMPTIONS_FILE, "w") as f:
         f.write(assumptions_content)
 
     print(f"Assumptions documented in: {ASSUMPTIONS_FILE}")
 
+    # Sheet hashes of this run, for the next run's change report
+    save_manifest("phase1", sheet_hashes)
+    PIPELINE_LOG.lap("qc_outputs", qc_files=qc_files, qc_written=qc_written)
+    PIPELINE_LOG.flush()
+
     # ==========================================================================
     # FINAL SUMMARY
     # ==========================================================================
@@ -490,12 +1087,14 @@ Generated: {datetime.now().isoformat()}
     print("PHASE 1 COMPLETE - SUMMARY")
     print("=" * 60)
 
-    print(f"\nFiles ingested: 2")
-    print(f"  - {INPUT_PL_FILE}: {len(pnl_dfs)} sheets")
-    print(f"  - {CENTRAL_FINANCE_FILE}: {len(cfr_dfs)} sheets")
-    print(f"\nTotal sheets processed: {len(all_normalized_dfs)}")
+    print(f"\nFiles ingested: {len(workbooks)}")
+    for (path, _), result in zip(workbooks, workbook_results):
+        print(f"  - {path}: {len(result['metadata'])} sheets")
+    print(f"\nTotal sheets processed: {len(all_column_stats)}")
+    single_pass = total_sheet_parses + total_cache_hits == len(all_column_stats)
+    print(f"Total sheet parses: {total_sheet_parses}, cache hits: {total_cache_hits} (single pass: {'PASS' if single_pass else 'FLAG'})")
     print(f"Total data rows ingested: {total_ingested}")
-    print(f"QC artifacts generated: 4 files in {QC_OUTPUT_DIR}/")
+    print(f"QC artifacts generated: {qc_files} files in {QC_OUTPUT_DIR}/ ({qc_written} rewritten, {qc_files - qc_written} unchanged)")
     print(f"Assumptions documented: {ASSUMPTIONS_FILE}")
 
     print("\n" + "=" * 60)
@@ -506,4 +1105,34 @@ Generated: {datetime.now().isoformat()}
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Phase 1: ingestion, schema detection & structural QC")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream sheets with openpyxl read-only iteration in bounded memory")
+    parser.add_argument("--memory-limit-mb", type=float, default=STREAM_MEMORY_LIMIT_MB,
+                        help="Memory budget per streamed chunk (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore and do not write the sheet layout cache")
+    parser.add_argument("--inputs", default=None,
+                        help="Glob of workbooks to ingest instead of the two default files "
+                             "(.xlsx, or CSV/Parquet/JSONL exports and directories of them)")
+    parser.add_argument("--pnl-source", default=INPUT_PL_FILE,
+                        help="Input P&L workbook, or a CSV/Parquet/JSONL export (or directory of exports) of its sheets")
+    parser.add_argument("--cfr-source", default=CENTRAL_FINANCE_FILE,
+                        help="Central Finance Roles workbook, or a CSV/Parquet/JSONL export of it")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for parallel sheet ingestion (default: %(default)s)")
+    parser.add_argument("--no-registry", action="store_true",
+                        help="Detect every header row instead of resolving known layouts from the schema registry")
+    parser.add_argument("--reader", default=DEFAULT_READER, choices=["auto"] + list(READER_BACKENDS),
+                        help="Excel reader backend (default: %(default)s = calamine if installed, else openpyxl)")
+    parser.add_argument("--layout-only", action="store_true",
+                        help="Only detect header rows from each sheet's leading rows and print them")
+    args = parser.parse_args()
+
+    with buffered_console():
+        main(stream=args.stream, memory_limit_mb=args.memory_limit_mb, use_cache=not args.no_cache,
+             inputs=args.inputs, workers=args.workers, layout_only=args.layout_only,
+             use_registry=not args.no_registry, reader=args.reader,
+             pnl_source=args.pnl_source, cfr_source=args.cfr_source)
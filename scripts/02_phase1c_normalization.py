@@ -18,8 +18,25 @@ Date: 2026-01-05
 import pandas as pd
 import numpy as np
 import os
+import time
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ledger_io import (
+    STREAM_MEMORY_LIMIT_MB, open_sheet_stream, iter_data_chunks, chunk_rows_for_budget,
+    sheet_content_hashes, normalized_sheet_definition, sheet_cache_key, load_cached_sheet, save_cached_sheet,
+    CachedFrameWriter,
+    load_manifest, save_manifest, manifest_changes, write_csv_if_changed,
+    DEFAULT_READER, READER_BACKENDS, resolve_reader, open_workbook, read_raw_sheet, input_format
+)
+from money import (
+    MONEY_MODES, DEFAULT_MONEY_MODE, money_total, new_running_total, add_to_running_total, running_total_value
+)
+from qc_rules import (
+    metrics_table, evaluate_rules, invariant_report, sum_report, pnl_reference_values, evaluate_tieouts
+)
+from pipeline_log import PipelineLog, buffered_console
+from column_profile import merge_dtypes
 
 # =============================================================================
 # CONFIGURATION
@@ -42,6 +59,9 @@ HEADER_ROWS = {
     "Finance Roles": 0
 }
 
+# CSV / Parquet / JSONL exports of these sheets carry their header on row 0
+EXPORT_HEADER_ROW = 0
+
 # Column normalization mapping (from Phase 1)
 COLUMN_NORMALIZATIONS = {
     "Benchmarks": ["category", "benchmark"],
@@ -74,37 +94,75 @@ COLUMN_RENAMES = {
     "dept_1": "expense_category"
 }
 
+# Pre/post invariants, evaluated for every sheet at once (see qc_rules.py)
+SUM_TOLERANCE = 0.01  # $0.01
+INVARIANT_RULES = [
+    {"check": "row_count", "metric": "row_count", "per_column": False, "tolerance": 0, "report": "invariants"},
+    {"check": "column_count", "metric": "column_count", "per_column": False, "tolerance": 0, "report": "invariants"},
+    {"check": "null_count_", "metric": "null_count", "per_column": True, "tolerance": 0, "report": "invariants"},
+    {"check": "sum_", "metric": "sum", "per_column": True, "tolerance": SUM_TOLERANCE, "report": "sums"}
+]
+
+# P&L Summary tie-outs: post-normalization sheet totals vs P&L Summary lines
+TIEOUT_TOLERANCE = 0.01
+PNL_TIEOUTS = [
+    {"category": "Recurring Revenue", "label": "Recurring", "sheet": "RecurringRevenue", "column": "2018_total"},
+    {"category": "PSO Revenue", "label": "PSO", "sheet": "PSORevenue", "column": "2018_total"},
+    {"category": "Perpetual Revenue", "label": "Perpetual", "sheet": "PerpetualRevenue", "column": "2018_total"},
+    {"category": "HC Expense (W2)", "label": "HC Expense (W2)", "sheet": "Empl.", "column": "2018_total"},
+    {"category": "Non HC Expense (OPEX)", "label": "Non HC Expense (OPEX)", "sheet": "OPEX - NEmpl.", "column": "2018_total"},
+    {"category": "Non HC Expense (COGS)", "label": "Non HC Expense (COGS)", "sheet": "COGS - NEmpl.", "column": "2018_total"}
+]
+
 # =============================================================================
 # EXECUTION LOG
 # =============================================================================
 
-execution_log = []
+# Message lines (rendered into the Markdown log) and timed events (outputs/logs/phase_1c.jsonl)
+PIPELINE_LOG = PipelineLog("phase_1c")
+execution_log = PIPELINE_LOG.lines
 
 def log(message: str, level: str = "INFO"):
     """Log a message with timestamp."""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    entry = f"[{timestamp}] [{level}] {message}"
-    execution_log.append(entry)
-    print(entry)
+    PIPELINE_LOG.log(message, level)
 
 # =============================================================================
 # INGESTION (Reuse Phase 1 Logic)
 # =============================================================================
 
-def ingest_sheet(xl: pd.ExcelFile, sheet_name: str) -> Tuple[pd.DataFrame, Dict]:
+def sheet_header_row(file_path: str, sheet_name: str) -> int:
+    """Header row of a sheet: HEADER_ROWS for the workbooks, row 0 for ledger exports."""
+    if input_format(file_path) == "excel":
+        return HEADER_ROWS[sheet_name]
+    return EXPORT_HEADER_ROW
+
+
+def ingest_sheet(xl: pd.ExcelFile, sheet_name: str, header_row: Optional[int] = None,
+                 frame: Optional[pd.DataFrame] = None,
+                 money_mode: str = DEFAULT_MONEY_MODE) -> Tuple[pd.DataFrame, Dict]:
     """
     Ingest a single sheet and return normalized DataFrame with pre-normalization metrics.
+
+    The sheet is parsed with the reader backend `xl` was opened with (see
+    open_workbook); `xl` may also be a ledger export (TabularSource). When
+    `frame` holds the sheet as Phase 1 already ingested it (header applied,
+    same column names) it is copied instead of parsing the sheet again.
+    Sums are totalled in `money_mode` (see money.py).
     """
-    header_row = HEADER_ROWS[sheet_name]
+    if header_row is None:
+        header_row = HEADER_ROWS[sheet_name]
     columns = COLUMN_NORMALIZATIONS[sheet_name]
 
-    # Read raw data
-    df_raw = pd.read_excel(xl, sheet_name=sheet_name, header=None)
+    if frame is not None and list(frame.columns) == columns:
+        df = frame.copy()
+    else:
+        # Read raw data
+        df_raw = read_raw_sheet(xl, sheet_name)
 
-    # Extract data starting after header
-    df = df_raw.iloc[header_row + 1:].copy()
-    df.columns = columns
-    df = df.reset_index(drop=True)
+        # Extract data starting after header
+        df = df_raw.iloc[header_row + 1:].copy()
+        df.columns = columns
+        df = df.reset_index(drop=True)
 
     # Capture pre-normalization metrics
     pre_metrics = {
@@ -120,7 +178,65 @@ def ingest_sheet(xl: pd.ExcelFile, sheet_name: str) -> Tuple[pd.DataFrame, Dict]
     for col in NUMERIC_COLUMNS.get(sheet_name, []):
         if col in df.columns:
             numeric_vals = pd.to_numeric(df[col], errors='coerce')
-            pre_metrics["sums"][col] = float(numeric_vals.sum())
+            pre_metrics["sums"][col] = money_total(numeric_vals, money_mode)
+
+    return df, pre_metrics
+
+
+def ingest_sheet_streaming(file_path: str, sheet_name: str,
+                           memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB,
+                           header_row: Optional[int] = None,
+                           money_mode: str = DEFAULT_MONEY_MODE) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Streaming variant of ingest_sheet() for workbooks too large to parse in one go.
+
+    Rows are read with openpyxl read-only iteration in chunks sized to
+    memory_limit_mb, which bounds the parser's memory, but the chunks are then
+    assembled column by column into the full sheet frame: the returned
+    DataFrame is as large as ingest_sheet()'s. Column dtypes are merged across
+    chunks as pd.concat does, and sums are taken on the assembled columns as in
+    ingest_sheet(). For sheets that do not fit in memory use
+    normalize_sheet_chunked() (--chunked), which keeps running metrics instead.
+    """
+    if header_row is None:
+        header_row = HEADER_ROWS[sheet_name]
+    columns = COLUMN_NORMALIZATIONS[sheet_name]
+    numeric_cols = [col for col in NUMERIC_COLUMNS.get(sheet_name, []) if col in columns]
+
+    stream = open_sheet_stream(file_path, sheet_name, prefix_rows=header_row + 1)
+    chunk_rows = chunk_rows_for_budget(len(columns), memory_limit_mb)
+
+    column_parts = {col: [] for col in columns}
+    null_counts = {col: 0 for col in columns}
+    row_count = 0
+
+    for chunk in iter_data_chunks(stream, header_row, columns, chunk_rows):
+        row_count += len(chunk)
+        chunk_nulls = chunk.isnull().sum()
+        for col in columns:
+            null_counts[col] += int(chunk_nulls[col])
+            column_parts[col].append(chunk[col])
+        del chunk
+
+    # Assemble column by column, releasing each column's chunks as we go.
+    # pd.concat keeps each chunk's inferred dtype (str + str stays str).
+    data = {}
+    for col in columns:
+        parts = column_parts.pop(col)
+        data[col] = pd.concat(parts, ignore_index=True) if parts else pd.Series([], dtype=object)
+    df = pd.DataFrame(data, columns=columns)
+
+    pre_metrics = {
+        "row_count": row_count,
+        "column_count": len(columns),
+        "columns": list(columns),
+        "dtypes": {col: str(df[col].dtype) for col in columns},
+        "null_counts": null_counts,
+        "sums": {}
+    }
+
+    for col in numeric_cols:
+        pre_metrics["sums"][col] = money_total(pd.to_numeric(df[col], errors='coerce'), money_mode)
 
     return df, pre_metrics
 
@@ -128,7 +244,7 @@ def ingest_sheet(xl: pd.ExcelFile, sheet_name: str) -> Tuple[pd.DataFrame, Dict]
 # NORMALIZATION (Approved Rules Only)
 # =============================================================================
 
-def apply_rule_1(df: pd.DataFrame, sheet_name: str) -> pd.DataFrame:
+def apply_rule_1(df: pd.DataFrame, sheet_name: str, verbose: bool = True) -> pd.DataFrame:
     """
     APPROVED Rule 1: Convert numeric columns from object to float64.
     NO ROUNDING APPLIED (Rule 2 not approved).
@@ -146,16 +262,17 @@ def apply_rule_1(df: pd.DataFrame, sheet_name: str) -> pd.DataFrame:
             new_dtype = str(df[col].dtype)
             new_nulls = df[col].isnull().sum()
 
-            log(f"[{sheet_name}] Rule 1: {col} dtype {original_dtype} → {new_dtype}")
+            if verbose:
+                log(f"[{sheet_name}] Rule 1: {col} dtype {original_dtype} → {new_dtype}")
 
             # Verify no new nulls introduced
-            if new_nulls > original_nulls:
+            if verbose and new_nulls > original_nulls:
                 log(f"[{sheet_name}] WARNING: {new_nulls - original_nulls} new null values in {col}", "WARNING")
 
     return df
 
 
-def apply_rule_4(df: pd.DataFrame, sheet_name: str) -> pd.DataFrame:
+def apply_rule_4(df: pd.DataFrame, sheet_name: str, verbose: bool = True) -> pd.DataFrame:
     """
     APPROVED Rule 4: Rename columns for clarity.
     dept → department
@@ -167,12 +284,13 @@ def apply_rule_4(df: pd.DataFrame, sheet_name: str) -> pd.DataFrame:
         if old_name in df.columns:
             df = df.rename(columns={old_name: new_name})
             renames_applied[old_name] = new_name
-            log(f"[{sheet_name}] Rule 4: Renamed '{old_name}' → '{new_name}'")
+            if verbose:
+                log(f"[{sheet_name}] Rule 4: Renamed '{old_name}' → '{new_name}'")
 
     return df
 
 
-def apply_rule_5(df: pd.DataFrame, sheet_name: str) -> pd.DataFrame:
+def apply_rule_5(df: pd.DataFrame, sheet_name: str, verbose: bool = True) -> pd.DataFrame:
     """
     APPROVED Rule 5: Preserve string columns as-is.
     This is a no-op confirmation - we simply don't transform string columns.
@@ -181,17 +299,25 @@ def apply_rule_5(df: pd.DataFrame, sheet_name: str) -> pd.DataFrame:
     numeric_cols = NUMERIC_COLUMNS.get(sheet_name, [])
     string_cols = [col for col in df.columns if col not in numeric_cols]
 
-    if string_cols:
+    if verbose and string_cols:
         log(f"[{sheet_name}] Rule 5: Preserved {len(string_cols)} string columns as-is: {string_cols}")
 
     return df
 
+def sheet_definition(sheet_name: str, header_row: Optional[int] = None) -> Dict:
+    """Normalization definition of a sheet (cache key input shared with Phase 2)."""
+    columns = [COLUMN_RENAMES.get(col, col) for col in COLUMN_NORMALIZATIONS[sheet_name]]
+    if header_row is None:
+        header_row = HEADER_ROWS[sheet_name]
+    return normalized_sheet_definition(header_row, columns, NUMERIC_COLUMNS.get(sheet_name, []))
+
+
 # =============================================================================
 # QC FUNCTIONS
 # =============================================================================
 
-def generate_post_metrics(df: pd.DataFrame, sheet_name: str) -> Dict:
-    """Generate post-normalization metrics."""
+def generate_post_metrics(df: pd.DataFrame, sheet_name: str, money_mode: str = DEFAULT_MONEY_MODE) -> Dict:
+    """Generate post-normalization metrics (sums totalled in `money_mode`)."""
     metrics = {
         "row_count": len(df),
         "column_count": len(df.columns),
@@ -212,86 +338,290 @@ def generate_post_metrics(df: pd.DataFrame, sheet_name: str) -> Dict:
 
     for col in numeric_cols_map.values():
         if col in df.columns:
-            metrics["sums"][col] = float(df[col].sum())
+            metrics["sums"][col] = money_total(df[col], money_mode)
 
     return metrics
 
 
-def validate_invariants(pre: Dict, post: Dict, sheet_name: str) -> List[Dict]:
-    """Validate that invariants are preserved."""
-    results = []
-
-    # Check row count
-    row_match = pre["row_count"] == post["row_count"]
-    results.append({
-        "sheet": sheet_name,
-        "check": "row_count",
-        "pre_value": pre["row_count"],
-        "post_value": post["row_count"],
-        "status": "PASS" if row_match else "FAIL"
-    })
-
-    # Check column count
-    col_match = pre["column_count"] == post["column_count"]
-    results.append({
-        "sheet": sheet_name,
-        "check": "column_count",
-        "pre_value": pre["column_count"],
-        "post_value": post["column_count"],
-        "status": "PASS" if col_match else "FAIL"
-    })
-
-    # Check null counts per column (accounting for renames)
-    rename_map = {"dept": "department", "dept_1": "expense_category"}
-
-    for pre_col, pre_nulls in pre["null_counts"].items():
-        post_col = rename_map.get(pre_col, pre_col)
-        if post_col in post["null_counts"]:
-            post_nulls = post["null_counts"][post_col]
-            null_match = pre_nulls == post_nulls
-            results.append({
-                "sheet": sheet_name,
-                "check": f"null_count_{post_col}",
-                "pre_value": pre_nulls,
-                "post_value": post_nulls,
-                "status": "PASS" if null_match else "FAIL"
-            })
-
-    return results
-
-
-def validate_sums(pre: Dict, post: Dict, sheet_name: str) -> List[Dict]:
-    """Validate that sums match within tolerance."""
-    results = []
-    tolerance = 0.01  # $0.01
-
-    for col, pre_sum in pre["sums"].items():
-        if col in post["sums"]:
-            post_sum = post["sums"][col]
-            diff = abs(post_sum - pre_sum)
-            match = diff <= tolerance
-
-            results.append({
-                "sheet": sheet_name,
-                "column": col,
-                "pre_sum": pre_sum,
-                "post_sum": post_sum,
-                "difference": diff,
-                "tolerance": tolerance,
-                "status": "PASS" if match else "FAIL"
-            })
-
-    return results
+# =============================================================================
+# CHUNKED NORMALIZATION (running pre/post metrics)
+# =============================================================================
+
+def new_running_metrics(columns: List[str], numeric_columns: List[str],
+                        money_mode: str = DEFAULT_MONEY_MODE) -> Dict:
+    """Empty pre/post metrics of a sheet read chunk by chunk (see update_running_metrics)."""
+    return {
+        "row_count": 0,
+        "column_count": len(columns),
+        "columns": list(columns),
+        "dtypes": {},
+        "null_counts": {col: 0 for col in columns},
+        "sums": {col: new_running_total(money_mode) for col in numeric_columns if col in columns},
+        "typed_columns": []
+    }
+
+
+def update_running_metrics(metrics: Dict, chunk: pd.DataFrame, coerce_numeric: bool = False):
+    """
+    Add one chunk to running metrics.
+
+    Row and null counts are added up; sums are running totals (compensated
+    in float mode, int64 cents in exact mode, see money.py), taken after
+    pd.to_numeric when coerce_numeric=True (pre-normalization). A column's
+    dtype merges the dtypes of its non-empty chunks (see merge_dtypes); an
+    all-null chunk only sets it until a non-empty chunk is seen.
+    """
+    metrics["row_count"] += len(chunk)
+    nulls = chunk.isnull().sum()
+
+    for col in metrics["columns"]:
+        metrics["null_counts"][col] += int(nulls[col])
+
+        dtype = str(chunk[col].dtype)
+        if nulls[col] == len(chunk):
+            metrics["dtypes"].setdefault(col, dtype)
+        elif col not in metrics["typed_columns"]:
+            metrics["dtypes"][col] = dtype
+            metrics["typed_columns"].append(col)
+        else:
+            metrics["dtypes"][col] = merge_dtypes(metrics["dtypes"][col], dtype)
+
+    for col, running in metrics["sums"].items():
+        values = pd.to_numeric(chunk[col], errors='coerce') if coerce_numeric else chunk[col]
+        add_to_running_total(running, values)
+
+
+def finish_running_metrics(metrics: Dict) -> Dict:
+    """Running metrics as a metrics dict (the shape ingest_sheet / generate_post_metrics return)."""
+    return {
+        "row_count": metrics["row_count"],
+        "column_count": metrics["column_count"],
+        "columns": metrics["columns"],
+        "dtypes": {col: metrics["dtypes"].get(col, "object") for col in metrics["columns"]},
+        "null_counts": metrics["null_counts"],
+        "sums": {col: running_total_value(running) for col, running in metrics["sums"].items()}
+    }
+
+
+def iter_sheet_chunks(file_path: str, sheet_name: str, header_row: int, chunk_rows: int,
+                      frame: Optional[pd.DataFrame] = None) -> Iterator[pd.DataFrame]:
+    """
+    Data rows of a sheet in chunks of `chunk_rows`, named with the sheet's
+    Phase 1 columns: slices of `frame` when Phase 1 already holds the sheet,
+    otherwise streamed (openpyxl read-only / export chunks). Chunks keep the
+    batch path's dtypes, and a sheet with no data rows yields one empty chunk,
+    so the running dtypes (08) match normalize_sheet()'s.
+    """
+    columns = COLUMN_NORMALIZATIONS[sheet_name]
+    if frame is not None and list(frame.columns) == columns:
+        for start in range(0, max(len(frame), 1), chunk_rows):
+            yield frame.iloc[start:start + chunk_rows].copy()
+        return
+
+    stream = open_sheet_stream(file_path, sheet_name, prefix_rows=header_row + 1)
+    yield from iter_data_chunks(stream, header_row, columns, chunk_rows)
+
+
+def normalize_sheet_chunked(file_path: str, sheet_name: str, header_row: int, key: str,
+                            memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB,
+                            frame: Optional[pd.DataFrame] = None,
+                            money_mode: str = DEFAULT_MONEY_MODE) -> Dict:
+    """
+    Apply Rules 1/4/5 chunk by chunk, keeping running pre/post metrics.
+
+    Only one chunk (sized to memory_limit_mb) is held at a time: each raw
+    chunk updates the pre metrics, is normalized, updates the post metrics
+    and is appended to the sheet's cache entry (CachedFrameWriter), so the
+    invariants (09/10) and tie-outs (11) are proven on sheets of any size.
+    The normalized frame is returned only when the sheet fits in one chunk;
+    larger sheets are read back from the cache by whoever needs them, so a
+    larger sheet whose frame cannot be cached (pyarrow missing, or a chunk
+    that does not fit the cache schema) raises ValueError.
+
+    Float-mode sums add the chunk totals (with compensation), so they can
+    differ from the batch sum of the whole column in the last bits (e.g.
+    1302828.2999999998 vs 1302828.3): well inside the reconciliation
+    tolerance, but not bit-identical to batch outputs. Exact mode
+    (--money-mode exact) gives the same totals either way.
+
+    Returns:
+        Dict with keys: df (or None), pre_metrics, post_metrics, dtype_rows, from_cache, key
+    """
+    columns = COLUMN_NORMALIZATIONS[sheet_name]
+    numeric_cols = NUMERIC_COLUMNS.get(sheet_name, [])
+    post_columns = [COLUMN_RENAMES.get(col, col) for col in columns]
+    post_numeric_cols = [COLUMN_RENAMES.get(col, col) for col in numeric_cols]
+    chunk_rows = chunk_rows_for_budget(len(columns), memory_limit_mb)
+
+    pre = new_running_metrics(columns, numeric_cols, money_mode)
+    post = new_running_metrics(post_columns, post_numeric_cols, money_mode)
+    writer = CachedFrameWriter(key, post_columns, post_numeric_cols)
+    n_chunks = 0
+    df = pd.DataFrame(columns=post_columns)
+
+    for chunk in iter_sheet_chunks(file_path, sheet_name, header_row, chunk_rows, frame):
+        update_running_metrics(pre, chunk, coerce_numeric=True)
+
+        # Apply approved rules (logged for the first chunk only)
+        verbose = n_chunks == 0
+        chunk = apply_rule_1(chunk, sheet_name, verbose)
+        chunk = apply_rule_4(chunk, sheet_name, verbose)
+        chunk = apply_rule_5(chunk, sheet_name, verbose)
+
+        update_running_metrics(post, chunk)
+        writer.write(chunk)
+        n_chunks += 1
+        df = chunk
+
+    pre_metrics = finish_running_metrics(pre)
+    post_metrics = finish_running_metrics(post)
+    log(f"[{sheet_name}] Chunked: {pre_metrics['row_count']} rows in {n_chunks} chunks of up to {chunk_rows}")
+
+    for col in numeric_cols:
+        new_nulls = post_metrics["null_counts"][COLUMN_RENAMES.get(col, col)] - pre_metrics["null_counts"][col]
+        if new_nulls > 0:
+            log(f"[{sheet_name}] WARNING: {new_nulls} new null values in {col} across all chunks", "WARNING")
+
+    qc = {
+        "post_metrics": post_metrics,
+        "dtype_rows": dtype_summary_rows(post_metrics, pre_metrics, sheet_name)
+    }
+    if writer.close({"pre_metrics": pre_metrics, "qc": qc, "money_mode": money_mode}):
+        log(f"[{sheet_name}] Cached normalized frame and QC rows ({key[:12]})")
+    elif n_chunks > 1:
+        raise ValueError(f"[{sheet_name}] Chunked normalization could not cache the normalized frame "
+                         f"({n_chunks} chunks, none kept in memory); run without --chunked")
+
+    return dict(qc, df=df if n_chunks <= 1 else None, pre_metrics=pre_metrics, from_cache=False, key=key)
+
+# =============================================================================
+# SHEET PROCESSING (cached per sheet)
+# =============================================================================
+
+def dtype_summary_rows(post_metrics: Dict, pre_metrics: Dict, sheet_name: str) -> List[Dict]:
+    """Pre vs post dtype per column (08), looking up renamed columns by their pre-rename name."""
+    original_names = {new: old for old, new in COLUMN_RENAMES.items()}
+    rows = []
+    for col in post_metrics["columns"]:
+        pre_dtype = pre_metrics["dtypes"].get(original_names.get(col, col), "N/A")
+        post_dtype = post_metrics["dtypes"][col]
+        rows.append({
+            "sheet": sheet_name,
+            "column": col,
+            "pre_dtype": pre_dtype,
+            "post_dtype": post_dtype,
+            "changed": pre_dtype != post_dtype
+        })
+    return rows
+
+
+def normalize_sheet(file_path: str, xl: pd.ExcelFile, content_hash: str, sheet_name: str,
+                    stream: bool = False, memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB,
+                    use_cache: bool = True, frame: Optional[pd.DataFrame] = None,
+                    money_mode: str = DEFAULT_MONEY_MODE, chunked: bool = False) -> Dict:
+    """
+    Ingest a sheet, apply the approved rules and run its QC checks, reusing
+    the normalized frame cache.
+
+    The cache key is the sheet's own content hash (plus the ingestion path,
+    see ledger_io.INGESTION_PATHS), so when one tab of a workbook is edited
+    only that tab misses. On a hit the normalized frame,
+    its pre/post metrics and its 08 dtype rows are loaded without parsing
+    the sheet or applying Rule 1. Invariants (09/10) are evaluated for all
+    sheets at once from the metrics (see generate_qc_outputs).
+    On a miss the sheet is ingested (or taken from `frame`, see
+    ingest_sheet), Rules 1/4/5 are applied, the metrics are taken and
+    everything is written to the cache. Metrics cached in another money mode
+    count as a miss.
+    With chunked=True a miss goes through normalize_sheet_chunked(), and a
+    hit loads the frame only if the sheet fits in one chunk.
+
+    Returns:
+        Dict with keys: df (None for chunked sheets larger than one chunk),
+        pre_metrics, post_metrics, dtype_rows, from_cache, key (cache key)
+    """
+    header_row = sheet_header_row(file_path, sheet_name)
+    ingestion = "chunked" if chunked else "stream" if stream else "full"
+    key = sheet_cache_key(content_hash, sheet_name, sheet_definition(sheet_name, header_row), ingestion)
+
+    if use_cache:
+        cached = load_cached_sheet(key, load_frame=not chunked)
+        if (cached is not None and (chunked or cached[0] is not None) and "qc" in cached[1]
+                and cached[1].get("money_mode", DEFAULT_MONEY_MODE) == money_mode):
+            df = cached[0]
+            chunk_rows = chunk_rows_for_budget(len(COLUMN_NORMALIZATIONS[sheet_name]), memory_limit_mb)
+            if chunked and cached[1]["pre_metrics"]["row_count"] <= chunk_rows:
+                df = load_cached_sheet(key)[0]
+            log(f"[{sheet_name}] Unchanged: loaded normalized frame and QC rows from cache ({key[:12]})")
+            return dict(cached[1]["qc"], df=df, pre_metrics=cached[1]["pre_metrics"], from_cache=True, key=key)
+
+    if chunked:
+        return normalize_sheet_chunked(file_path, sheet_name, header_row, key, memory_limit_mb, frame, money_mode)
+
+    # Ingest
+    if stream:
+        df, pre_metrics = ingest_sheet_streaming(file_path, sheet_name, memory_limit_mb, header_row, money_mode)
+    else:
+        df, pre_metrics = ingest_sheet(xl, sheet_name, header_row, frame, money_mode)
+
+    # Apply approved rules
+    df = apply_rule_1(df, sheet_name)
+    df = apply_rule_4(df, sheet_name)
+    df = apply_rule_5(df, sheet_name)
+
+    # Post-metrics and validation
+    post_metrics = generate_post_metrics(df, sheet_name, money_mode)
+    qc = {
+        "post_metrics": post_metrics,
+        "dtype_rows": dtype_summary_rows(post_metrics, pre_metrics, sheet_name)
+    }
+
+    payload = {"pre_metrics": pre_metrics, "qc": qc, "money_mode": money_mode}
+    if use_cache and save_cached_sheet(key, df, payload):
+        log(f"[{sheet_name}] Cached normalized frame and QC rows ({key[:12]})")
+
+    return dict(qc, df=df, pre_metrics=pre_metrics, from_cache=False, key=key)
 
 # =============================================================================
 # MAIN EXECUTION
 # =============================================================================
 
-def main():
-    """Main execution function."""
+def normalize_sources(stream: bool = False, memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB,
+                      use_cache: bool = True, reader: str = DEFAULT_READER,
+                      pnl_source: str = INPUT_PL_FILE, cfr_source: str = CENTRAL_FINANCE_FILE,
+                      frames: Optional[Dict[str, pd.DataFrame]] = None,
+                      money_mode: str = DEFAULT_MONEY_MODE, chunked: bool = False) -> Dict:
+    """
+    Ingest both sources and apply the approved rules, sheet by sheet.
+
+    pnl_source / cfr_source default to the two workbooks; either may instead
+    be a CSV / Parquet / JSONL export or a directory of exports, one per sheet.
+    `frames` may hold sheets Phase 1 already ingested in the same process,
+    keyed "<source>/<sheet>" (see run_pipeline.py). Reconciliation sums are
+    totalled in `money_mode` ("exact" = int64 cents, see money.py).
+    With chunked=True sheets are normalized chunk by chunk into the cache
+    (see normalize_sheet_chunked); normalized_dfs then holds only the sheets
+    that fit in one chunk, the others are read from the cache under
+    cache_keys (see normalized_frame).
+
+    Returns:
+        Dict with keys: pre_metrics, post_metrics, normalized_dfs,
+        cache_keys, dtype_summary, sheet_hashes
+    """
+    frames = frames or {}
+    start = time.perf_counter()
+    PIPELINE_LOG.start_run()
     log("=" * 70)
     log("PHASE 1c: EXECUTE APPROVED NORMALIZATION RULES")
     log("=" * 70)
+    if chunked:
+        log(f"Chunked mode: rules applied per chunk, chunks bounded to {memory_limit_mb} MB")
+    elif stream:
+        log(f"Streaming mode: chunks bounded to {memory_limit_mb} MB")
+    else:
+        reader = resolve_reader(reader)
+        log(f"Reader backend: {reader}")
+    log(f"Money mode: {money_mode}")
     log("")
     log("APPROVED RULES:")
     log("  ✓ Rule 1: Convert numeric columns to float64")
@@ -310,103 +640,114 @@ def main():
     all_pre_metrics = {}
     all_post_metrics = {}
     all_normalized_dfs = {}
-    all_invariant_checks = []
-    all_sum_checks = []
+    cache_keys = {}
     dtype_summary = []
+    sheet_hashes = {}
+    sheets_from_cache = 0
 
     # ==========================================================================
     # PROCESS INPUT P&L FILE
     # ==========================================================================
 
     log("-" * 50)
-    log("Processing: Input P&L File")
+    log(f"Processing: Input P&L File ({pnl_source})")
     log("-" * 50)
 
-    xl_pnl = pd.ExcelFile(INPUT_PL_FILE)
+    xl_pnl = open_workbook(pnl_source, reader)
+    pnl_hashes = sheet_content_hashes(pnl_source, xl_pnl.sheet_names)
 
     for sheet_name in xl_pnl.sheet_names:
         log(f"\n>>> Sheet: {sheet_name}")
-
-        # Ingest
-        df, pre_metrics = ingest_sheet(xl_pnl, sheet_name)
-        all_pre_metrics[sheet_name] = pre_metrics
-
-        # Apply approved rules
-        df = apply_rule_1(df, sheet_name)
-        df = apply_rule_4(df, sheet_name)
-        df = apply_rule_5(df, sheet_name)
-
-        # Generate post-metrics
-        post_metrics = generate_post_metrics(df, sheet_name)
-        all_post_metrics[sheet_name] = post_metrics
-        all_normalized_dfs[sheet_name] = df
-
-        # Record dtype changes
-        for col in df.columns:
-            pre_col = col
-            if col == "department":
-                pre_col = "dept"
-            elif col == "expense_category":
-                pre_col = "dept_1"
-
-            pre_dtype = pre_metrics["dtypes"].get(pre_col, "N/A")
-            post_dtype = str(df[col].dtype)
-
-            dtype_summary.append({
-                "sheet": sheet_name,
-                "column": col,
-                "pre_dtype": pre_dtype,
-                "post_dtype": post_dtype,
-                "changed": pre_dtype != post_dtype
-            })
-
-        # Validate
-        all_invariant_checks.extend(validate_invariants(pre_metrics, post_metrics, sheet_name))
-        all_sum_checks.extend(validate_sums(pre_metrics, post_metrics, sheet_name))
+        sheet_hashes[f"{pnl_source}/{sheet_name}"] = pnl_hashes[sheet_name]
+
+        # Ingest + apply approved rules + validate (or load all of it from the cache)
+        with PIPELINE_LOG.timed("normalize_sheet", sheet_name, source=pnl_source) as event:
+            result = normalize_sheet(pnl_source, xl_pnl, pnl_hashes[sheet_name], sheet_name,
+                                     stream, memory_limit_mb, use_cache, frames.get(f"{pnl_source}/{sheet_name}"),
+                                     money_mode, chunked)
+            event.update(rows=result["pre_metrics"]["row_count"], from_cache=result["from_cache"])
+        all_pre_metrics[sheet_name] = result["pre_metrics"]
+        all_post_metrics[sheet_name] = result["post_metrics"]
+        cache_keys[sheet_name] = result["key"]
+        if result["df"] is not None:
+            all_normalized_dfs[sheet_name] = result["df"]
+        dtype_summary.extend(result["dtype_rows"])
+        sheets_from_cache += int(result["from_cache"])
 
     # ==========================================================================
     # PROCESS CENTRAL FINANCE ROLES FILE
     # ==========================================================================
 
     log("\n" + "-" * 50)
-    log("Processing: Central Finance Roles File")
+    log(f"Processing: Central Finance Roles File ({cfr_source})")
     log("-" * 50)
 
-    xl_cfr = pd.ExcelFile(CENTRAL_FINANCE_FILE)
+    xl_cfr = open_workbook(cfr_source, reader)
+    cfr_hashes = sheet_content_hashes(cfr_source, xl_cfr.sheet_names)
 
     for sheet_name in xl_cfr.sheet_names:
         log(f"\n>>> Sheet: {sheet_name}")
+        sheet_hashes[f"{cfr_source}/{sheet_name}"] = cfr_hashes[sheet_name]
+
+        # Ingest + apply approved rules + validate (or load all of it from the cache)
+        with PIPELINE_LOG.timed("normalize_sheet", sheet_name, source=cfr_source) as event:
+            result = normalize_sheet(cfr_source, xl_cfr, cfr_hashes[sheet_name], sheet_name,
+                                     stream, memory_limit_mb, use_cache, frames.get(f"{cfr_source}/{sheet_name}"),
+                                     money_mode, chunked)
+            event.update(rows=result["pre_metrics"]["row_count"], from_cache=result["from_cache"])
+        all_pre_metrics[sheet_name] = result["pre_metrics"]
+        all_post_metrics[sheet_name] = result["post_metrics"]
+        cache_keys[sheet_name] = result["key"]
+        if result["df"] is not None:
+            all_normalized_dfs[sheet_name] = result["df"]
+        dtype_summary.extend(result["dtype_rows"])
+        sheets_from_cache += int(result["from_cache"])
+
+    changes = manifest_changes(load_manifest("phase1c"), sheet_hashes)
+    log(f"\nIncremental run: {len(changes['dirty'])} new/changed sheets, {len(changes['clean'])} unchanged "
+        f"({sheets_from_cache} loaded from cache)")
+    for sheet in changes["dirty"]:
+        log(f"  - changed: {sheet}")
+
+    PIPELINE_LOG.event("normalize_sources", seconds=time.perf_counter() - start,
+                       rows=sum(m["row_count"] for m in all_pre_metrics.values()),
+                       sheets=len(all_pre_metrics), from_cache=sheets_from_cache)
+
+    return {
+        "pre_metrics": all_pre_metrics,
+        "post_metrics": all_post_metrics,
+        "normalized_dfs": all_normalized_dfs,
+        "cache_keys": cache_keys,
+        "dtype_summary": dtype_summary,
+        "sheet_hashes": sheet_hashes
+    }
+
+
+def normalized_frame(state: Dict, sheet_name: str) -> pd.DataFrame:
+    """A normalized sheet from the state of normalize_sources(), read from the cache if not held in memory."""
+    if sheet_name in state["normalized_dfs"]:
+        return state["normalized_dfs"][sheet_name]
+    cached = load_cached_sheet(state["cache_keys"][sheet_name])
+    if cached is None or cached[0] is None:
+        raise ValueError(f"[{sheet_name}] Normalized frame is neither in memory nor in the cache "
+                         f"({state['cache_keys'][sheet_name][:12]}); rerun Phase 1c")
+    return cached[0]
 
-        # Ingest
-        df, pre_metrics = ingest_sheet(xl_cfr, sheet_name)
-        all_pre_metrics[sheet_name] = pre_metrics
-
-        # Apply approved rules
-        df = apply_rule_1(df, sheet_name)
-        df = apply_rule_4(df, sheet_name)
-        df = apply_rule_5(df, sheet_name)
-
-        # Generate post-metrics
-        post_metrics = generate_post_metrics(df, sheet_name)
-        all_post_metrics[sheet_name] = post_metrics
-        all_normalized_dfs[sheet_name] = df
-
-        # Record dtype changes
-        for col in df.columns:
-            pre_dtype = pre_metrics["dtypes"].get(col, "N/A")
-            post_dtype = str(df[col].dtype)
-
-            dtype_summary.append({
-                "sheet": sheet_name,
-                "column": col,
-                "pre_dtype": pre_dtype,
-                "post_dtype": post_dtype,
-                "changed": pre_dtype != post_dtype
-            })
-
-        # Validate
-        all_invariant_checks.extend(validate_invariants(pre_metrics, post_metrics, sheet_name))
-        all_sum_checks.extend(validate_sums(pre_metrics, post_metrics, sheet_name))
+
+def generate_qc_outputs(state: Dict) -> Dict:
+    """
+    Write the Phase 1c QC outputs (08-11) from the state of normalize_sources().
+
+    Returns:
+        Dict with keys: normalized_dfs, qc_passed, execution_log
+    """
+    start = time.perf_counter()
+    all_normalized_dfs = state["normalized_dfs"]
+    dtype_summary = state["dtype_summary"]
+
+    # All pre/post invariants of all sheets, evaluated over one metrics table
+    metrics = metrics_table(state["pre_metrics"], state["post_metrics"], COLUMN_RENAMES)
+    rule_results = evaluate_rules(metrics, INVARIANT_RULES)
 
     # ==========================================================================
     # GENERATE QC OUTPUTS
@@ -419,7 +760,7 @@ def main():
     # 1. Post-normalization dtype summary
     dtype_df = pd.DataFrame(dtype_summary)
     dtype_path = os.path.join(QC_OUTPUT_DIR, "08_post_normalization_dtype_summary.csv")
-    dtype_df.to_csv(dtype_path, index=False)
+    qc_written = write_csv_if_changed(dtype_df, dtype_path)
     log(f"\nSaved: {dtype_path}")
 
     # Show dtype changes
@@ -429,9 +770,9 @@ def main():
         print(changed_dtypes.to_string(index=False))
 
     # 2. Pre/post sum reconciliation
-    sum_df = pd.DataFrame(all_sum_checks)
+    sum_df = sum_report(rule_results)
     sum_path = os.path.join(QC_OUTPUT_DIR, "09_pre_post_sum_reconciliation.csv")
-    sum_df.to_csv(sum_path, index=False)
+    qc_written += write_csv_if_changed(sum_df, sum_path)
     log(f"\nSaved: {sum_path}")
 
     # Show reconciliation results
@@ -439,9 +780,9 @@ def main():
     print(sum_df.to_string(index=False))
 
     # 3. Invariant check summary
-    invariant_df = pd.DataFrame(all_invariant_checks)
+    invariant_df = invariant_report(rule_results)
     invariant_path = os.path.join(QC_OUTPUT_DIR, "10_invariant_checks.csv")
-    invariant_df.to_csv(invariant_path, index=False)
+    qc_written += write_csv_if_changed(invariant_df, invariant_path)
     log(f"\nSaved: {invariant_path}")
 
     # Check for failures
@@ -476,88 +817,18 @@ def main():
     log("P&L SUMMARY CROSS-VALIDATION")
     log("=" * 70)
 
-    pnl_summary = all_normalized_dfs["P&L Summary"]
-
-    # Get expected values from P&L Summary
-    def get_pnl_value(label):
-        row = pnl_summary[pnl_summary["p_l_summary"] == label]
-        if not row.empty:
-            return float(row["2018_total"].values[0])
-        return None
-
-    cross_validations = []
-
-    # Revenue cross-validation
-    recurring_expected = get_pnl_value("Recurring")
-    recurring_actual = all_normalized_dfs["RecurringRevenue"]["2018_total"].sum()
-    cross_validations.append({
-        "category": "Recurring Revenue",
-        "pnl_summary_value": recurring_expected,
-        "computed_value": recurring_actual,
-        "difference": abs(recurring_actual - recurring_expected) if recurring_expected else None,
-        "status": "PASS" if recurring_expected and abs(recurring_actual - recurring_expected) < 0.01 else "FAIL"
-    })
-
-    pso_expected = get_pnl_value("PSO")
-    pso_actual = all_normalized_dfs["PSORevenue"]["2018_total"].sum()
-    cross_validations.append({
-        "category": "PSO Revenue",
-        "pnl_summary_value": pso_expected,
-        "computed_value": pso_actual,
-        "difference": abs(pso_actual - pso_expected) if pso_expected else None,
-        "status": "PASS" if pso_expected and abs(pso_actual - pso_expected) < 0.01 else "FAIL"
-    })
-
-    perpetual_expected = get_pnl_value("Perpetual")
-    perpetual_actual = all_normalized_dfs["PerpetualRevenue"]["2018_total"].sum()
-    cross_validations.append({
-        "category": "Perpetual Revenue",
-        "pnl_summary_value": perpetual_expected,
-        "computed_value": perpetual_actual,
-        "difference": abs(perpetual_actual - perpetual_expected) if perpetual_expected else None,
-        "status": "PASS" if perpetual_expected and abs(perpetual_actual - perpetual_expected) < 0.01 else "FAIL"
-    })
-
-    # Expense cross-validation
-    hc_expected = get_pnl_value("HC Expense (W2)")
-    hc_actual = all_normalized_dfs["Empl."]["2018_total"].sum()
-    cross_validations.append({
-        "category": "HC Expense (W2)",
-        "pnl_summary_value": hc_expected,
-        "computed_value": hc_actual,
-        "difference": abs(hc_actual - hc_expected) if hc_expected else None,
-        "status": "PASS" if hc_expected and abs(hc_actual - hc_expected) < 0.01 else "FAIL"
-    })
-
-    opex_expected = get_pnl_value("Non HC Expense (OPEX)")
-    opex_actual = all_normalized_dfs["OPEX - NEmpl."]["2018_total"].sum()
-    cross_validations.append({
-        "category": "Non HC Expense (OPEX)",
-        "pnl_summary_value": opex_expected,
-        "computed_value": opex_actual,
-        "difference": abs(opex_actual - opex_expected) if opex_expected else None,
-        "status": "PASS" if opex_expected and abs(opex_actual - opex_expected) < 0.01 else "FAIL"
-    })
-
-    cogs_expected = get_pnl_value("Non HC Expense (COGS)")
-    cogs_actual = all_normalized_dfs["COGS - NEmpl."]["2018_total"].sum()
-    cross_validations.append({
-        "category": "Non HC Expense (COGS)",
-        "pnl_summary_value": cogs_expected,
-        "computed_value": cogs_actual,
-        "difference": abs(cogs_actual - cogs_expected) if cogs_expected else None,
-        "status": "PASS" if cogs_expected and abs(cogs_actual - cogs_expected) < 0.01 else "FAIL"
-    })
-
-    cross_df = pd.DataFrame(cross_validations)
+    # P&L Summary value of each label (first occurrence)
+    pnl_values = pnl_reference_values(normalized_frame(state, "P&L Summary"))
+
+    cross_df = evaluate_tieouts(metrics, pnl_values, PNL_TIEOUTS, TIEOUT_TOLERANCE)
     cross_path = os.path.join(QC_OUTPUT_DIR, "11_pnl_cross_validation.csv")
-    cross_df.to_csv(cross_path, index=False)
+    qc_written += write_csv_if_changed(cross_df, cross_path)
     log(f"\nSaved: {cross_path}")
 
     log("\nP&L Cross-Validation Results:")
     print(cross_df.to_string(index=False))
 
-    all_cross_pass = all(cv["status"] == "PASS" for cv in cross_validations)
+    all_cross_pass = bool((cross_df["status"] == "PASS").all())
 
     # ==========================================================================
     # FINAL STATUS
@@ -566,6 +837,10 @@ def main():
     log("\n" + "=" * 70)
     log("PHASE 1c EXECUTION COMPLETE")
     log("=" * 70)
+    log(f"QC files rewritten: {qc_written} of 4 (unchanged files left as-is)")
+
+    # Sheet hashes of this run, for the next run's change report
+    save_manifest("phase1c", state["sheet_hashes"])
 
     all_pass = len(failed_invariants) == 0 and len(failed_sums) == 0 and all_cross_pass
 
@@ -576,6 +851,10 @@ def main():
     else:
         log("\n✗ SOME QC CHECKS FAILED - REVIEW REQUIRED", "WARNING")
 
+    PIPELINE_LOG.event("qc_outputs", seconds=time.perf_counter() - start, rows=len(rule_results),
+                       passed=all_pass)
+    PIPELINE_LOG.flush()
+
     # Return results for external use
     return {
         "normalized_dfs": all_normalized_dfs,
@@ -584,10 +863,22 @@ def main():
     }
 
 
-if __name__ == "__main__":
-    results = main()
+def main(stream: bool = False, memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB, use_cache: bool = True,
+         reader: str = DEFAULT_READER, pnl_source: str = INPUT_PL_FILE, cfr_source: str = CENTRAL_FINANCE_FILE,
+         money_mode: str = DEFAULT_MONEY_MODE, chunked: bool = False):
+    """Main execution function."""
+    state = normalize_sources(stream, memory_limit_mb, use_cache, reader, pnl_source, cfr_source,
+                              money_mode=money_mode, chunked=chunked)
+    return generate_qc_outputs(state)
+
 
-    # Save execution log
+def write_execution_log(results: Dict) -> str:
+    """
+    Write notes/phase_1c_execution_log.md from the results of main(); returns its path.
+
+    The Markdown log is a rendered view of the run: its message lines, then
+    the timing summary of its events (all events are in PIPELINE_LOG.events_path).
+    """
     log_path = "notes/phase_1c_execution_log.md"
     with open(log_path, "w") as f:
         f.write("# Phase 1c Execution Log\n\n")
@@ -604,7 +895,46 @@ if __name__ == "__main__":
         for entry in results["execution_log"]:
             f.write(entry + "\n")
         f.write("```\n\n")
+        f.write("## Timings\n\n")
+        f.write(PIPELINE_LOG.timing_markdown())
+        f.write(f"\nAll events: `{PIPELINE_LOG.events_path}`\n\n")
         f.write("## QC Status\n\n")
         f.write(f"**All checks passed: {results['qc_passed']}**\n")
 
-    print(f"\nExecution log saved to: {log_path}")
+    return log_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Phase 1c: approved normalization rules + QC")
+    parser.add_argument("--stream", action="store_true",
+                        help="Parse sheets with openpyxl read-only iteration in chunks; the normalized frames are "
+                             "still held in full (use --chunked for sheets larger than memory)")
+    parser.add_argument("--memory-limit-mb", type=float, default=STREAM_MEMORY_LIMIT_MB,
+                        help="Memory budget per streamed chunk (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore and do not write the normalized frame cache")
+    parser.add_argument("--reader", default=DEFAULT_READER, choices=["auto"] + list(READER_BACKENDS),
+                        help="Excel reader backend (default: %(default)s = calamine if installed, else openpyxl)")
+    parser.add_argument("--pnl-source", default=INPUT_PL_FILE,
+                        help="Input P&L workbook, or a CSV/Parquet/JSONL export (or directory of exports) of its sheets")
+    parser.add_argument("--cfr-source", default=CENTRAL_FINANCE_FILE,
+                        help="Central Finance Roles workbook, or a CSV/Parquet/JSONL export of it")
+    parser.add_argument("--money-mode", default=DEFAULT_MONEY_MODE, choices=MONEY_MODES,
+                        help="How reconciliation sums are totalled: float64, or exact int64 cents (default: %(default)s)")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Apply the rules chunk by chunk with running metrics, writing normalized frames "
+                             "to the cache (for sheets larger than memory)")
+    args = parser.parse_args()
+    if args.chunked and args.no_cache:
+        parser.error("--chunked writes normalized frames to the cache and cannot be combined with --no-cache")
+
+    with buffered_console():
+        results = main(stream=args.stream, memory_limit_mb=args.memory_limit_mb, use_cache=not args.no_cache,
+                       reader=args.reader, pnl_source=args.pnl_source, cfr_source=args.cfr_source,
+                       money_mode=args.money_mode, chunked=args.chunked)
+
+        log_path = write_execution_log(results)
+
+        print(f"\nExecution log saved to: {log_path}")
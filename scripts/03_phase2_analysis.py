@@ -17,7 +17,22 @@ import pandas as pd
 import numpy as np
 import os
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from ledger_io import (
+    sheet_content_hashes, normalized_sheet_definition, sheet_cache_key, INGESTION_PATHS,
+    load_cached_sheet, save_cached_sheet,
+    DEFAULT_READER, READER_BACKENDS, open_workbook, read_raw_sheet, input_format
+)
+from money import MONEY_MODES, DEFAULT_MONEY_MODE, money_total
+from dimensions import STORAGE_MODES, DEFAULT_STORAGE_MODE, store_dimensions, dimension_memory
+from pipeline_log import PipelineLog, buffered_console
+from qc_rules import pnl_reference_values, evaluate_detail_tieouts
+from ledger_analytics import (
+    build_fact_table, fact_totals, sheet_totals, negative_metrics, NEGATIVE_METRICS,
+    expense_cube, expense_cube_key, CUBE_SHEETS, ExpenseCube, offset_ratios, offset_bucket_summary,
+    evaluate_benchmarks, unmapped_benchmark_lines
+)
 
 # =============================================================================
 # CONFIGURATION
@@ -38,62 +53,199 @@ SHEET_CONFIG = {
     "PerpetualRevenue": {"header": 2, "cols": ["tier", "type", "customer_name", "2018_total"]},
 }
 
+# CSV / Parquet / JSONL exports of these sheets carry their header on row 0
+EXPORT_HEADER_ROW = 0
+
+# Reconciliation checks: detail sheet totals vs P&L Summary lines (see
+# qc_rules.py for the tie-out map format; add entries here, not code)
+RECONCILIATION_TOLERANCE = 0.01
+REVENUE_SHEETS = ["RecurringRevenue", "PSORevenue", "PerpetualRevenue"]
+RECONCILIATION_TIEOUTS = [
+    {"check": "Recurring Revenue", "label": "Recurring", "sheet": "RecurringRevenue", "column": "2018_total"},
+    {"check": "PSO Revenue", "label": "PSO", "sheet": "PSORevenue", "column": "2018_total"},
+    {"check": "Perpetual Revenue", "label": "Perpetual", "sheet": "PerpetualRevenue", "column": "2018_total"},
+    {"check": "Total Revenue", "label": "Revenue", "sheet": REVENUE_SHEETS, "column": "2018_total"},
+    {"check": "HC Expense (W2)", "label": "HC Expense (W2)", "sheet": "Empl.", "column": "2018_total"},
+    {"check": "Non HC Expense (OPEX)", "label": "Non HC Expense (OPEX)", "sheet": "OPEX - NEmpl.", "column": "2018_total"},
+    {"check": "Non HC Expense (COGS)", "label": "Non HC Expense (COGS)", "sheet": "COGS - NEmpl.", "column": "2018_total"}
+]
+
+# Benchmark evaluation: each Benchmarks line -> the expense lines it is
+# compared with (see ledger_analytics.py for the map format; add entries
+# here, not code). Entries with a "signal" are also reported as out-of-model
+# signals when adverse on the net basis; the signal's evidence amount is the
+# total of the entry's lines, or of its "evidence_sheets" lines only.
+# The Benchmarks sheet's Expense Total (30%) is the sum of the function lines
+# and its Margin (70%) is 100% less that, so both are evaluated on the union
+# of the function entries' lines, not on every expense sheet (which would
+# include e.g. Cost of Product / PSO and compare ~91% with 30%).
+NONHC_SHEETS = ["OPEX - NEmpl.", "COGS - NEmpl."]
+BENCHMARK_FUNCTION_AREAS = ["G&A", "S&M", "R&D", "Technical Support", "Hosting"]
+BENCHMARK_MAP = [
+    {"area": "G&A", "lines": ["Shared Services", "Executive team"], "sheets": ["OPEX - NEmpl."],
+     "filters": {"function_l2": ["G&A"]}, "signal": {"area": "OPEX - G&A", "evidence": "OPEX G&A total"}},
+    {"area": "S&M", "lines": ["Sales", "Marketing"], "sheets": NONHC_SHEETS,
+     "filters": {"function_l2": ["S&M"]}, "signal": {"area": "S&M", "evidence": "OPEX S&M", "evidence_sheets": ["OPEX - NEmpl."]}},
+    {"area": "R&D", "lines": ["Engineering", "Product"], "sheets": ["OPEX - NEmpl."],
+     "filters": {"function_l2": ["R&D"]}, "signal": {"area": "R&D", "evidence": "OPEX R&D"}},
+    {"area": "Technical Support", "lines": ["Technical Support"], "sheets": NONHC_SHEETS,
+     "filters": {"department": ["Technical Support"]}},
+    {"area": "Hosting", "lines": ["Hosting"], "sheets": NONHC_SHEETS,
+     "filters": {"expense_category": ["Hosting"]}},
+    {"area": "Expense Total", "lines": ["Expense Total"], "union": BENCHMARK_FUNCTION_AREAS},
+    {"area": "Margin", "lines": ["Margin"], "union": BENCHMARK_FUNCTION_AREAS, "measure": "margin"}
+]
+BENCHMARK_EVALUATION_FILE = "05_benchmark_evaluation.csv"
+
+# Negative-pattern flag thresholds (classify_negative_patterns / generate_flag_register)
+FLAG_THRESHOLDS = {
+    "materiality_pct": 10,              # sheet negatives above this % of its absolute total: Material
+    "concentration_pct": 10,            # category / department negatives above this % ...
+    "min_neg_count": 1,                 # ... over more than this many lines: Systematic
+    "top_departments": 3,               # department flags per sheet, largest negative sums first
+    "department_min_neg_sum": 100000    # department flags only above this absolute negative sum
+}
+
+# Threshold sensitivity sweep (--sweep): every combination of these values
+# is evaluated against the negative-value metrics of one run
+FLAG_SWEEP_GRID = {
+    "materiality_pct": [0, 2.5, 5, 7.5, 10, 12.5, 15, 20, 25, 30, 40, 50],
+    "concentration_pct": [0, 2.5, 5, 7.5, 10, 12.5, 15, 20, 25, 30, 40, 50],
+    "min_neg_count": [0, 1, 2, 3, 5, 10],
+    "top_departments": [1, 2, 3, 5, 10],
+    "department_min_neg_sum": [0, 25000, 50000, 100000, 250000, 500000, 1000000]
+}
+# Grid combinations evaluated per broadcast block
+SWEEP_BLOCK_ROWS = 4096
+FLAG_SWEEP_FILE = "06_flag_threshold_sweep.csv"
+
+# Offset ratio table (gross vs net per function_l2 x expense_category x department)
+OFFSET_RATIOS_FILE = "04_offset_ratios.csv"
+
+# Timed events of each run (outputs/logs/phase_2.jsonl)
+PIPELINE_LOG = PipelineLog("phase_2")
+
+# Rule 1 numeric columns
+NUMERIC_COLUMNS = ["2018_total", "benchmark"]
+
 # =============================================================================
 # DATA LOADING (Using Phase 1 normalized approach)
 # =============================================================================
 
-def load_normalized_data() -> Dict[str, pd.DataFrame]:
-    """Load all sheets with Phase 1c normalization applied."""
-    xl = pd.ExcelFile(INPUT_PL_FILE)
+def apply_normalization_rules(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """
+    Phase 1c's approved rules on the data rows of a raw sheet: Rule 4 (the
+    SHEET_CONFIG column names), Rule 1 (NUMERIC_COLUMNS to numeric) and
+    Rule 5 (string columns kept as-is).
+    """
+    # Apply Rule 4: Rename columns (already in config)
+    df.columns = columns
+    df = df.reset_index(drop=True)
+
+    # Apply Rule 1: Convert numeric columns
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    return df
+
+
+def normalized_sheet_keys(source: str = INPUT_PL_FILE, sheets: Optional[List[str]] = None,
+                          ingestion_paths: List[str] = INGESTION_PATHS[:1]) -> Dict[str, List[str]]:
+    """
+    Normalized frame cache keys of each sheet of `source` (default: every
+    SHEET_CONFIG sheet), one per ingestion path in `ingestion_paths`: its
+    content hash + normalization definition + path, as Phase 1c keys the
+    same sheets.
+    """
+    sheets = sheets or list(SHEET_CONFIG)
+    sheet_hashes = sheet_content_hashes(source, sheets)
+    is_export = input_format(source) != "excel"
+    keys = {}
+    for sheet_name in sheets:
+        config = SHEET_CONFIG[sheet_name]
+        header_row = EXPORT_HEADER_ROW if is_export else config["header"]
+        definition = normalized_sheet_definition(header_row, config["cols"], NUMERIC_COLUMNS)
+        keys[sheet_name] = [sheet_cache_key(sheet_hashes[sheet_name], sheet_name, definition, path)
+                            for path in ingestion_paths]
+    return keys
+
+
+def load_normalized_data(use_cache: bool = True, reader: str = DEFAULT_READER,
+                         source: str = INPUT_PL_FILE) -> Dict[str, pd.DataFrame]:
+    """
+    Load all sheets with Phase 1c normalization applied.
+
+    Sheets already normalized by Phase 1c (same sheet content, same
+    header/column definitions) are read from the normalized frame cache,
+    whichever ingestion path built the entry (the frames are the same; only
+    Phase 1c's cached metrics can differ); the rest are parsed with the
+    `reader` backend, normalized here and added to the cache as "full". `source` is the Input P&L workbook or a directory
+    of CSV / Parquet / JSONL exports of its sheets.
+    """
+    xl = None
+    sheet_keys = normalized_sheet_keys(source, ingestion_paths=INGESTION_PATHS)
+    is_export = input_format(source) != "excel"
     data = {}
 
     for sheet_name, config in SHEET_CONFIG.items():
-        df_raw = pd.read_excel(xl, sheet_name=sheet_name, header=None)
-        df = df_raw.iloc[config["header"] + 1:].copy()
-        df.columns = config["cols"]
-        df = df.reset_index(drop=True)
-
-        # Apply Rule 1: Convert numeric columns
-        if "2018_total" in df.columns:
-            df["2018_total"] = pd.to_numeric(df["2018_total"], errors='coerce')
-        if "benchmark" in df.columns:
-            df["benchmark"] = pd.to_numeric(df["benchmark"], errors='coerce')
-
-        # Apply Rule 4: Rename columns (already in config)
+        header_row = EXPORT_HEADER_ROW if is_export else config["header"]
+        key = sheet_keys[sheet_name][0]
+
+        if use_cache:
+            for path_key in sheet_keys[sheet_name]:
+                cached = load_cached_sheet(path_key)
+                if cached is not None and cached[0] is not None:
+                    data[sheet_name] = cached[0]
+                    break
+            if sheet_name in data:
+                continue
+
+        if xl is None:
+            xl = open_workbook(source, reader)
+
+        df_raw = read_raw_sheet(xl, sheet_name)
+        df = apply_normalization_rules(df_raw.iloc[header_row + 1:].copy(), config["cols"])
         data[sheet_name] = df
 
+        if use_cache:
+            save_cached_sheet(key, df, {})
+
     return data
 
 # =============================================================================
 # 1. P&L OVERVIEW
 # =============================================================================
 
-def generate_pnl_overview(data: Dict[str, pd.DataFrame]) -> Dict:
-    """Generate high-level P&L overview from normalized data."""
+def generate_pnl_overview(data: Dict[str, pd.DataFrame], money_mode: str = DEFAULT_MONEY_MODE) -> Dict:
+    """
+    Generate high-level P&L overview from normalized data.
 
-    pnl = data["P&L Summary"]
+    Every total (and total of totals) is taken in `money_mode`; with "exact"
+    they are exact to the cent, so the reconciliation checks compare exact
+    figures against the P&L Summary.
+    """
+
+    pnl_values = pnl_reference_values(data["P&L Summary"])
 
     def get_value(label):
-        row = pnl[pnl["p_l_summary"] == label]
-        if not row.empty:
-            return float(row["2018_total"].values[0])
-        return None
+        return float(pnl_values[label]) if label in pnl_values.index else None
 
     # Revenue breakdown
-    recurring_revenue = data["RecurringRevenue"]["2018_total"].sum()
-    pso_revenue = data["PSORevenue"]["2018_total"].sum()
-    perpetual_revenue = data["PerpetualRevenue"]["2018_total"].sum()
-    total_revenue = recurring_revenue + pso_revenue + perpetual_revenue
+    recurring_revenue = money_total(data["RecurringRevenue"]["2018_total"], money_mode)
+    pso_revenue = money_total(data["PSORevenue"]["2018_total"], money_mode)
+    perpetual_revenue = money_total(data["PerpetualRevenue"]["2018_total"], money_mode)
+    total_revenue = money_total([recurring_revenue, pso_revenue, perpetual_revenue], money_mode)
 
     # Expense breakdown
-    hc_expense = data["Empl."]["2018_total"].sum()
-    opex_nonhc = data["OPEX - NEmpl."]["2018_total"].sum()
-    cogs_nonhc = data["COGS - NEmpl."]["2018_total"].sum()
-    total_nonhc = opex_nonhc + cogs_nonhc
-    total_expense = hc_expense + total_nonhc
+    hc_expense = money_total(data["Empl."]["2018_total"], money_mode)
+    opex_nonhc = money_total(data["OPEX - NEmpl."]["2018_total"], money_mode)
+    cogs_nonhc = money_total(data["COGS - NEmpl."]["2018_total"], money_mode)
+    total_nonhc = money_total([opex_nonhc, cogs_nonhc], money_mode)
+    total_expense = money_total([hc_expense, total_nonhc], money_mode)
 
     # Margins
-    gross_margin = total_revenue - total_expense
+    gross_margin = money_total([total_revenue, -total_expense], money_mode)
     gross_margin_pct = (gross_margin / total_revenue * 100) if total_revenue != 0 else 0
 
     # P&L Summary reference values
@@ -130,86 +282,40 @@ def generate_pnl_overview(data: Dict[str, pd.DataFrame]) -> Dict:
 # 2. RECONCILIATION CHECKS
 # =============================================================================
 
-def perform_reconciliation_checks(data: Dict[str, pd.DataFrame], overview: Dict) -> List[Dict]:
-    """Check internal consistency between detail sheets and P&L Summary."""
-
-    checks = []
-    pnl = data["P&L Summary"]
-
-    def get_pnl_value(label):
-        row = pnl[pnl["p_l_summary"] == label]
-        if not row.empty:
-            return float(row["2018_total"].values[0])
-        return None
-
-    tolerance = 0.01
-
-    # Revenue checks
-    checks.append({
-        "check": "Recurring Revenue",
-        "pnl_summary": get_pnl_value("Recurring"),
-        "computed": overview["revenue"]["recurring"],
-        "difference": abs(overview["revenue"]["recurring"] - get_pnl_value("Recurring")),
-        "status": "RECONCILED" if abs(overview["revenue"]["recurring"] - get_pnl_value("Recurring")) < tolerance else "DISCREPANCY"
-    })
-
-    checks.append({
-        "check": "PSO Revenue",
-        "pnl_summary": get_pnl_value("PSO"),
-        "computed": overview["revenue"]["pso"],
-        "difference": abs(overview["revenue"]["pso"] - get_pnl_value("PSO")),
-        "status": "RECONCILED" if abs(overview["revenue"]["pso"] - get_pnl_value("PSO")) < tolerance else "DISCREPANCY"
-    })
-
-    checks.append({
-        "check": "Perpetual Revenue",
-        "pnl_summary": get_pnl_value("Perpetual"),
-        "computed": overview["revenue"]["perpetual"],
-        "difference": abs(overview["revenue"]["perpetual"] - get_pnl_value("Perpetual")),
-        "status": "RECONCILED" if abs(overview["revenue"]["perpetual"] - get_pnl_value("Perpetual")) < tolerance else "DISCREPANCY"
-    })
-
-    checks.append({
-        "check": "Total Revenue",
-        "pnl_summary": get_pnl_value("Revenue"),
-        "computed": overview["revenue"]["total_computed"],
-        "difference": abs(overview["revenue"]["total_computed"] - get_pnl_value("Revenue")),
-        "status": "RECONCILED" if abs(overview["revenue"]["total_computed"] - get_pnl_value("Revenue")) < tolerance else "DISCREPANCY"
-    })
-
-    # Expense checks
-    checks.append({
-        "check": "HC Expense (W2)",
-        "pnl_summary": get_pnl_value("HC Expense (W2)"),
-        "computed": overview["expenses"]["hc_w2"],
-        "difference": abs(overview["expenses"]["hc_w2"] - get_pnl_value("HC Expense (W2)")),
-        "status": "RECONCILED" if abs(overview["expenses"]["hc_w2"] - get_pnl_value("HC Expense (W2)")) < tolerance else "DISCREPANCY"
-    })
-
-    checks.append({
-        "check": "Non HC Expense (OPEX)",
-        "pnl_summary": get_pnl_value("Non HC Expense (OPEX)"),
-        "computed": overview["expenses"]["nonhc_opex"],
-        "difference": abs(overview["expenses"]["nonhc_opex"] - get_pnl_value("Non HC Expense (OPEX)")),
-        "status": "RECONCILED" if abs(overview["expenses"]["nonhc_opex"] - get_pnl_value("Non HC Expense (OPEX)")) < tolerance else "DISCREPANCY"
-    })
-
-    checks.append({
-        "check": "Non HC Expense (COGS)",
-        "pnl_summary": get_pnl_value("Non HC Expense (COGS)"),
-        "computed": overview["expenses"]["nonhc_cogs"],
-        "difference": abs(overview["expenses"]["nonhc_cogs"] - get_pnl_value("Non HC Expense (COGS)")),
-        "status": "RECONCILED" if abs(overview["expenses"]["nonhc_cogs"] - get_pnl_value("Non HC Expense (COGS)")) < tolerance else "DISCREPANCY"
-    })
-
-    return checks
+def perform_reconciliation_checks(data: Dict[str, pd.DataFrame],
+                                  money_mode: str = DEFAULT_MONEY_MODE) -> List[Dict]:
+    """
+    Check internal consistency between detail sheets and P&L Summary.
+
+    The RECONCILIATION_TIEOUTS map is evaluated in one pass (see
+    qc_rules.evaluate_detail_tieouts), with totals taken in `money_mode`.
+    """
+    reference_values = pnl_reference_values(data["P&L Summary"])
+    results = evaluate_detail_tieouts(data, reference_values, RECONCILIATION_TIEOUTS,
+                                      RECONCILIATION_TOLERANCE, money_mode)
+
+    return pd.DataFrame({
+        "check": results["check"],
+        "pnl_summary": results["pnl_summary"],
+        "computed": results["computed"],
+        "difference": results["difference"],
+        "status": np.where(results["reconciled"], "RECONCILED", "DISCREPANCY")
+    }).to_dict("records")
 
 # =============================================================================
 # 3. NEGATIVE VALUE ANALYSIS
 # =============================================================================
 
-def analyze_negative_values(data: Dict[str, pd.DataFrame]) -> Dict:
-    """Analyze negative value patterns across all sheets."""
+def analyze_negative_values(data: Dict[str, pd.DataFrame], fact: Optional[pd.DataFrame] = None,
+                            money_mode: str = DEFAULT_MONEY_MODE) -> Dict:
+    """
+    Analyze negative value patterns across all sheets.
+
+    The metrics of every sheet, category and department come from one
+    grouped computation per dimension over the fact table
+    (ledger_analytics.negative_metrics), with sums taken in `money_mode`;
+    `fact` is built here when not given.
+    """
 
     negative_analysis = {}
 
@@ -222,83 +328,53 @@ def analyze_negative_values(data: Dict[str, pd.DataFrame]) -> Dict:
         ("PerpetualRevenue", "type", None),
     ]
 
+    if fact is None:
+        fact = build_fact_table(data)
+
+    # Every sheet x dimension value at once: sheet level, then one pass per dimension column
+    by_sheet = negative_metrics(fact, money_mode=money_mode)
+    dimensions = {col for _, category_col, subcategory_col in sheets_to_analyze
+                  for col in (category_col, subcategory_col) if col}
+    by_dimension = {col: negative_metrics(fact, [col], money_mode) for col in sorted(dimensions)}
+
+    def breakdown(sheet_name: str, col: str) -> Dict:
+        metrics = by_dimension[col]
+        if sheet_name not in metrics.index.get_level_values(0):
+            return {}
+        metrics = metrics.xs(sheet_name, level=0)
+        # Column-wise, so neg_count stays an integer
+        values = {metric: metrics[metric].tolist() for metric in NEGATIVE_METRICS}
+        return {key: {metric: values[metric][i] for metric in NEGATIVE_METRICS}
+                for i, key in enumerate(metrics.index)}
+
     for sheet_name, category_col, subcategory_col in sheets_to_analyze:
         df = data[sheet_name]
-        total_col = "2018_total"
-
-        # Overall metrics
-        total_rows = len(df)
-        total_sum = df[total_col].sum()
-        total_abs_sum = df[total_col].abs().sum()
-
-        # Negative value metrics
-        neg_mask = df[total_col] < 0
-        neg_count = neg_mask.sum()
-        neg_sum = df.loc[neg_mask, total_col].sum()
-        neg_abs_sum = df.loc[neg_mask, total_col].abs().sum()
-
-        # Percentage of category affected
-        neg_pct_of_total = (neg_abs_sum / total_abs_sum * 100) if total_abs_sum != 0 else 0
+        sheet = by_sheet.loc[sheet_name] if sheet_name in by_sheet.index else pd.Series(0.0, index=NEGATIVE_METRICS)
 
         sheet_analysis = {
-            "total_rows": total_rows,
-            "total_sum": total_sum,
-            "total_abs_sum": total_abs_sum,
-            "negative_count": neg_count,
-            "negative_sum": neg_sum,
-            "negative_abs_sum": neg_abs_sum,
-            "negative_pct_of_abs_total": neg_pct_of_total,
+            "total_rows": len(df),
+            "total_sum": sheet["total"],
+            "total_abs_sum": sheet["abs_total"],
+            "negative_count": int(sheet["neg_count"]),
+            "negative_sum": sheet["neg_sum"],
+            "negative_abs_sum": sheet["neg_abs_sum"],
+            "negative_pct_of_abs_total": sheet["neg_pct"],
             "by_category": {}
         }
 
         # Breakdown by category
         if category_col and category_col in df.columns:
-            for cat in df[category_col].dropna().unique():
-                cat_df = df[df[category_col] == cat]
-                cat_total = cat_df[total_col].sum()
-                cat_abs_total = cat_df[total_col].abs().sum()
-                cat_neg_mask = cat_df[total_col] < 0
-                cat_neg_count = cat_neg_mask.sum()
-                cat_neg_sum = cat_df.loc[cat_neg_mask, total_col].sum()
-                cat_neg_abs = cat_df.loc[cat_neg_mask, total_col].abs().sum()
-                cat_neg_pct = (cat_neg_abs / cat_abs_total * 100) if cat_abs_total != 0 else 0
-
-                sheet_analysis["by_category"][cat] = {
-                    "total": cat_total,
-                    "abs_total": cat_abs_total,
-                    "neg_count": cat_neg_count,
-                    "neg_sum": cat_neg_sum,
-                    "neg_abs_sum": cat_neg_abs,
-                    "neg_pct": cat_neg_pct
-                }
+            sheet_analysis["by_category"] = breakdown(sheet_name, category_col)
 
         # Breakdown by subcategory (department) if applicable
         if subcategory_col and subcategory_col in df.columns:
-            sheet_analysis["by_department"] = {}
-            for dept in df[subcategory_col].dropna().unique():
-                dept_df = df[df[subcategory_col] == dept]
-                dept_total = dept_df[total_col].sum()
-                dept_abs_total = dept_df[total_col].abs().sum()
-                dept_neg_mask = dept_df[total_col] < 0
-                dept_neg_count = dept_neg_mask.sum()
-                dept_neg_sum = dept_df.loc[dept_neg_mask, total_col].sum()
-                dept_neg_abs = dept_df.loc[dept_neg_mask, total_col].abs().sum()
-                dept_neg_pct = (dept_neg_abs / dept_abs_total * 100) if dept_abs_total != 0 else 0
-
-                sheet_analysis["by_department"][dept] = {
-                    "total": dept_total,
-                    "abs_total": dept_abs_total,
-                    "neg_count": dept_neg_count,
-                    "neg_sum": dept_neg_sum,
-                    "neg_abs_sum": dept_neg_abs,
-                    "neg_pct": dept_neg_pct
-                }
+            sheet_analysis["by_department"] = breakdown(sheet_name, subcategory_col)
 
         negative_analysis[sheet_name] = sheet_analysis
 
     return negative_analysis
 
-def classify_negative_patterns(negative_analysis: Dict) -> List[Dict]:
+def classify_negative_patterns(negative_analysis: Dict, thresholds: Dict = FLAG_THRESHOLDS) -> List[Dict]:
     """Classify negative patterns as Isolated, Systematic, or Material."""
 
     patterns = []
@@ -309,13 +385,14 @@ def classify_negative_patterns(negative_analysis: Dict) -> List[Dict]:
             continue
 
         # Check materiality at sheet level (>10% threshold)
-        is_material = analysis["negative_pct_of_abs_total"] > 10
+        is_material = analysis["negative_pct_of_abs_total"] > thresholds["materiality_pct"]
 
         # Check for systematic patterns (concentrated in categories)
         systematic_categories = []
         if "by_category" in analysis:
             for cat, cat_data in analysis["by_category"].items():
-                if cat_data["neg_pct"] > 10 and cat_data["neg_count"] > 1:
+                if (cat_data["neg_pct"] > thresholds["concentration_pct"]
+                        and cat_data["neg_count"] > thresholds["min_neg_count"]):
                     systematic_categories.append({
                         "category": cat,
                         "neg_pct": cat_data["neg_pct"],
@@ -327,7 +404,8 @@ def classify_negative_patterns(negative_analysis: Dict) -> List[Dict]:
         systematic_depts = []
         if "by_department" in analysis:
             for dept, dept_data in analysis["by_department"].items():
-                if dept_data["neg_pct"] > 10 and dept_data["neg_count"] > 1:
+                if (dept_data["neg_pct"] > thresholds["concentration_pct"]
+                        and dept_data["neg_count"] > thresholds["min_neg_count"]):
                     systematic_depts.append({
                         "department": dept,
                         "neg_pct": dept_data["neg_pct"],
@@ -353,92 +431,91 @@ def classify_negative_patterns(negative_analysis: Dict) -> List[Dict]:
 
     return patterns
 
+
+def analyze_offset_ratios(cube: ExpenseCube, overview: Dict) -> Dict:
+    """
+    Gross vs net of the non-HC expense lines: offset ratios of every
+    function_l2 x expense_category x department cell, plus the function and
+    function x category rollups and the bucket summary of each function's
+    categories. All come from the expense cube (ledger_analytics.offset_ratios).
+    """
+    revenue = overview["revenue"]["total_computed"]
+    by_category = offset_ratios(cube, ["function_l2", "expense_category"], revenue=revenue)
+
+    return {
+        "cells": offset_ratios(cube, revenue=revenue),
+        "by_function": offset_ratios(cube, ["function_l2"], revenue=revenue),
+        "by_category": by_category,
+        "category_buckets": {
+            (sheet, function): offset_bucket_summary(group)
+            for (sheet, function), group in by_category.groupby(["source_sheet", "function_l2"], sort=False)
+        }
+    }
+
 # =============================================================================
 # 4. OUT-OF-MODEL SIGNAL DETECTION
 # =============================================================================
 
-def detect_out_of_model_signals(data: Dict[str, pd.DataFrame], overview: Dict) -> List[Dict]:
-    """Detect potentially concerning signals."""
-
-    signals = []
-    benchmarks = data["Benchmarks"].set_index("category")["benchmark"].to_dict()
-    total_revenue = overview["revenue"]["total_computed"]
+def _filtered_total(data: Dict[str, pd.DataFrame], sheets: List[str], filters: Dict[str, List],
+                    money_mode: str = DEFAULT_MONEY_MODE) -> float:
+    """
+    Total amount (in `money_mode`) of the lines of `sheets` whose `filters`
+    columns hold one of the listed values.
+    """
+    sheet_totals = []
+    for sheet_name in sheets:
+        df = data[sheet_name]
+        mask = np.ones(len(df), dtype=bool)
+        for col, values in filters.items():
+            mask &= df[col].isin(values).to_numpy()
+        sheet_totals.append(money_total(df.loc[mask, "2018_total"], money_mode))
+    return money_total(sheet_totals, money_mode)
 
-    # 1. Check expense categories against benchmarks
-    expense_categories = {
-        "Shared Services": overview["expenses"]["nonhc_opex"],  # Approximation
-        "Engineering": None,  # Will calculate from details
-        "Technical Support": None,
-        "Hosting": None,
-        "Product": None,
-        "Sales": None,
-        "Marketing": None,
-    }
 
-    # Calculate function-level expenses from OPEX and COGS
-    opex = data["OPEX - NEmpl."]
-    cogs = data["COGS - NEmpl."]
-    empl = data["Empl."]
-
-    # Aggregate by function_l2
-    opex_by_func = opex.groupby("function_l2")["2018_total"].sum()
-    cogs_by_func = cogs.groupby("function_l2")["2018_total"].sum()
-    empl_by_func = empl.groupby("function_l2")["2018_total"].sum()
-
-    # G&A expenses (proxy for Shared Services + Executive)
-    ga_opex = opex_by_func.get("G&A", 0)
-    ga_total = ga_opex
-    ga_pct = (ga_total / total_revenue) if total_revenue else 0
-    shared_services_benchmark = benchmarks.get("Shared Services", 0.045)
-    executive_benchmark = benchmarks.get("Executive team", 0.045)
-    combined_ga_benchmark = shared_services_benchmark + executive_benchmark
-
-    if ga_pct > combined_ga_benchmark:
-        signals.append({
-            "area": "OPEX - G&A",
-            "description": f"G&A expense at {ga_pct*100:.1f}% of revenue",
-            "benchmark": f"{combined_ga_benchmark*100:.1f}%",
-            "actual": f"{ga_pct*100:.1f}%",
-            "variance": f"+{(ga_pct - combined_ga_benchmark)*100:.1f}pp",
-            "evidence": f"OPEX G&A total: ${ga_total:,.0f}"
-        })
+def detect_out_of_model_signals(data: Dict[str, pd.DataFrame], overview: Dict,
+                                benchmark_evaluation: Optional[pd.DataFrame] = None,
+                                money_mode: str = DEFAULT_MONEY_MODE) -> List[Dict]:
+    """
+    Detect potentially concerning signals.
 
-    # S&M expenses
-    sm_opex = opex_by_func.get("S&M", 0)
-    sm_cogs = cogs_by_func.get("S&M", 0) if "S&M" in cogs_by_func else 0
-    sm_total = sm_opex + sm_cogs
-    sm_pct = (sm_total / total_revenue) if total_revenue else 0
-    sales_benchmark = benchmarks.get("Sales", 0.05)
-    marketing_benchmark = benchmarks.get("Marketing", 0.01)
-    sm_benchmark = sales_benchmark + marketing_benchmark
+    `benchmark_evaluation` is the evaluation of BENCHMARK_MAP
+    (ledger_analytics.evaluate_benchmarks); computed here in `money_mode`
+    when not given. Evidence totals are taken in `money_mode`.
+    """
 
-    if sm_pct > sm_benchmark:
-        signals.append({
-            "area": "S&M",
-            "description": f"S&M expense at {sm_pct*100:.1f}% of revenue",
-            "benchmark": f"{sm_benchmark*100:.1f}%",
-            "actual": f"{sm_pct*100:.1f}%",
-            "variance": f"+{(sm_pct - sm_benchmark)*100:.1f}pp",
-            "evidence": f"OPEX S&M: ${sm_opex:,.0f}"
-        })
+    signals = []
+    benchmarks = data["Benchmarks"].set_index("category")["benchmark"].to_dict()
+    total_revenue = overview["revenue"]["total_computed"]
 
-    # R&D expenses
-    rd_opex = opex_by_func.get("R&D", 0)
-    rd_total = rd_opex
-    rd_pct = (rd_total / total_revenue) if total_revenue else 0
-    engineering_benchmark = benchmarks.get("Engineering", 0.10)
-    product_benchmark = benchmarks.get("Product", 0.02)
-    rd_benchmark = engineering_benchmark + product_benchmark
+    # 1. Function expense vs benchmark composites (BENCHMARK_MAP entries with a signal)
+    if benchmark_evaluation is None:
+        benchmark_evaluation = evaluate_benchmarks(build_fact_table(data), data["Benchmarks"], BENCHMARK_MAP,
+                                                   money_mode=money_mode)
+    net = benchmark_evaluation[benchmark_evaluation["basis"] == "net"].set_index("area")
 
-    if rd_pct > rd_benchmark:
-        signals.append({
-            "area": "R&D",
-            "description": f"R&D expense at {rd_pct*100:.1f}% of revenue",
-            "benchmark": f"{rd_benchmark*100:.1f}%",
-            "actual": f"{rd_pct*100:.1f}%",
-            "variance": f"+{(rd_pct - rd_benchmark)*100:.1f}pp",
-            "evidence": f"OPEX R&D: ${rd_opex:,.0f}"
-        })
+    for entry in BENCHMARK_MAP:
+        if "signal" not in entry or entry["area"] not in net.index:
+            continue
+        row = net.loc[entry["area"]]
+        # Skipped when the Benchmarks sheet lacks one of the composite's lines
+        if pd.isna(row["benchmark_pct"]):
+            continue
+        pct = (row["amount"] / total_revenue) if total_revenue else 0
+        benchmark = row["benchmark_pct"] / 100
+        evidence_amount = row["amount"]
+        if "evidence_sheets" in entry["signal"]:
+            evidence_amount = _filtered_total(data, entry["signal"]["evidence_sheets"], entry.get("filters", {}),
+                                              money_mode)
+
+        if pct > benchmark:
+            signals.append({
+                "area": entry["signal"]["area"],
+                "description": f"{entry['area']} expense at {pct*100:.1f}% of revenue",
+                "benchmark": f"{benchmark*100:.1f}%",
+                "actual": f"{pct*100:.1f}%",
+                "variance": f"+{(pct - benchmark)*100:.1f}pp",
+                "evidence": f"{entry['signal']['evidence']}: ${evidence_amount:,.0f}"
+            })
 
     # 2. HC vs Non-HC mix analysis
     hc_total = overview["expenses"]["hc_w2"]
@@ -496,7 +573,7 @@ def detect_out_of_model_signals(data: Dict[str, pd.DataFrame], overview: Dict) -
 # =============================================================================
 
 def generate_flag_register(negative_patterns: List[Dict], signals: List[Dict],
-                           negative_analysis: Dict) -> List[Dict]:
+                           negative_analysis: Dict, thresholds: Dict = FLAG_THRESHOLDS) -> List[Dict]:
     """Generate evidence-backed flag register."""
 
     flags = []
@@ -530,9 +607,9 @@ def generate_flag_register(negative_patterns: List[Dict], signals: List[Dict],
 
             # Department-level flags (limit to top 3 by absolute value)
             dept_flags = sorted(pattern.get("systematic_departments", []),
-                              key=lambda x: abs(x["neg_sum"]), reverse=True)[:3]
+                              key=lambda x: abs(x["neg_sum"]), reverse=True)[:thresholds["top_departments"]]
             for dept in dept_flags:
-                if abs(dept["neg_sum"]) > 100000:  # Only flag if material
+                if abs(dept["neg_sum"]) > thresholds["department_min_neg_sum"]:  # Only flag if material
                     flags.append({
                         "flag_id": f"F-{flag_id:02d}",
                         "area": f"{pattern['sheet']} - {dept['department']}",
@@ -557,16 +634,129 @@ def generate_flag_register(negative_patterns: List[Dict], signals: List[Dict],
 
     return flags
 
+
+def _sweep_items(negative_analysis: Dict, breakdown: str) -> Dict[str, np.ndarray]:
+    """
+    Category or department metrics of the sheets with negatives as arrays,
+    one entry per (sheet, value). Within a sheet, entries are ordered by
+    absolute negative sum, largest first (stable, as generate_flag_register
+    ranks departments).
+    """
+    sheets = [name for name, analysis in negative_analysis.items() if analysis["negative_count"] > 0]
+    rows = [(i, metrics["neg_pct"], metrics["neg_count"], metrics["neg_sum"])
+            for i, name in enumerate(sheets)
+            for metrics in negative_analysis[name].get(breakdown, {}).values()]
+    sheet, pct, count, neg_sum = (np.array(col) for col in zip(*rows)) if rows else ([np.array([])] * 4)
+
+    order = np.lexsort((-np.abs(neg_sum), sheet)) if len(sheet) else np.array([], dtype=int)
+    sheet = sheet[order].astype(np.int64)
+    # First entry of each entry's sheet, for ranks within the sheet
+    first = np.searchsorted(sheet, sheet, side="left")
+    return {"sheet": sheet, "first": first, "pct": pct[order].astype(float),
+            "count": count[order].astype(np.int64), "neg_sum": neg_sum[order].astype(float)}
+
+
+def flag_threshold_sweep(negative_analysis: Dict, grid: Dict = FLAG_SWEEP_GRID,
+                         block_rows: int = SWEEP_BLOCK_ROWS) -> pd.DataFrame:
+    """
+    Negative-pattern flags of the register under every combination of the
+    grid's threshold values (FLAG_THRESHOLDS keys; a key not in the grid
+    keeps its FLAG_THRESHOLDS value).
+
+    The metrics of every sheet, category and department are taken once from
+    `negative_analysis` and every combination is evaluated by broadcasting
+    them against a block of combinations, with the rules of
+    classify_negative_patterns and generate_flag_register: a sheet is
+    flagged when Material or when any category / department is Systematic;
+    each Systematic category is flagged; of the Systematic departments,
+    the `top_departments` largest by absolute negative sum are flagged when
+    above `department_min_neg_sum`. Out-of-model signal flags do not depend
+    on these thresholds and are not counted.
+
+    Returns:
+        DataFrame with one row per combination: the thresholds, flag counts
+        (total, High, Medium; sheet, category, department), the negative
+        sums of the flagged sheets, categories and departments, and
+        `baseline` (the combination equal to FLAG_THRESHOLDS)
+    """
+    keys = list(FLAG_THRESHOLDS)
+    axes = [np.asarray(grid.get(key, [FLAG_THRESHOLDS[key]])) for key in keys]
+    combos = {key: axis.ravel() for key, axis in zip(keys, np.meshgrid(*axes, indexing="ij"))}
+
+    sheets = [analysis for analysis in negative_analysis.values() if analysis["negative_count"] > 0]
+    sheet_pct = np.array([analysis["negative_pct_of_abs_total"] for analysis in sheets], dtype=float)
+    sheet_neg_sum = np.array([analysis["negative_sum"] for analysis in sheets], dtype=float)
+    categories = _sweep_items(negative_analysis, "by_category")
+    departments = _sweep_items(negative_analysis, "by_department")
+
+    def systematic(items: Dict[str, np.ndarray], pct: np.ndarray, count: np.ndarray) -> np.ndarray:
+        return (items["pct"] > pct) & (items["count"] > count)
+
+    def any_per_sheet(items: Dict[str, np.ndarray], mask: np.ndarray) -> np.ndarray:
+        # (combinations x entries) @ (entries x sheets) one-hot: hits per sheet
+        one_hot = items["sheet"][:, None] == np.arange(len(sheets))
+        return (mask.astype(np.int64) @ one_hot.astype(np.int64)) > 0
+
+    results = {name: [] for name in ["sheet_flags", "flags_high", "category_flags", "department_flags",
+                                     "flagged_neg_sum", "category_neg_sum", "department_neg_sum"]}
+    for start in range(0, len(combos[keys[0]]), block_rows):
+        block = {key: values[start:start + block_rows, None] for key, values in combos.items()}
+
+        material = sheet_pct > block["materiality_pct"]
+        category_hit = systematic(categories, block["concentration_pct"], block["min_neg_count"])
+        department_hit = systematic(departments, block["concentration_pct"], block["min_neg_count"])
+        flagged = material | any_per_sheet(categories, category_hit) | any_per_sheet(departments, department_hit)
+
+        # Rank of each Systematic department among its sheet's Systematic departments (1 = largest)
+        running = np.cumsum(department_hit, axis=1)
+        before = np.concatenate([np.zeros((len(running), 1), dtype=running.dtype), running], axis=1)
+        rank = running - before[:, departments["first"]]
+        department_flag = (department_hit & (rank <= block["top_departments"])
+                           & (np.abs(departments["neg_sum"]) > block["department_min_neg_sum"]))
+
+        results["sheet_flags"].append(flagged.sum(axis=1))
+        results["flags_high"].append((flagged & material).sum(axis=1))
+        results["category_flags"].append(category_hit.sum(axis=1))
+        results["department_flags"].append(department_flag.sum(axis=1))
+        results["flagged_neg_sum"].append(flagged @ sheet_neg_sum)
+        results["category_neg_sum"].append(category_hit @ categories["neg_sum"])
+        results["department_neg_sum"].append(department_flag @ departments["neg_sum"])
+
+    sweep = pd.DataFrame(combos)
+    for name, blocks in results.items():
+        sweep[name] = np.concatenate(blocks) if blocks else np.array([])
+    sweep["flags"] = sweep["sheet_flags"] + sweep["category_flags"] + sweep["department_flags"]
+    sweep["flags_medium"] = sweep["flags"] - sweep["flags_high"]
+    sweep["baseline"] = np.logical_and.reduce([sweep[key] == value for key, value in FLAG_THRESHOLDS.items()])
+    return sweep[keys + ["flags", "flags_high", "flags_medium", "sheet_flags", "category_flags",
+                         "department_flags", "flagged_neg_sum", "category_neg_sum", "department_neg_sum",
+                         "baseline"]]
+
 # =============================================================================
 # 6. SUPPORTING AGGREGATES
 # =============================================================================
 
 def generate_supporting_aggregates(data: Dict[str, pd.DataFrame],
                                    overview: Dict,
-                                   negative_analysis: Dict) -> Dict[str, pd.DataFrame]:
-    """Generate supporting aggregate tables for Excel output."""
+                                   negative_analysis: Dict,
+                                   function_totals: Optional[pd.Series] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Generate supporting aggregate tables for Excel output.
+
+    The by-function tables come from `function_totals` (see
+    detect_out_of_model_signals); computed here when not given.
+    """
 
     aggregates = {}
+    if function_totals is None:
+        function_totals = fact_totals(build_fact_table(data), ["function_l2"])
+
+    def by_function(sheet_name: str) -> pd.DataFrame:
+        totals = sheet_totals(function_totals, sheet_name).reset_index()
+        totals.columns = ["function", "amount"]
+        totals = totals.sort_values("amount", ascending=False)
+        totals["source"] = sheet_name
+        return totals
 
     # 1. Revenue by type
     revenue_df = pd.DataFrame([
@@ -593,28 +783,13 @@ def generate_supporting_aggregates(data: Dict[str, pd.DataFrame],
     aggregates["expense_by_category"] = expense_df
 
     # 3. Expense by function (OPEX)
-    opex = data["OPEX - NEmpl."]
-    opex_by_func = opex.groupby("function_l2")["2018_total"].sum().reset_index()
-    opex_by_func.columns = ["function", "amount"]
-    opex_by_func = opex_by_func.sort_values("amount", ascending=False)
-    opex_by_func["source"] = "OPEX - NEmpl."
-    aggregates["opex_by_function"] = opex_by_func
+    aggregates["opex_by_function"] = by_function("OPEX - NEmpl.")
 
     # 4. Expense by function (COGS)
-    cogs = data["COGS - NEmpl."]
-    cogs_by_func = cogs.groupby("function_l2")["2018_total"].sum().reset_index()
-    cogs_by_func.columns = ["function", "amount"]
-    cogs_by_func = cogs_by_func.sort_values("amount", ascending=False)
-    cogs_by_func["source"] = "COGS - NEmpl."
-    aggregates["cogs_by_function"] = cogs_by_func
+    aggregates["cogs_by_function"] = by_function("COGS - NEmpl.")
 
     # 5. HC by function
-    empl = data["Empl."]
-    empl_by_func = empl.groupby("function_l2")["2018_total"].sum().reset_index()
-    empl_by_func.columns = ["function", "amount"]
-    empl_by_func = empl_by_func.sort_values("amount", ascending=False)
-    empl_by_func["source"] = "Empl."
-    aggregates["hc_by_function"] = empl_by_func
+    aggregates["hc_by_function"] = by_function("Empl.")
 
     # 6. Negative value aggregates by sheet
     neg_summary = []
@@ -666,8 +841,21 @@ def generate_supporting_aggregates(data: Dict[str, pd.DataFrame],
 # MAIN EXECUTION
 # =============================================================================
 
-def main():
-    """Main execution function."""
+def main(use_cache: bool = True, reader: str = DEFAULT_READER, source: str = INPUT_PL_FILE,
+         data: Optional[Dict[str, pd.DataFrame]] = None, money_mode: str = DEFAULT_MONEY_MODE,
+         dimension_storage: str = DEFAULT_STORAGE_MODE, sweep: bool = False):
+    """
+    Main execution function.
+
+    `data` may carry the sheets already normalized by Phase 1c in the same
+    process (see run_pipeline.py); otherwise they are loaded here. They
+    must be the sheets of `source`: the expense cube cache is keyed on it. P&L
+    totals are taken in `money_mode` (see money.py); dimension columns are
+    held in `dimension_storage` (see dimensions.py). Neither storage mode
+    changes any output. `sweep` also evaluates the negative-pattern flags
+    under every FLAG_SWEEP_GRID threshold combination (FLAG_SWEEP_FILE).
+    """
+    PIPELINE_LOG.start_run()
     print("=" * 70)
     print("PHASE 2: FINANCIAL OVERVIEW & ANOMALY FLAGGING")
     print(f"Execution timestamp: {datetime.now().isoformat()}")
@@ -679,15 +867,40 @@ def main():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     # Load data
-    print("Loading normalized data...")
-    data = load_normalized_data()
-    print(f"Loaded {len(data)} sheets")
+    if data is None:
+        print("Loading normalized data...")
+        data = load_normalized_data(use_cache, reader, source)
+        print(f"Loaded {len(data)} sheets")
+    else:
+        data = {sheet_name: data[sheet_name] for sheet_name in SHEET_CONFIG}
+        print(f"Using {len(data)} normalized sheets from Phase 1c")
+
+    if dimension_storage != "object":
+        before = dimension_memory(data)
+        data = store_dimensions(data, dimension_storage)
+        print(f"Dimension columns stored as {dimension_storage}: "
+              f"{before / 1e6:.2f} MB -> {dimension_memory(data) / 1e6:.2f} MB")
+    # One long fact table of the detail sheets; cross-sheet aggregates are grouped over it once
+    fact = build_fact_table(data)
+    function_totals = fact_totals(fact, ["function_l2"])
+    PIPELINE_LOG.lap("load", rows=sum(len(df) for df in data.values()), sheets=len(data))
+
+    # Gross/net/negative cube of the expense lines, cached until an expense sheet, its
+    # normalization or the cube build changes. Keyed on `source`: sheets handed in as
+    # `data` must be the normalized sheets of `source`
+    cube_key = (expense_cube_key({sheet_name: keys[0] for sheet_name, keys
+                                  in normalized_sheet_keys(source, CUBE_SHEETS).items()})
+                if use_cache else None)
+    cube, cube_cached = expense_cube(fact, cube_key, use_cache)
+    print(f"Expense cube: {len(cube.cells)} cells ({'cached' if cube_cached else 'built'})")
+    PIPELINE_LOG.lap("expense_cube", rows=len(cube.cells), from_cache=cube_cached)
 
     # 1. Generate P&L Overview
     print("\n" + "-" * 50)
     print("1. GENERATING P&L OVERVIEW")
     print("-" * 50)
-    overview = generate_pnl_overview(data)
+    overview = generate_pnl_overview(data, money_mode)
+    PIPELINE_LOG.lap("overview")
 
     print(f"\nRevenue: ${overview['revenue']['total_computed']:,.2f}")
     print(f"  - Recurring: ${overview['revenue']['recurring']:,.2f}")
@@ -705,7 +918,8 @@ def main():
     print("\n" + "-" * 50)
     print("2. RECONCILIATION CHECKS")
     print("-" * 50)
-    recon_checks = perform_reconciliation_checks(data, overview)
+    recon_checks = perform_reconciliation_checks(data, money_mode)
+    PIPELINE_LOG.lap("reconciliation", rows=len(recon_checks))
 
     for check in recon_checks:
         status_symbol = "✓" if check["status"] == "RECONCILED" else "✗"
@@ -715,8 +929,9 @@ def main():
     print("\n" + "-" * 50)
     print("3. NEGATIVE VALUE ANALYSIS")
     print("-" * 50)
-    negative_analysis = analyze_negative_values(data)
+    negative_analysis = analyze_negative_values(data, fact, money_mode)
     negative_patterns = classify_negative_patterns(negative_analysis)
+    PIPELINE_LOG.lap("negative_analysis", rows=len(negative_patterns))
 
     for pattern in negative_patterns:
         print(f"\n  {pattern['sheet']}:")
@@ -725,11 +940,37 @@ def main():
         print(f"    Negative sum: ${pattern['total_negative_sum']:,.2f}")
         print(f"    % of absolute total: {pattern['negative_pct_of_total']:.2f}%")
 
+    offsets = analyze_offset_ratios(cube, overview)
+    PIPELINE_LOG.lap("offset_ratios", rows=len(offsets["cells"]))
+
+    print("\n  Offset ratios (gross vs net, non-HC functions):")
+    for row in offsets["by_function"].itertuples(index=False):
+        print(f"    {row.source_sheet} / {row.function_l2}: gross ${row.gross:,.2f} "
+              f"({row.gross_pct_of_revenue:.2f}% of revenue), offset {row.offset_ratio_pct:.1f}% -> "
+              f"net ${row.net:,.2f} [{row.offset_bucket}]")
+
     # 4. Out-of-Model Signals
     print("\n" + "-" * 50)
     print("4. OUT-OF-MODEL SIGNALS")
     print("-" * 50)
-    signals = detect_out_of_model_signals(data, overview)
+    benchmark_evaluation = evaluate_benchmarks(fact, data["Benchmarks"], BENCHMARK_MAP, money_mode=money_mode)
+    unmapped = unmapped_benchmark_lines(data["Benchmarks"], BENCHMARK_MAP)
+    if unmapped:
+        print(f"  [benchmarks] Lines not in BENCHMARK_MAP (not evaluated): {unmapped}")
+    signals = detect_out_of_model_signals(data, overview, benchmark_evaluation, money_mode)
+    PIPELINE_LOG.lap("signals", rows=len(signals))
+
+    print("\n  Benchmark evaluation (net / gross, % of revenue):")
+    by_area = benchmark_evaluation.set_index(["area", "basis"])
+    for entry in BENCHMARK_MAP:
+        net = by_area.loc[(entry["area"], "net")]
+        if (entry["area"], "gross") not in by_area.index:
+            print(f"    {entry['area']}: {net['actual_pct']:.1f}% vs {net['benchmark_pct']:.1f}% "
+                  f"({net['variance_pp']:+.1f}pp)")
+            continue
+        gross = by_area.loc[(entry["area"], "gross")]
+        print(f"    {entry['area']}: {net['actual_pct']:.1f}% / {gross['actual_pct']:.1f}% "
+              f"vs {net['benchmark_pct']:.1f}% ({net['variance_pp']:+.1f}pp / {gross['variance_pp']:+.1f}pp)")
 
     for signal in signals:
         print(f"\n  {signal['area']}:")
@@ -741,16 +982,33 @@ def main():
     print("5. FLAG REGISTER")
     print("-" * 50)
     flags = generate_flag_register(negative_patterns, signals, negative_analysis)
+    PIPELINE_LOG.lap("flags", rows=len(flags))
 
     for flag in flags:
         print(f"\n  {flag['flag_id']} [{flag['materiality']}] {flag['area']}")
         print(f"    {flag['description']}")
 
+    threshold_sweep = None
+    if sweep:
+        threshold_sweep = flag_threshold_sweep(negative_analysis)
+        PIPELINE_LOG.lap("threshold_sweep", rows=len(threshold_sweep))
+
+        print(f"\n  Threshold sweep: {len(threshold_sweep):,} combinations, "
+              f"{threshold_sweep['flags'].min()}-{threshold_sweep['flags'].max()} negative-pattern flags")
+        # One threshold at a time, the others at FLAG_THRESHOLDS
+        for key, baseline in FLAG_THRESHOLDS.items():
+            others = np.logical_and.reduce([threshold_sweep[other] == value
+                                            for other, value in FLAG_THRESHOLDS.items() if other != key])
+            line = threshold_sweep[others].set_index(key)["flags"]
+            print(f"    {key} (baseline {baseline}): "
+                  + ", ".join(f"{value:g}: {count}" for value, count in line.items()))
+
     # 6. Generate Supporting Aggregates
     print("\n" + "-" * 50)
     print("6. GENERATING SUPPORTING AGGREGATES")
     print("-" * 50)
-    aggregates = generate_supporting_aggregates(data, overview, negative_analysis)
+    aggregates = generate_supporting_aggregates(data, overview, negative_analysis, function_totals)
+    PIPELINE_LOG.lap("aggregates", rows=len(aggregates))
 
     # Save outputs
     print("\n" + "=" * 70)
@@ -770,6 +1028,23 @@ def main():
             df.to_excel(writer, sheet_name=sheet_name, index=False)
     print(f"Saved: {agg_path}")
 
+    # Save offset ratio table
+    offset_path = os.path.join(OUTPUT_DIR, OFFSET_RATIOS_FILE)
+    offsets["cells"].round(4).to_csv(offset_path, index=False)
+    print(f"Saved: {offset_path}")
+
+    # Save benchmark evaluation
+    benchmark_path = os.path.join(OUTPUT_DIR, BENCHMARK_EVALUATION_FILE)
+    benchmark_evaluation.round(4).to_csv(benchmark_path, index=False)
+    print(f"Saved: {benchmark_path}")
+
+    if threshold_sweep is not None:
+        sweep_path = os.path.join(OUTPUT_DIR, FLAG_SWEEP_FILE)
+        threshold_sweep.round(2).to_csv(sweep_path, index=False)
+        print(f"Saved: {sweep_path}")
+    PIPELINE_LOG.lap("save_outputs")
+    PIPELINE_LOG.flush()
+
     # Return data for markdown generation
     return {
         "overview": overview,
@@ -778,13 +1053,16 @@ def main():
         "negative_analysis": negative_analysis,
         "signals": signals,
         "flags": flags,
-        "aggregates": aggregates
+        "aggregates": aggregates,
+        "offset_ratios": offsets,
+        "benchmark_evaluation": benchmark_evaluation,
+        "expense_cube": cube,
+        "threshold_sweep": threshold_sweep
     }
 
 
-if __name__ == "__main__":
-    results = main()
-
+def write_overview_markdown(results: Dict) -> str:
+    """Write 01_pnl_overview_summary.md from the results of main(); returns its path."""
     # Generate P&L Overview Summary Markdown
     md_content = f"""# Phase 2: Financial Overview & Anomaly Flagging
 
@@ -954,6 +1232,34 @@ See `02_flag_register.csv` for complete details.
         f.write(md_content)
     print(f"Saved: {md_path}")
 
-    print("\n" + "=" * 70)
-    print("PHASE 2 COMPLETE")
-    print("=" * 70)
+    return md_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Phase 2: financial overview & anomaly flagging")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore and do not write the normalized frame cache")
+    parser.add_argument("--reader", default=DEFAULT_READER, choices=["auto"] + list(READER_BACKENDS),
+                        help="Excel reader backend (default: %(default)s = calamine if installed, else openpyxl)")
+    parser.add_argument("--pnl-source", default=INPUT_PL_FILE,
+                        help="Input P&L workbook, or a directory of CSV/Parquet/JSONL exports of its sheets")
+    parser.add_argument("--money-mode", default=DEFAULT_MONEY_MODE, choices=MONEY_MODES,
+                        help="How P&L totals are taken: float64, or exact int64 cents (default: %(default)s)")
+    parser.add_argument("--dimension-storage", default=DEFAULT_STORAGE_MODE, choices=STORAGE_MODES,
+                        help="How dimension columns are held: as strings, or dictionary-encoded (default: %(default)s)")
+    parser.add_argument("--sweep", action="store_true",
+                        help="Also evaluate the negative-pattern flags under every FLAG_SWEEP_GRID threshold combination")
+    args = parser.parse_args()
+
+    with buffered_console():
+        results = main(use_cache=not args.no_cache, reader=args.reader, source=args.pnl_source,
+                       money_mode=args.money_mode, dimension_storage=args.dimension_storage,
+                       sweep=args.sweep)
+
+        write_overview_markdown(results)
+
+        print("\n" + "=" * 70)
+        print("PHASE 2 COMPLETE")
+        print("=" * 70)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Phase 5: Decision-Safe vs Decision-Unsafe Classification
+
+Batch scoring of the Phase 5 framework (outputs/phase_5/
+why_05_decision_boundaries.md) over every line of the non-HC expense
+sheets (OPEX - NEmpl., COGS - NEmpl.) and every function_l2 x
+expense_category x department cell.
+
+Rules, evaluated on all lines / cells at once:
+1. offset_ratio            near-zero offset: the cell's offset ratio (offsets
+                           as a % of gross, see ledger_analytics) is in the
+                           Low Offset bucket (< 10%)
+2. external_counterparty   the expense category is paid to third parties
+                           (EXTERNAL_CATEGORIES) and the department does not
+                           pool and redistribute costs (ALLOCATIVE_DEPARTMENTS)
+3. transactional_clarity   the line is a charge, not a reversal (amount >= 0);
+                           lines only (a cell's reversals are rule 1)
+
+A line or cell passing every rule is decision-safe, otherwise
+decision-unsafe; unsafe_reason is the first rule it fails.
+
+Outputs (replaced on every run):
+    outputs/phase_5/decision_safety/lines/source_sheet=<sheet>/function_l2=<function>/part-0.parquet
+    outputs/phase_5/decision_safety/cells/source_sheet=<sheet>/part-0.parquet
+    outputs/phase_5/01_decision_safety_summary.csv
+
+Partitions are Hive-style (URI-encoded values), so pd.read_parquet() of a
+directory reads them back with the partition columns; without pyarrow they
+are written as part-0.csv.
+
+CONSTRAINTS:
+- Diagnostic only; no recommendations
+- No data modifications
+
+Usage:
+    python scripts/04_decision_safety.py [--no-cache] [--reader NAME] [--pnl-source PATH]
+
+Author: Pipeline Infrastructure
+Date: 2026-10-18
+"""
+
+import importlib
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from ledger_io import DEFAULT_READER, READER_BACKENDS, parquet_available
+from money import MINOR_UNITS, to_minor_units
+from ledger_analytics import OFFSET_SHEETS, OFFSET_DIMENSIONS, offset_bucket
+from pipeline_log import PipelineLog, buffered_console
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+INPUT_PL_FILE = "data/Operational Leadership Real Work - Input P&L.xlsx"
+OUTPUT_DIR = "outputs/phase_5"
+PARTITION_DIR = "outputs/phase_5/decision_safety"
+SUMMARY_FILE = "01_decision_safety_summary.csv"
+
+# Sheets are loaded with the Phase 2 normalization (and its frame cache)
+PHASE2 = "03_phase2_analysis"
+
+AMOUNT_COLUMN = "2018_total"
+
+# Partition columns of the line and cell outputs
+LINE_PARTITIONS = ["source_sheet", "function_l2"]
+CELL_PARTITIONS = ["source_sheet"]
+
+# Rule 1: offset ratio buckets counted as near-zero offset
+SAFE_OFFSET_BUCKETS = ["Low Offset"]
+
+# Rule 2: expense categories paid to third parties for discrete services or
+# assets (Phase 5, section A); every other category is internal or
+# allocative (Personnel, Occupancy, Commissions, ...)
+EXTERNAL_CATEGORIES = ["Outsourced Services", "Hosting", "External Contractors"]
+
+# Rule 2: departments whose spend is pooled and redistributed (Phase 5, section B)
+ALLOCATIVE_DEPARTMENTS = ["Benefits", "Occupancy"]
+
+DECISION_RULES = ["offset_ratio", "external_counterparty", "transactional_clarity"]
+DECISION_SAFE = "decision-safe"
+DECISION_UNSAFE = "decision-unsafe"
+
+# Partition value of a missing key (as pyarrow writes it)
+MISSING_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Timed events of each run (outputs/logs/phase_5.jsonl)
+PIPELINE_LOG = PipelineLog("phase_5")
+
+# =============================================================================
+# CLASSIFICATION
+# =============================================================================
+
+def _decisions(passed: List[np.ndarray]) -> Dict[str, pd.Categorical]:
+    """
+    decision and unsafe_reason columns from one boolean array per
+    DECISION_RULES rule, as categoricals built from integer codes (no
+    per-line strings).
+    """
+    failed = ~np.vstack(passed)
+    unsafe = failed.any(axis=0)
+    reason = np.where(unsafe, failed.argmax(axis=0) + 1, 0)
+    return {
+        "decision": pd.Categorical.from_codes(unsafe.astype(np.int8), categories=[DECISION_SAFE, DECISION_UNSAFE]),
+        "unsafe_reason": pd.Categorical.from_codes(reason.astype(np.int8), categories=[""] + DECISION_RULES)
+    }
+
+
+def classify_sheet(df: pd.DataFrame, sheet_name: str) -> Dict[str, pd.DataFrame]:
+    """
+    Classify every line and cell of one non-HC expense sheet.
+
+    Lines are numbered by cell once; gross and offsets of every cell are
+    summed from the lines' int64 cents in one pass (as the expense cube
+    sums them), and each line takes its cell's offset ratio and rule 2
+    result by position.
+
+    Returns:
+        Dict with keys: lines (one row per line, in sheet order), cells (one
+        row per cell, in order of first appearance)
+    """
+    ids = df.groupby([df[col] for col in OFFSET_DIMENSIONS], observed=True, dropna=False, sort=False) \
+        .ngroup().to_numpy()
+    n_cells = int(ids.max()) + 1 if len(ids) else 0
+    # Cells are numbered in order of first appearance: a line opens a cell when its id exceeds every earlier id
+    first = np.flatnonzero(ids > np.maximum.accumulate(np.concatenate([[-1], ids]))[:-1])
+
+    amount = df[AMOUNT_COLUMN].to_numpy(dtype=float)
+    cents, residual = to_minor_units(amount)
+    positive, negative = amount > 0, amount < 0
+
+    def cell_total(mask: np.ndarray) -> np.ndarray:
+        total = np.bincount(ids, weights=np.where(mask, cents, 0), minlength=n_cells) / MINOR_UNITS
+        if residual is not None:
+            total += np.bincount(ids, weights=np.where(mask, residual, 0.0), minlength=n_cells)
+        return total
+
+    gross, offsets = cell_total(positive), cell_total(negative)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(gross > 0, -offsets / gross * 100 + 0.0, np.nan)
+
+    cells = df[OFFSET_DIMENSIONS].iloc[first].reset_index(drop=True)
+    low_offset = np.isin(offset_bucket(ratio), SAFE_OFFSET_BUCKETS)
+    external = (cells["expense_category"].isin(EXTERNAL_CATEGORIES)
+                & ~cells["department"].isin(ALLOCATIVE_DEPARTMENTS)).to_numpy()
+
+    cells.insert(0, "source_sheet", sheet_name)
+    cells["gross"] = gross
+    cells["offsets"] = offsets
+    cells["net"] = gross + offsets
+    cells["offset_ratio_pct"] = ratio
+    cells["lines"] = np.bincount(ids, minlength=n_cells)
+    cells = cells.assign(**_decisions([low_offset, external]))
+
+    line_columns = [col for col in df.columns if col != AMOUNT_COLUMN]
+    lines = df[line_columns].reset_index(drop=True)
+    lines.insert(0, "source_sheet", sheet_name)
+    lines.insert(1, "line", np.arange(len(df)))
+    lines[AMOUNT_COLUMN] = amount
+    lines["offset_ratio_pct"] = ratio[ids]
+    lines = lines.assign(**_decisions([low_offset[ids], external[ids], ~negative]))
+
+    return {"lines": lines, "cells": cells}
+
+
+def classify_ledger(data: Dict[str, pd.DataFrame], sheets: List[str] = OFFSET_SHEETS) -> Dict[str, pd.DataFrame]:
+    """Classify the lines and cells of every non-HC expense sheet (sheets missing from `data` are skipped)."""
+    results = [classify_sheet(data[sheet], sheet) for sheet in sheets if sheet in data]
+    return {
+        part: pd.concat([result[part] for result in results], ignore_index=True)
+        for part in ["lines", "cells"]
+    }
+
+
+def decision_summary(cells: pd.DataFrame) -> pd.DataFrame:
+    """Gross, net, cells and lines per sheet, function and decision, with each decision's share of gross (%)."""
+    summary = cells.groupby(["source_sheet", "function_l2", "decision"], sort=False, dropna=False) \
+        .agg(gross=("gross", "sum"), net=("net", "sum"), cells=("gross", "size"), lines=("lines", "sum")) \
+        .reset_index()
+    function_gross = summary.groupby(["source_sheet", "function_l2"], sort=False, dropna=False)["gross"] \
+        .transform("sum")
+    summary.insert(4, "pct_of_gross", np.where(function_gross != 0, summary["gross"] / function_gross * 100, 0.0))
+    return summary
+
+# =============================================================================
+# PARTITIONED OUTPUT
+# =============================================================================
+
+def write_partitioned(df: pd.DataFrame, root: str, partition_cols: List[str]) -> int:
+    """
+    Replace `root` with one part file per partition, in Hive layout
+    (root/col=value/.../part-0.parquet, or .csv without pyarrow). The
+    partition columns are encoded in the path, not stored in the files.
+
+    Returns:
+        Number of partitions written
+    """
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    use_parquet = parquet_available()
+    partitions = 0
+
+    for values, part in df.groupby(partition_cols, sort=False, dropna=False, observed=True):
+        values = values if isinstance(values, tuple) else (values,)
+        segments = [f"{col}={quote(str(value), safe='') if not pd.isna(value) else MISSING_PARTITION}"
+                    for col, value in zip(partition_cols, values)]
+        directory = os.path.join(root, *segments)
+        os.makedirs(directory, exist_ok=True)
+
+        part = part.drop(columns=partition_cols)
+        if use_parquet:
+            part.to_parquet(os.path.join(directory, "part-0.parquet"), index=False)
+        else:
+            part.to_csv(os.path.join(directory, "part-0.csv"), index=False)
+        partitions += 1
+
+    return partitions
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def main(use_cache: bool = True, reader: str = DEFAULT_READER, source: str = INPUT_PL_FILE,
+         data: Optional[Dict[str, pd.DataFrame]] = None) -> Dict:
+    """
+    Main execution function.
+
+    `data` may carry the sheets already normalized by Phase 1c in the same
+    process (see run_pipeline.py); otherwise they are loaded with the Phase 2
+    normalization.
+    """
+    PIPELINE_LOG.start_run()
+    print("=" * 70)
+    print("PHASE 5: DECISION-SAFE VS DECISION-UNSAFE CLASSIFICATION")
+    print("=" * 70)
+
+    if data is None:
+        phase2 = importlib.import_module(PHASE2)
+        print("Loading normalized data...")
+        data = phase2.load_normalized_data(use_cache, reader, source)
+    data = {sheet: data[sheet] for sheet in OFFSET_SHEETS if sheet in data}
+    n_lines = sum(len(df) for df in data.values())
+    PIPELINE_LOG.lap("load", rows=n_lines, sheets=len(data))
+
+    start = time.perf_counter()
+    classified = classify_ledger(data)
+    seconds = time.perf_counter() - start
+    PIPELINE_LOG.lap("classify", rows=n_lines, cells=len(classified["cells"]))
+    print(f"Classified {n_lines:,} lines and {len(classified['cells']):,} cells in {seconds:.3f}s "
+          f"({n_lines / seconds if seconds else 0:,.0f} lines/sec)")
+
+    summary = decision_summary(classified["cells"])
+    for row in summary.itertuples(index=False):
+        print(f"  {row.source_sheet} / {row.function_l2} / {row.decision}: gross ${row.gross:,.2f} "
+              f"({row.pct_of_gross:.1f}%), net ${row.net:,.2f}, {row.cells} cells")
+
+    # Save outputs
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    line_partitions = write_partitioned(classified["lines"], os.path.join(PARTITION_DIR, "lines"), LINE_PARTITIONS)
+    cell_partitions = write_partitioned(classified["cells"], os.path.join(PARTITION_DIR, "cells"), CELL_PARTITIONS)
+    print(f"Saved: {PARTITION_DIR}/lines ({line_partitions} partitions), "
+          f"{PARTITION_DIR}/cells ({cell_partitions} partitions)")
+
+    summary_path = os.path.join(OUTPUT_DIR, SUMMARY_FILE)
+    summary.to_csv(summary_path, index=False)
+    print(f"Saved: {summary_path}")
+    PIPELINE_LOG.lap("save_outputs", partitions=line_partitions + cell_partitions)
+    PIPELINE_LOG.flush()
+
+    return {"lines": classified["lines"], "cells": classified["cells"], "summary": summary}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Phase 5: decision-safe vs decision-unsafe classification")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore and do not write the normalized frame cache")
+    parser.add_argument("--reader", default=DEFAULT_READER, choices=["auto"] + list(READER_BACKENDS),
+                        help="Excel reader backend (default: %(default)s = calamine if installed, else openpyxl)")
+    parser.add_argument("--pnl-source", default=INPUT_PL_FILE,
+                        help="Input P&L workbook, or a directory of CSV/Parquet/JSONL exports of its sheets")
+    args = parser.parse_args()
+
+    with buffered_console():
+        main(use_cache=not args.no_cache, reader=args.reader, source=args.pnl_source)
+
+        print("\n" + "=" * 70)
+        print("PHASE 5 CLASSIFICATION COMPLETE")
+        print("=" * 70)
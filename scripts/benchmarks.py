@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmarks
+
+Reproducible timing harness for the ingestion and analysis layers. Each
+benchmark prints a small table and can be run on the repository workbooks
+or on any glob of workbooks.
+
+Usage:
+    python scripts/benchmarks.py parallel [--inputs GLOB] [--max-workers N]
+    python scripts/benchmarks.py layout [--inputs GLOB]
+    python scripts/benchmarks.py readers [--workbook PATH] [--repeats N]
+    python scripts/benchmarks.py money [--rows N] [--repeats N]
+    python scripts/benchmarks.py dimensions [--workbook PATH] [--rows N] [--repeats N]
+    python scripts/benchmarks.py cube [--rows N] [--queries N]
+    python scripts/benchmarks.py sweep [--workbook PATH] [--combinations N] [--repeats N]
+
+Author: Pipeline Infrastructure
+Date: 2026-10-18
+
+IMPORTANT: Benchmarks never write QC outputs or the frame cache.
+"""
+
+import argparse
+import contextlib
+import glob
+import importlib
+import io
+import multiprocessing
+import os
+import resource
+import time
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ledger_io import READER_BACKENDS, available_readers, open_workbook
+from money import MINOR_UNITS, money_total, to_minor_units, minor_units_total
+from dimensions import DIMENSION_COLUMNS, encode_dimensions, decode_dimensions, dimension_memory
+from ledger_analytics import build_fact_table, expense_cube
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+DEFAULT_INPUTS = "data/*.xlsx"
+DEFAULT_WORKBOOK = "data/Operational Leadership Real Work - Input P&L.xlsx"
+DEFAULT_LEDGER_ROWS = 10_000_000
+
+
+def load_phase(module_name: str):
+    """Import a numbered phase script (e.g. 01_ingestion_and_schema) as a module."""
+    return importlib.import_module(module_name)
+
+# =============================================================================
+# PARALLEL INGESTION SCALING
+# =============================================================================
+
+def worker_counts(max_workers: int) -> List[int]:
+    """1, 2, 4, ... up to max_workers (always including max_workers)."""
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def bench_parallel(inputs: str, max_workers: int, repeats: int = 1) -> pd.DataFrame:
+    """Time Phase 1 ingestion of a workbook glob at increasing worker counts."""
+    phase1 = load_phase("01_ingestion_and_schema")
+    paths = sorted(glob.glob(inputs))
+    workbooks = [(path, os.path.splitext(os.path.basename(path))[0]) for path in paths]
+
+    records = []
+    baseline = None
+    reference_qc = None
+
+    for workers in worker_counts(max_workers):
+        best = float("inf")
+        for _ in range(repeats):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                results = phase1.ingest_workbooks(workbooks, workers=workers, use_cache=False)
+                elapsed = time.perf_counter() - start
+            best = min(best, elapsed)
+
+        qc = pd.DataFrame([r for result in results for r in result["qc_records"]])
+        if reference_qc is None:
+            reference_qc = qc
+        sheets = len(qc)
+        baseline = baseline or best
+
+        records.append({
+            "workers": workers,
+            "seconds": round(best, 3),
+            "sheets": sheets,
+            "sheets_per_sec": round(sheets / best, 2) if best else None,
+            "speedup": round(baseline / best, 2) if best else None,
+            "qc_identical": qc.equals(reference_qc)
+        })
+
+    return pd.DataFrame(records)
+
+# =============================================================================
+# HEADER DETECTION: PREFIX-ONLY VS FULL SHEET
+# =============================================================================
+
+def bench_layout(inputs: str, repeats: int = 1) -> pd.DataFrame:
+    """Time header detection over a workbook glob, reading full sheets vs a row prefix."""
+    phase1 = load_phase("01_ingestion_and_schema")
+    paths = sorted(glob.glob(inputs))
+
+    def full_sheet(xl, sheet_name):
+        df_raw = pd.read_excel(xl, sheet_name=sheet_name, header=None)
+        return phase1.detect_header_row(df_raw, sheet_name)
+
+    def prefix_only(xl, sheet_name):
+        layout = phase1.detect_sheet_layout(xl, sheet_name)
+        return layout["header_row"], layout["detection_reasons"]
+
+    records = []
+    reference = None
+
+    for mode, detect in [("full_sheet", full_sheet), ("prefix_only", prefix_only)]:
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            answers = []
+            for path in paths:
+                xl = pd.ExcelFile(path)
+                answers.extend(detect(xl, sheet_name) for sheet_name in xl.sheet_names)
+            best = min(best, time.perf_counter() - start)
+
+        if reference is None:
+            reference = answers
+        records.append({
+            "mode": mode,
+            "seconds": round(best, 3),
+            "sheets": len(answers),
+            "sheets_per_sec": round(len(answers) / best, 2) if best else None,
+            "identical": answers == reference
+        })
+
+    return pd.DataFrame(records)
+
+# =============================================================================
+# READER BACKENDS: PARSE SPEED AND PEAK MEMORY
+# =============================================================================
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _parse_with_reader(workbook: str, reader: str, repeats: int) -> Dict:
+    """
+    Parse every sheet of a workbook (header=None, as the phases do) with one backend.
+
+    Runs in a fresh process so peak RSS is not shared between backends.
+    """
+    rss_before = _peak_rss_mb()
+    best = float("inf")
+    frames = {}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        xl = open_workbook(workbook, reader)
+        frames = {name: pd.read_excel(xl, sheet_name=name, header=None) for name in xl.sheet_names}
+        best = min(best, time.perf_counter() - start)
+
+    return {
+        "seconds": best,
+        "rows": sum(len(df) for df in frames.values()),
+        "peak_rss_mb": _peak_rss_mb(),
+        "rss_increase_mb": _peak_rss_mb() - rss_before,
+        "frames": frames
+    }
+
+
+def _phase1_qc_with_reader(workbook: str, reader: str) -> pd.DataFrame:
+    """Phase 1 QC records (01) of a workbook ingested with one backend."""
+    phase1 = load_phase("01_ingestion_and_schema")
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = phase1.ingest_workbooks([(workbook, "workbook")], use_cache=False, reader=reader)
+    return pd.DataFrame(results[0]["qc_records"])
+
+
+def bench_readers(workbook: str, repeats: int = 1) -> pd.DataFrame:
+    """
+    Parse a workbook with each installed reader backend.
+
+    Reports rows/sec and peak RSS per backend, and whether the raw frames
+    (and so every QC output built from them) and the Phase 1 QC records are
+    identical to the first backend's.
+    """
+    context = multiprocessing.get_context("spawn")
+    records = []
+    reference = None
+
+    for reader in available_readers():
+        with context.Pool(1) as pool:
+            run = pool.apply(_parse_with_reader, (workbook, reader, repeats))
+        qc = _phase1_qc_with_reader(workbook, reader)
+        if reference is None:
+            reference = (run["frames"], qc)
+
+        identical = (run["frames"].keys() == reference[0].keys()
+                     and all(run["frames"][name].equals(reference[0][name]) for name in reference[0])
+                     and qc.equals(reference[1]))
+        records.append({
+            "reader": reader,
+            "seconds": round(run["seconds"], 3),
+            "rows": run["rows"],
+            "rows_per_sec": round(run["rows"] / run["seconds"]) if run["seconds"] else None,
+            "peak_rss_mb": round(run["peak_rss_mb"], 1),
+            "rss_increase_mb": round(run["rss_increase_mb"], 1),
+            "outputs_identical": identical
+        })
+
+    missing = [name for name in READER_BACKENDS if name not in available_readers()]
+    if missing:
+        print(f"Not installed (skipped): {', '.join(missing)}")
+
+    return pd.DataFrame(records)
+
+# =============================================================================
+# MONEY TOTALS: FLOAT64 VS INT64 MINOR UNITS
+# =============================================================================
+
+def synthetic_amounts(rows: int, seed: int = 0) -> Tuple[pd.Series, np.ndarray]:
+    """
+    A synthetic ledger amount column: whole-cent amounts between -$10M and
+    $10M, one line in a thousand missing. Returns (amounts, true cents).
+    """
+    rng = np.random.default_rng(seed)
+    cents = rng.integers(-10**9, 10**9, rows)
+    amounts = cents / MINOR_UNITS
+    amounts[::1000] = np.nan
+    cents[::1000] = 0
+    return pd.Series(amounts, name="2018_total"), cents
+
+
+def _best_time(fn, repeats: int):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_money(rows: int, repeats: int = 3) -> pd.DataFrame:
+    """
+    Time and check the accuracy of totals in float64 and exact (int64 cents) mode.
+
+    Single total: one total of the column, as the reconciliations take it.
+    Masked totals: the total plus negative-only and positive-only totals of
+    the same column, as the negative-value analysis takes them; in exact
+    mode the column is converted to minor units once and reused.
+    """
+    amounts, cents = synthetic_amounts(rows)
+    negative = (amounts < 0).to_numpy()
+    positive = (amounts > 0).to_numpy()
+    true_total = int(cents.sum())
+    true_masked = [true_total, int(cents[negative].sum()), int(cents[positive].sum())]
+
+    def float_masked():
+        return [float(amounts.sum()), float(amounts[negative].sum()), float(amounts[positive].sum())]
+
+    def exact_masked():
+        minor = to_minor_units(amounts)
+        return [minor_units_total(*minor), minor_units_total(*minor, mask=negative),
+                minor_units_total(*minor, mask=positive)]
+
+    minor = to_minor_units(amounts)
+    scenarios = [
+        ("single_total", "float", lambda: [money_total(amounts, "float")], [true_total]),
+        ("single_total", "exact", lambda: [money_total(amounts, "exact")], [true_total]),
+        ("single_total", "exact (pre-converted)", lambda: [minor_units_total(*minor)], [true_total]),
+        ("masked_totals", "float", float_masked, true_masked),
+        ("masked_totals", "exact", exact_masked, true_masked)
+    ]
+
+    records = []
+    for scenario, mode, fn, truth in scenarios:
+        seconds, totals = _best_time(fn, repeats)
+        # Error against the true total in exact decimal arithmetic, in currency units
+        errors = [abs(Decimal(total) - Decimal(expected) / MINOR_UNITS) for total, expected in zip(totals, truth)]
+        records.append({
+            "scenario": scenario,
+            "mode": mode,
+            "totals": len(totals),
+            "seconds": round(seconds, 4),
+            "rows_per_sec": round(rows * len(totals) / seconds) if seconds else None,
+            "max_abs_error": float(max(errors))
+        })
+
+    return pd.DataFrame(records)
+
+# =============================================================================
+# DIMENSION STORAGE
+# =============================================================================
+
+# Distinct values per dimension of the synthetic ledger
+SYNTHETIC_DIMENSIONS = {
+    "function_l1": 12,
+    "function_l2": 45,
+    "department": 350,
+    "expense_category": 80,
+    "vendor": 25_000
+}
+
+
+def synthetic_ledger(rows: int, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """A synthetic OPEX-style ledger: string dimension columns plus 2018_total."""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for col, cardinality in SYNTHETIC_DIMENSIONS.items():
+        values = pd.Series([f"{col.replace('_', ' ').title()} {i:05d}" for i in range(cardinality)], dtype="str")
+        columns[col] = values.take(rng.integers(0, cardinality, rows)).reset_index(drop=True)
+    columns["2018_total"] = pd.Series(rng.integers(-10**7, 10**8, rows) / MINOR_UNITS)
+    return {"OPEX - NEmpl.": pd.DataFrame(columns)}
+
+
+def _groupby_all(frames: Dict[str, pd.DataFrame]) -> int:
+    """Total of 2018_total by every dimension column of every frame; returns the group count."""
+    groups = 0
+    for df in frames.values():
+        for col in DIMENSION_COLUMNS:
+            if col in df.columns and "2018_total" in df.columns:
+                groups += len(df.groupby(col, observed=True)["2018_total"].sum())
+    return groups
+
+
+def bench_dimensions(workbook: str, rows: int, repeats: int = 3) -> pd.DataFrame:
+    """
+    Memory of the dimension columns and latency of groupby totals by each
+    dimension, stored as strings vs dictionary-encoded, on the Phase 2
+    sheets of `workbook` and on a synthetic ledger of `rows` lines.
+
+    Also checks that decoding returns every original value.
+    """
+    phase2 = load_phase("03_phase2_analysis")
+    with contextlib.redirect_stdout(io.StringIO()):
+        sample = phase2.load_normalized_data(use_cache=False, source=workbook)
+
+    records = []
+    for dataset, frames in [("sample", sample), (f"synthetic {rows:,}", synthetic_ledger(rows))]:
+        encode_seconds, encoded = _best_time(lambda: encode_dimensions(frames), repeats)
+        decoded = decode_dimensions(encoded)
+        preserved = all(decoded[name].equals(frames[name]) for name in frames)
+
+        baseline = None
+        for storage, data in [("object", frames), ("categorical", encoded)]:
+            seconds, groups = _best_time(lambda: _groupby_all(data), repeats)
+            baseline = baseline or seconds
+            records.append({
+                "dataset": dataset,
+                "storage": storage,
+                "dimension_mb": round(dimension_memory(data) / 1e6, 2),
+                "groupby_seconds": round(seconds, 4),
+                "groupby_speedup": round(baseline / seconds, 2),
+                "groups": groups,
+                "encode_seconds": round(encode_seconds, 4) if storage == "categorical" else 0.0,
+                "values_preserved": preserved
+            })
+
+    return pd.DataFrame(records)
+
+# =============================================================================
+# EXPENSE CUBE
+# =============================================================================
+
+def bench_cube(rows: int, queries: int = 200, seed: int = 0) -> pd.DataFrame:
+    """
+    Gross / net queries on a synthetic ledger of `rows` lines: filtering the
+    lines for each query vs building the expense cube once and querying it.
+
+    Each query is the gross positive amount of one (function_l2, department)
+    pair, then of one expense category within that pair; the answers of
+    both methods are compared.
+    """
+    ledger = synthetic_ledger(rows, seed)["OPEX - NEmpl."]
+    rng = np.random.default_rng(seed)
+    picks = ledger.iloc[rng.integers(0, rows, queries)]
+    points = list(zip(picks["function_l2"], picks["department"], picks["expense_category"]))
+
+    def filtered():
+        answers = []
+        for function, department, category in points:
+            lines = ledger[(ledger["function_l2"] == function) & (ledger["department"] == department)]
+            answers.append(lines.loc[lines["2018_total"] > 0, "2018_total"].sum())
+            lines = lines[lines["expense_category"] == category]
+            answers.append(lines.loc[lines["2018_total"] > 0, "2018_total"].sum())
+        return answers
+
+    build_seconds, (cube, _) = _best_time(
+        lambda: expense_cube(build_fact_table({"OPEX - NEmpl.": ledger})), 1)
+
+    def from_cube():
+        return [cube.value("gross_positive", **where) for function, department, category in points
+                for where in [{"function_l2": function, "department": department},
+                              {"function_l2": function, "department": department, "expense_category": category}]]
+
+    filtered_seconds, expected = _best_time(filtered, 1)
+    first_seconds, answers = _best_time(from_cube, 1)
+    repeat_seconds, _ = _best_time(from_cube, 3)
+    matches = bool(np.allclose(answers, expected, rtol=0, atol=0.005))
+
+    records = [
+        {"method": "filter lines per query", "setup_seconds": 0.0, "queries": len(expected),
+         "query_seconds": round(filtered_seconds, 4), "us_per_query": round(filtered_seconds / len(expected) * 1e6, 1)},
+        {"method": "cube (first queries)", "setup_seconds": round(build_seconds, 4), "queries": len(answers),
+         "query_seconds": round(first_seconds, 4), "us_per_query": round(first_seconds / len(answers) * 1e6, 1)},
+        {"method": "cube (memoized)", "setup_seconds": 0.0, "queries": len(answers),
+         "query_seconds": round(repeat_seconds, 4), "us_per_query": round(repeat_seconds / len(answers) * 1e6, 1)}
+    ]
+    frame = pd.DataFrame(records)
+    frame["cells"] = len(cube.cells)
+    frame["answers_match"] = matches
+    return frame
+
+
+def bench_sweep(workbook: str, combinations: int = 1000, repeats: int = 3) -> pd.DataFrame:
+    """
+    Flag threshold sensitivity on the negative-value metrics of `workbook`:
+    rerunning classify_negative_patterns / generate_flag_register for each
+    of the first `combinations` grid combinations vs the broadcast sweep of
+    the whole FLAG_SWEEP_GRID. The flag counts of both are compared.
+    """
+    phase2 = load_phase("03_phase2_analysis")
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = phase2.load_normalized_data(use_cache=False, source=workbook)
+    negative_analysis = phase2.analyze_negative_values(data)
+
+    sweep_seconds, sweep = _best_time(lambda: phase2.flag_threshold_sweep(negative_analysis), repeats)
+    grid = sweep.head(combinations)
+
+    def rerun():
+        counts = []
+        for thresholds in grid[list(phase2.FLAG_THRESHOLDS)].to_dict("records"):
+            patterns = phase2.classify_negative_patterns(negative_analysis, thresholds)
+            counts.append(len(phase2.generate_flag_register(patterns, [], negative_analysis, thresholds)))
+        return counts
+
+    rerun_seconds, counts = _best_time(rerun, 1)
+    records = [
+        {"method": "rerun classifier per combination", "combinations": len(grid),
+         "seconds": round(rerun_seconds, 4), "us_per_combination": round(rerun_seconds / len(grid) * 1e6, 1)},
+        {"method": "broadcast sweep (full grid)", "combinations": len(sweep),
+         "seconds": round(sweep_seconds, 4), "us_per_combination": round(sweep_seconds / len(sweep) * 1e6, 2)}
+    ]
+    frame = pd.DataFrame(records)
+    frame["counts_match"] = counts == grid["flags"].tolist()
+    return frame
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    p_parallel = sub.add_parser("parallel", help="Phase 1 ingestion speedup vs worker count")
+    p_parallel.add_argument("--inputs", default=DEFAULT_INPUTS)
+    p_parallel.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    p_parallel.add_argument("--repeats", type=int, default=1)
+
+    p_layout = sub.add_parser("layout", help="Header detection: prefix-only vs full-sheet parse")
+    p_layout.add_argument("--inputs", default=DEFAULT_INPUTS)
+    p_layout.add_argument("--repeats", type=int, default=1)
+
+    p_readers = sub.add_parser("readers", help="Workbook parse speed and peak RSS per reader backend")
+    p_readers.add_argument("--workbook", default=DEFAULT_WORKBOOK)
+    p_readers.add_argument("--repeats", type=int, default=3)
+
+    p_money = sub.add_parser("money", help="Reconciliation totals: float64 vs exact int64 cents")
+    p_money.add_argument("--rows", type=int, default=DEFAULT_LEDGER_ROWS)
+    p_money.add_argument("--repeats", type=int, default=3)
+
+    p_dimensions = sub.add_parser("dimensions", help="Dimension columns: strings vs dictionary-encoded")
+    p_dimensions.add_argument("--workbook", default=DEFAULT_WORKBOOK)
+    p_dimensions.add_argument("--rows", type=int, default=DEFAULT_LEDGER_ROWS)
+    p_dimensions.add_argument("--repeats", type=int, default=3)
+
+    p_cube = sub.add_parser("cube", help="Gross/net queries: filtering lines vs the expense cube")
+    p_cube.add_argument("--rows", type=int, default=1_000_000)
+    p_cube.add_argument("--queries", type=int, default=200)
+
+    p_sweep = sub.add_parser("sweep", help="Flag threshold sensitivity: rerunning the classifier vs the broadcast sweep")
+    p_sweep.add_argument("--workbook", default=DEFAULT_WORKBOOK)
+    p_sweep.add_argument("--combinations", type=int, default=1000)
+    p_sweep.add_argument("--repeats", type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "parallel":
+        print(f"Parallel ingestion scaling: {args.inputs} (up to {args.max_workers} workers)")
+        print(bench_parallel(args.inputs, args.max_workers, args.repeats).to_string(index=False))
+    elif args.benchmark == "layout":
+        print(f"Header detection: {args.inputs}")
+        print(bench_layout(args.inputs, args.repeats).to_string(index=False))
+    elif args.benchmark == "readers":
+        print(f"Reader backends: {args.workbook} ({args.repeats} repeats, best time)")
+        print(bench_readers(args.workbook, args.repeats).to_string(index=False))
+    elif args.benchmark == "money":
+        print(f"Money totals: {args.rows:,} synthetic ledger lines ({args.repeats} repeats, best time)")
+        print(bench_money(args.rows, args.repeats).to_string(index=False))
+    elif args.benchmark == "dimensions":
+        print(f"Dimension storage: {args.workbook} and {args.rows:,} synthetic ledger lines "
+              f"({args.repeats} repeats, best time)")
+        print(bench_dimensions(args.workbook, args.rows, args.repeats).to_string(index=False))
+    elif args.benchmark == "cube":
+        print(f"Expense cube: {args.rows:,} synthetic ledger lines, {args.queries} query pairs")
+        print(bench_cube(args.rows, args.queries).to_string(index=False))
+    elif args.benchmark == "sweep":
+        print(f"Flag threshold sweep: {args.workbook} ({args.repeats} repeats, best time)")
+        print(bench_sweep(args.workbook, args.combinations, args.repeats).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Column Profiling Engine
+
+Computes every per-column statistic the Phase 1 QC artifacts need in one
+scan of a frame (a whole sheet, or one streamed chunk):
+
+- null count and row count                      -> 03_null_rate_summary.csv
+- pandas dtype and first non-null sample        -> 04_data_type_summary.csv
+- min/max and numeric-parse rate of the values  -> 04_data_type_summary.csv
+- distinct-count estimate (KMV sketch)          -> 04_data_type_summary.csv
+- non-numeric patterns in numeric columns       -> 06_numeric_pattern_summary.csv
+
+Profiles are plain JSON-serializable dicts, so they can be cached alongside
+the sheet layout, and merge_column_profiles() combines the profiles of
+consecutive chunks (or of different workers) into the profile of the whole.
+
+Used by:
+- scripts/01_ingestion_and_schema.py
+- scripts/02_phase1c_normalization.py (merge_dtypes)
+
+Author: Pipeline Infrastructure
+Date: 2026-10-18
+
+IMPORTANT: This module does NOT modify raw data files.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# Hashes kept per column by the distinct-count sketch. Columns with fewer
+# distinct values are counted exactly; above that the relative error is
+# about 1/sqrt(DISTINCT_SKETCH_SIZE) (~3%).
+DISTINCT_SKETCH_SIZE = 1024
+
+# Distinct example values kept per non-numeric pattern
+PATTERN_EXAMPLES = 3
+
+# Non-numeric value patterns that usually hide a number (checked in order)
+NUMERIC_PATTERNS = [
+    ("parentheses_negative", re.compile(r"^\s*\(.*\)\s*$")),
+    ("currency_symbol", re.compile(r"[$€£¥]")),
+    ("percent_sign", re.compile(r"%\s*$")),
+    ("thousands_separator", re.compile(r"\d,\d{3}")),
+    ("dash_placeholder", re.compile(r"^\s*[-–—]+\s*$")),
+    ("whitespace_only", re.compile(r"^\s*$")),
+]
+
+_HASH_SPACE = float(2 ** 64)
+
+# =============================================================================
+# PROFILE CONSTRUCTION
+# =============================================================================
+
+def new_column_profile(columns: List[str], pattern_columns: Iterable[str] = ()) -> Dict:
+    """
+    Create an empty profile for a sheet.
+
+    Args:
+        columns: the sheet's (normalized) column names
+        pattern_columns: columns expected to be numeric; their non-numeric
+                         values are classified for the 06 pattern summary
+    """
+    columns = list(columns)
+    return {
+        "row_count": 0,
+        "columns": columns,
+        "pattern_columns": [col for col in columns if col in set(pattern_columns)],
+        "null_counts": {col: 0 for col in columns},
+        "dtypes": {col: None for col in columns},
+        "samples": {col: None for col in columns},
+        "numeric_counts": {col: 0 for col in columns},
+        "mins": {col: None for col in columns},
+        "maxs": {col: None for col in columns},
+        "sketches": {col: [] for col in columns},
+        "patterns": {col: {} for col in columns}
+    }
+
+
+def _classify_non_numeric(value: Any) -> str:
+    text = str(value)
+    for name, pattern in NUMERIC_PATTERNS:
+        if pattern.search(text):
+            return name
+    return "other_text"
+
+
+def _merge_sketch(a: List[int], b: List[int]) -> List[int]:
+    """Union of two KMV sketches, keeping the DISTINCT_SKETCH_SIZE smallest hashes."""
+    if not b:
+        return a
+    merged = np.union1d(np.asarray(a, dtype=np.uint64), np.asarray(b, dtype=np.uint64))
+    return [int(h) for h in merged[:DISTINCT_SKETCH_SIZE]]
+
+
+def merge_dtypes(first: str, second: str) -> str:
+    """dtype of a column whose chunks have these two dtypes: numeric promotion, else object."""
+    if first == second:
+        return first
+    try:
+        a, b = np.dtype(first), np.dtype(second)
+    except TypeError:
+        return "object"
+    if a.kind in "biuf" and b.kind in "biuf":
+        return str(np.result_type(a, b))
+    return "object"
+
+
+def _merge_column_dtype(a: Dict, b: Dict, col: str) -> Optional[str]:
+    """
+    dtype of a column over two profiles: merge_dtypes of the sides that have
+    values; an all-null side's dtype is used only when neither has values.
+    """
+    a_typed = a["row_count"] > a["null_counts"][col]
+    b_typed = b["row_count"] > b["null_counts"][col]
+    if a_typed and b_typed:
+        return merge_dtypes(a["dtypes"][col], b["dtypes"][col])
+    if b_typed:
+        return b["dtypes"][col]
+    return a["dtypes"][col] if a_typed or a["dtypes"][col] is not None else b["dtypes"][col]
+
+
+def _merge_extreme(a: Optional[float], b: Optional[float], pick) -> Optional[float]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return pick(a, b)
+
+
+def profile_frame(df: pd.DataFrame, columns: List[str], pattern_columns: Iterable[str] = ()) -> Dict:
+    """
+    Profile one frame in a single pass.
+
+    The null mask is computed once for the whole frame; each column is then
+    parsed to numbers once (pd.to_numeric), which gives the numeric-parse
+    count, min/max and the non-numeric values to classify in one go.
+    """
+    profile = new_column_profile(columns, pattern_columns)
+    profile["row_count"] = len(df)
+    if len(df) == 0:
+        for col in columns:
+            profile["dtypes"][col] = str(df[col].dtype)
+        return profile
+
+    null_mask = df[columns].isna().to_numpy()
+    null_counts = null_mask.sum(axis=0)
+    has_value = ~null_mask.all(axis=0)
+    first_value = (~null_mask).argmax(axis=0)
+
+    for j, col in enumerate(columns):
+        series = df[col]
+        profile["null_counts"][col] = int(null_counts[j])
+        profile["dtypes"][col] = str(series.dtype)
+        if not has_value[j]:
+            continue
+
+        profile["samples"][col] = str(series.iloc[first_value[j]])
+
+        values = series[~null_mask[:, j]]
+        parsed = pd.to_numeric(values, errors="coerce")
+        if parsed.dtype == bool:
+            parsed = parsed.astype(float)
+        parsed_ok = parsed.notna().to_numpy()
+        profile["numeric_counts"][col] = int(parsed_ok.sum())
+        if parsed_ok.any():
+            profile["mins"][col] = float(parsed[parsed_ok].min())
+            profile["maxs"][col] = float(parsed[parsed_ok].max())
+
+        hashes = pd.util.hash_pandas_object(values.astype(str), index=False).to_numpy()
+        profile["sketches"][col] = [int(h) for h in np.unique(hashes)[:DISTINCT_SKETCH_SIZE]]
+
+        if col in profile["pattern_columns"] and not parsed_ok.all():
+            non_numeric = values[~parsed_ok]
+            kinds = non_numeric.map(_classify_non_numeric)
+            for kind, group in non_numeric.groupby(kinds.to_numpy(), sort=False):
+                profile["patterns"][col][kind] = {
+                    "count": int(len(group)),
+                    "examples": list(pd.unique(group.astype(str))[:PATTERN_EXAMPLES])
+                }
+
+    return profile
+
+
+def merge_column_profiles(a: Dict, b: Dict) -> Dict:
+    """
+    Combine the profiles of two frames with the same columns, `a` coming first.
+
+    First-seen values (sample, pattern examples) are taken from `a` when it
+    has them and dtypes are promoted as Phase 1c merges chunk dtypes
+    (merge_dtypes: int + float -> float64, numbers + text -> object), so
+    merging chunks in sheet order gives the same profile as profiling the
+    whole sheet at once.
+    """
+    merged = new_column_profile(a["columns"], a["pattern_columns"])
+    merged["row_count"] = a["row_count"] + b["row_count"]
+
+    for col in a["columns"]:
+        merged["null_counts"][col] = a["null_counts"][col] + b["null_counts"][col]
+        merged["numeric_counts"][col] = a["numeric_counts"][col] + b["numeric_counts"][col]
+        merged["dtypes"][col] = _merge_column_dtype(a, b, col)
+        merged["samples"][col] = a["samples"][col] if a["samples"][col] is not None else b["samples"][col]
+        merged["mins"][col] = _merge_extreme(a["mins"][col], b["mins"][col], min)
+        merged["maxs"][col] = _merge_extreme(a["maxs"][col], b["maxs"][col], max)
+        merged["sketches"][col] = _merge_sketch(a["sketches"][col], b["sketches"][col])
+
+        patterns = {kind: dict(entry, examples=list(entry["examples"])) for kind, entry in a["patterns"][col].items()}
+        for kind, entry in b["patterns"][col].items():
+            if kind in patterns:
+                patterns[kind]["count"] += entry["count"]
+                examples = patterns[kind]["examples"]
+                for example in entry["examples"]:
+                    if len(examples) < PATTERN_EXAMPLES and example not in examples:
+                        examples.append(example)
+            else:
+                patterns[kind] = dict(entry, examples=list(entry["examples"]))
+        merged["patterns"][col] = patterns
+
+    return merged
+
+
+def update_column_profile(profile: Dict, df: pd.DataFrame) -> Dict:
+    """Fold a frame (a whole sheet or the next streamed chunk) into a profile."""
+    return merge_column_profiles(profile, profile_frame(df, profile["columns"], profile["pattern_columns"]))
+
+
+def distinct_estimate(sketch: List[int]) -> int:
+    """Distinct-count estimate from a KMV sketch (exact below DISTINCT_SKETCH_SIZE)."""
+    if len(sketch) < DISTINCT_SKETCH_SIZE:
+        return len(sketch)
+    kth = (sketch[-1] + 1) / _HASH_SPACE
+    return int(round((DISTINCT_SKETCH_SIZE - 1) / kth))
+
+# =============================================================================
+# QC REPORTS
+# =============================================================================
+
+def null_rate_report(profiles: Dict[str, Dict]) -> pd.DataFrame:
+    """03: null count and null rate per column, keyed by sheet."""
+    frames = []
+    for sheet_key, profile in profiles.items():
+        total_rows = profile["row_count"]
+        null_counts = pd.Series(profile["null_counts"], dtype="int64")
+        frames.append(pd.DataFrame({
+            "sheet_name": sheet_key,
+            "column": profile["columns"],
+            "null_count": null_counts.values,
+            "total_rows": total_rows,
+            "null_rate_pct": (null_counts / total_rows * 100).round(2).values
+        }))
+    if frames:
+        return pd.concat(frames, ignore_index=True)
+    return pd.DataFrame()
+
+
+def dtype_report(profiles: Dict[str, Dict]) -> pd.DataFrame:
+    """04: dtype and sample per column, with value range, distinct estimate and numeric-parse rate."""
+    records = []
+    for sheet_key, profile in profiles.items():
+        for col in profile["columns"]:
+            non_null = profile["row_count"] - profile["null_counts"][col]
+            sample = profile["samples"][col]
+            records.append({
+                "sheet_key": sheet_key,
+                "column": col,
+                "pandas_dtype": profile["dtypes"][col],
+                "sample_value": sample if sample is not None else "N/A",
+                "min_value": profile["mins"][col],
+                "max_value": profile["maxs"][col],
+                "distinct_estimate": distinct_estimate(profile["sketches"][col]),
+                "numeric_parse_rate_pct": round(profile["numeric_counts"][col] / non_null * 100, 2) if non_null else np.nan
+            })
+    return pd.DataFrame(records)
+
+
+def numeric_pattern_report(profiles: List[Tuple[str, Dict]]) -> pd.DataFrame:
+    """
+    06: non-numeric patterns found in the columns expected to be numeric.
+
+    Takes (sheet name, profile) pairs, since the report is keyed by the plain
+    sheet name and several workbooks may share sheet names.
+    """
+    records = []
+    for sheet_name, profile in profiles:
+        for col in profile["pattern_columns"]:
+            base = {
+                "sheet": sheet_name,
+                "column": col,
+                "current_dtype": profile["dtypes"][col],
+            }
+            total_values = profile["row_count"] - profile["null_counts"][col]
+            patterns = profile["patterns"][col]
+            if not patterns:
+                records.append(dict(base, pattern_type="all_numeric", pattern_count=0,
+                                    pattern_examples="N/A", total_values=total_values))
+                continue
+            for kind, entry in patterns.items():
+                records.append(dict(base, pattern_type=kind, pattern_count=entry["count"],
+                                    pattern_examples="; ".join(entry["examples"]), total_values=total_values))
+    return pd.DataFrame(records)
@@ -0,0 +1,169 @@
+"""
+Dimension Column Storage
+
+Storage of the ledger dimension columns (function, department, expense
+category, vendor, tier, type, customer) that Rule 5 keeps as strings. They
+repeat a few hundred distinct values over every line of a sheet, which
+makes them the largest columns in memory and the slowest groupby keys.
+
+Two modes:
+- "object":       the columns as Rule 5 leaves them (the default).
+- "categorical":  each column is dictionary-encoded: integer codes into one
+                  dictionary per dimension, shared by every sheet, so a
+                  department or vendor has the same code in OPEX, COGS and
+                  Empl. and frames can be concatenated without re-encoding.
+                  Dictionaries hold the exact original values (missing
+                  values stay missing), so decoding returns every value
+                  unchanged and Rule 5 still holds. Dictionaries are sorted,
+                  so groupby results come out in the same order as with
+                  string keys.
+
+See `python scripts/benchmarks.py dimensions` for the memory and groupby
+gains on the sample workbook and on a synthetic ledger.
+
+Used by:
+- scripts/03_phase2_analysis.py
+- scripts/run_pipeline.py
+- scripts/run_portfolio.py
+- scripts/ledger_analytics.py
+
+Author: Pipeline Infrastructure
+Date: 2026-10-18
+
+IMPORTANT: This module does NOT modify raw data files.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# Rule 5 string columns that are dimensions of the ledger (not free text)
+DIMENSION_COLUMNS = [
+    "function_l1", "function_l2", "department", "expense_category",
+    "vendor", "tier", "type", "customer_name"
+]
+
+STORAGE_MODES = ["object", "categorical"]
+DEFAULT_STORAGE_MODE = "object"
+
+# =============================================================================
+# DICTIONARIES
+# =============================================================================
+
+def factorize_dimensions(frames: Dict[str, pd.DataFrame],
+                         columns: List[str] = DIMENSION_COLUMNS) -> Dict[str, Dict[str, Tuple[np.ndarray, pd.Index]]]:
+    """
+    Codes and distinct values of every dimension column of every frame.
+
+    Returns:
+        Dict mapping sheet name to {column: (codes, uniques)}; code -1 marks
+        a missing value. Encoded columns give their own codes and dictionary.
+    """
+    factorized = {}
+    for sheet_name, df in frames.items():
+        factorized[sheet_name] = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                factorized[sheet_name][col] = (df[col].cat.codes.to_numpy(), df[col].cat.categories)
+            else:
+                factorized[sheet_name][col] = pd.factorize(df[col])
+    return factorized
+
+
+def build_dictionaries(frames: Dict[str, pd.DataFrame], columns: List[str] = DIMENSION_COLUMNS,
+                       factorized: Optional[Dict] = None) -> Dict[str, pd.CategoricalDtype]:
+    """
+    One dictionary per dimension: the distinct values of the column across
+    every frame that has it, sorted (in order of appearance if the values
+    do not sort, e.g. mixed types).
+
+    Returns:
+        Dict mapping column name to its CategoricalDtype
+    """
+    if factorized is None:
+        factorized = factorize_dimensions(frames, columns)
+
+    dictionaries = {}
+    for col in columns:
+        parts = [pd.Series(sheet[col][1]) for sheet in factorized.values() if col in sheet]
+        if not parts:
+            continue
+
+        values = pd.Index(pd.concat(parts, ignore_index=True).unique())
+        try:
+            values = values.sort_values()
+        except TypeError:
+            pass
+        dictionaries[col] = pd.CategoricalDtype(values)
+
+    return dictionaries
+
+# =============================================================================
+# ENCODING
+# =============================================================================
+
+def encode_dimensions(frames: Dict[str, pd.DataFrame],
+                      dictionaries: Optional[Dict[str, pd.CategoricalDtype]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Dictionary-encode the dimension columns of every frame.
+
+    Each column is factorized once; its codes are remapped onto the shared
+    dictionary, which is cheaper than looking every value up in it.
+    Returns new frames (the input frames are not modified); columns without
+    a dictionary are left as they are. Raises ValueError if a dictionary
+    lacks a value of its column, since encoding would drop that value.
+    """
+    columns = list(dictionaries) if dictionaries is not None else DIMENSION_COLUMNS
+    factorized = factorize_dimensions(frames, columns)
+    if dictionaries is None:
+        dictionaries = build_dictionaries(frames, columns, factorized)
+
+    encoded = {}
+    for sheet_name, df in frames.items():
+        encoded_columns = {}
+        for col, (codes, uniques) in factorized[sheet_name].items():
+            dtype = dictionaries[col]
+            positions = dtype.categories.get_indexer(uniques)
+            if (positions < 0).any():
+                raise ValueError(f"[{sheet_name}] Dictionary for '{col}' is missing values of the column")
+            # Code -1 (missing) picks the trailing -1
+            shared_codes = np.append(positions, -1)[codes]
+            encoded_columns[col] = pd.Categorical.from_codes(shared_codes, dtype=dtype)
+        encoded[sheet_name] = df.assign(**encoded_columns) if encoded_columns else df
+    return encoded
+
+
+def decode_dimensions(frames: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Inverse of encode_dimensions(): dimension columns back to their values' dtype."""
+    decoded = {}
+    for sheet_name, df in frames.items():
+        columns = {
+            col: df[col].astype(df[col].cat.categories.dtype)
+            for col in DIMENSION_COLUMNS
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype)
+        }
+        decoded[sheet_name] = df.assign(**columns) if columns else df
+    return decoded
+
+
+def store_dimensions(frames: Dict[str, pd.DataFrame], mode: str = DEFAULT_STORAGE_MODE) -> Dict[str, pd.DataFrame]:
+    """Frames with their dimension columns stored in the given mode."""
+    if mode == "object":
+        return frames
+    if mode != "categorical":
+        raise ValueError(f"Unknown storage mode '{mode}' (expected one of {STORAGE_MODES})")
+    return encode_dimensions(frames)
+
+
+def dimension_memory(frames: Dict[str, pd.DataFrame], columns: List[str] = DIMENSION_COLUMNS) -> int:
+    """Bytes held by the dimension columns of every frame (deep, including the strings)."""
+    return int(sum(
+        df[col].memory_usage(index=False, deep=True)
+        for df in frames.values() for col in columns if col in df.columns
+    ))
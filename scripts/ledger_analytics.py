@@ -0,0 +1,646 @@
+"""
+Ledger Analytics
+
+Cross-sheet analysis of the normalized ledger. The detail sheets (OPEX,
+COGS, Empl. and the three revenue sheets) are stacked into one long fact
+table, so an aggregate that spans sheets is one grouped computation over
+one frame instead of one scan per sheet.
+
+Fact table (one row per detail line, in sheet order then line order):
+    source_sheet   sheet the line comes from (categorical, FACT_SHEETS order)
+    line_type      "revenue", "hc_expense" or "nonhc_expense" (categorical)
+    function_l1 .. customer_name
+                   the shared dimension columns (dimensions.DIMENSION_COLUMNS);
+                   missing where the sheet has no such column
+    amount         the sheet's 2018_total
+
+Dimension columns keep their storage: dictionary-encoded sheets (see
+dimensions.py) share one dictionary per dimension, so the stacked columns
+stay encoded.
+
+Aggregates over the fact table:
+- fact_totals():       amount totals per sheet and any dimensions
+- negative_metrics():  total, abs total and negative count / sum / abs sum /
+                       % per sheet and any dimensions (negative value analysis)
+
+Expense cube: the expense lines (OPEX, COGS, Empl.) aggregated once by
+source sheet x function_l1 x function_l2 x department x expense_category x
+vendor (CUBE_DIMENSIONS), one cell per populated combination. Each cell
+holds the gross positive, gross negative, net and absolute amounts and the
+line counts (CUBE_MEASURES). Amounts are kept in int64 cents (see money.py),
+so a rollup is exact and the same whichever cells it is summed from.
+ExpenseCube answers rollup and slice queries from memoized rollups (each
+set of dimensions is rolled up from the cells once), so a repeated query is
+a lookup, not a scan of the lines. The cells are cached in .cache/cube/
+under a key of the expense sheets' normalized frame cache keys (sheet
+content + normalization definition, see ledger_io.sheet_cache_key) and the
+source of the fact table / cube build functions: editing any of those
+sheets, changing how they are normalized or changing the build rebuilds
+the cube on the next run.
+
+Offset ratios (offset_ratios()): from the cube, gross (positive lines),
+offsets (negative lines), net and offset ratio (offsets as a % of gross)
+of every function_l2 x expense_category x department cell of the non-HC
+sheets, each bucketed Low (<10%), Partial (10-50%) or High (>=50%).
+
+Benchmark evaluation (evaluate_benchmarks()): every line of the Benchmarks
+sheet is compared with the expense lines a declarative map assigns to it,
+as % of revenue, on net (all lines) and gross (positive lines) bases.
+Benchmark map entry:
+    {"area": "G&A", "lines": ["Shared Services", "Executive team"],
+     "sheets": ["OPEX - NEmpl."], "filters": {"function_l2": ["G&A"]}}
+
+    lines    Benchmarks lines whose percentages add up to the area's
+             benchmark (a composite) or a single line (a direct mapping)
+    sheets   expense sheets whose lines are totalled
+    filters  optional; column -> values a line must have (all must match)
+    union    instead of sheets / filters: areas of other entries; the
+             lines of any of them are totalled, each line once (e.g. an
+             expense total on the same basis as its component lines)
+    measure  "share" (default): the total as % of revenue, adverse above
+             the benchmark; "margin": revenue less the total as % of
+             revenue, adverse below the benchmark (net basis only: revenue
+             less the positive lines alone is not a margin)
+The fact table is grouped once by the map's sheets and filter columns (and
+any entity / period key columns); each entry selects its groups with a
+vectorized membership test, so the cost does not grow with the number of
+entries, entities or periods.
+
+Used by:
+- scripts/03_phase2_analysis.py
+- scripts/benchmarks.py
+
+Author: Pipeline Infrastructure
+Date: 2026-10-18
+
+IMPORTANT: This module does NOT modify raw data files.
+"""
+
+import inspect
+
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+from dimensions import DIMENSION_COLUMNS
+from money import MONEY_MODES, DEFAULT_MONEY_MODE, MINOR_UNITS, money_group_totals, to_minor_units
+from ledger_io import definition_fingerprint, load_cached_sheet, save_cached_sheet
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# Detail sheets stacked into the fact table, with the line type of each
+FACT_SHEETS = {
+    "OPEX - NEmpl.": "nonhc_expense",
+    "COGS - NEmpl.": "nonhc_expense",
+    "Empl.": "hc_expense",
+    "RecurringRevenue": "revenue",
+    "PSORevenue": "revenue",
+    "PerpetualRevenue": "revenue"
+}
+
+LINE_TYPES = ["revenue", "hc_expense", "nonhc_expense"]
+
+AMOUNT_COLUMN = "2018_total"
+
+# Columns of negative_metrics()
+NEGATIVE_METRICS = ["total", "abs_total", "neg_count", "neg_sum", "neg_abs_sum", "neg_pct"]
+
+# Expense cube: sheets, dimensions (in index order) and measures
+CUBE_SHEETS = ["OPEX - NEmpl.", "COGS - NEmpl.", "Empl."]
+CUBE_DIMENSIONS = ["source_sheet", "function_l1", "function_l2", "department", "expense_category", "vendor"]
+CUBE_MEASURES = ["gross_positive", "gross_negative", "net", "abs_total", "count", "pos_count", "neg_count"]
+
+# Stored per cell: cents and residual of the positive and negative amounts
+# (net and abs_total are derived from them) plus the line counts
+CUBE_CELL_COLUMNS = ["pos_cents", "pos_residual", "neg_cents", "neg_residual", "count", "pos_count", "neg_count"]
+
+CUBE_CACHE_DIR = ".cache/cube"
+
+# Offset ratios: sheets and cell dimensions of offset_ratios()
+OFFSET_SHEETS = ["OPEX - NEmpl.", "COGS - NEmpl."]
+OFFSET_DIMENSIONS = ["function_l2", "expense_category", "department"]
+
+# Offset ratio buckets: (label, lower bound % inclusive), ascending
+OFFSET_BUCKETS = [("Low Offset", 0.0), ("Partial", 10.0), ("High Offset", 50.0)]
+NO_GROSS_BUCKET = "No Gross"
+
+# =============================================================================
+# FACT TABLE
+# =============================================================================
+
+def build_fact_table(data: Dict[str, pd.DataFrame], sheets: Optional[Dict[str, str]] = None,
+                     dimensions: List[str] = DIMENSION_COLUMNS) -> pd.DataFrame:
+    """
+    Stack the detail sheets into one long fact table (see module docstring).
+
+    Sheets of `sheets` (default FACT_SHEETS) missing from `data` are left
+    out. Returns a new frame; the sheets are not modified.
+    """
+    sheets = {name: line_type for name, line_type in (sheets or FACT_SHEETS).items() if name in data}
+    frames = [data[name] for name in sheets]
+    lengths = np.array([len(df) for df in frames], dtype=np.int64)
+    names = list(sheets)
+
+    # Each dimension keeps the dtype of the first sheet that has it
+    dtypes = {}
+    for col in dimensions:
+        for df in frames:
+            if col in df.columns:
+                dtypes[col] = df[col].dtype
+                break
+
+    sheet_codes = np.repeat(np.arange(len(names)), lengths)
+    line_type_codes = np.array([LINE_TYPES.index(sheets[name]) for name in names], dtype=np.int64)
+    fact = {
+        "source_sheet": pd.Categorical.from_codes(sheet_codes, categories=names),
+        "line_type": pd.Categorical.from_codes(line_type_codes[sheet_codes], categories=LINE_TYPES)
+    }
+
+    for col, dtype in dtypes.items():
+        parts = [
+            df[col].reset_index(drop=True) if col in df.columns else pd.Series(np.nan, index=range(len(df)), dtype=dtype)
+            for df in frames
+        ]
+        fact[col] = pd.concat(parts, ignore_index=True) if parts else pd.Series([], dtype=dtype)
+
+    fact["amount"] = np.concatenate([df[AMOUNT_COLUMN].to_numpy(dtype=float) for df in frames]) \
+        if frames else np.array([], dtype=float)
+
+    return pd.DataFrame(fact)
+
+# =============================================================================
+# AGGREGATES
+# =============================================================================
+
+def fact_totals(fact: pd.DataFrame, by: List[str]) -> pd.Series:
+    """
+    Amount totals per source sheet and `by` columns, for every sheet in one
+    grouped pass. Lines with a missing `by` value are left out, as in a
+    per-sheet groupby.
+
+    Returns:
+        Series indexed by (source_sheet, *by), sheets in fact table order and
+        keys sorted within each sheet
+    """
+    return fact.groupby(["source_sheet", *by], observed=True)["amount"].sum()
+
+
+def sheet_totals(totals: pd.Series, sheet_name: str) -> pd.Series:
+    """The totals of one sheet from fact_totals() (empty if the sheet has no lines)."""
+    if sheet_name not in totals.index.get_level_values(0):
+        return totals.iloc[:0].droplevel(0)
+    return totals.xs(sheet_name, level=0)
+
+# =============================================================================
+# NEGATIVE VALUE METRICS
+# =============================================================================
+
+def negative_metrics(fact: pd.DataFrame, by: Optional[List[str]] = None,
+                     money_mode: str = DEFAULT_MONEY_MODE) -> pd.DataFrame:
+    """
+    Negative value metrics per source sheet and `by` columns, for every
+    sheet and every value in one grouped pass.
+
+    Lines are numbered by group once; the sums are grouped totals in
+    `money_mode` (see money.money_group_totals), so in float mode each
+    metric equals the sum over that group's filtered lines. Missing amounts
+    are skipped; lines with a missing `by` value are left out. neg_pct is
+    neg_abs_sum as a % of abs_total (0 when abs_total is 0).
+
+    Returns:
+        DataFrame indexed by (source_sheet, *by) with the NEGATIVE_METRICS
+        columns; groups in order of first appearance (sheet order, then
+        line order within each sheet)
+    """
+    grouped = fact.groupby([fact[col] for col in ["source_sheet", *(by or [])]], observed=True, sort=False)
+    index = grouped.size().index
+    ids = grouped.ngroup().to_numpy(dtype=float)
+    ids = np.where(np.isnan(ids), -1, ids).astype(np.int64)
+
+    amount = fact["amount"].to_numpy(dtype=float)
+    valid = ids >= 0
+    negative = valid & (amount < 0)
+
+    def totals(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        grouped_totals = money_group_totals(values[mask], ids[mask], money_mode)
+        return grouped_totals.reindex(np.arange(len(index)), fill_value=0.0).to_numpy()
+
+    metrics = pd.DataFrame({
+        "total": totals(amount, valid),
+        "abs_total": totals(np.abs(amount), valid),
+        "neg_count": np.bincount(ids[negative], minlength=len(index)).astype(np.int64),
+        "neg_sum": totals(amount, negative),
+        "neg_abs_sum": totals(-amount, negative)
+    }, index=index)
+
+    abs_total = metrics["abs_total"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics["neg_pct"] = np.where(abs_total != 0, metrics["neg_abs_sum"].to_numpy() / abs_total * 100, 0.0)
+    return metrics[NEGATIVE_METRICS]
+
+# =============================================================================
+# EXPENSE CUBE
+# =============================================================================
+
+def build_cube_cells(fact: pd.DataFrame, sheets: List[str] = CUBE_SHEETS,
+                     dimensions: List[str] = CUBE_DIMENSIONS) -> pd.DataFrame:
+    """
+    Base cells of the expense cube: one grouped pass over the expense lines
+    of the fact table.
+
+    A dimension a sheet does not have (Empl. has no expense_category or
+    vendor) is a missing key, kept as a cell of its own so every line is in
+    the cube. Lines with a missing amount count towards no measure.
+
+    Returns:
+        DataFrame indexed by `dimensions` (sorted) with the CUBE_CELL_COLUMNS
+    """
+    lines = fact[fact["source_sheet"].isin(sheets)]
+    amount = lines["amount"].to_numpy(dtype=float)
+    cents, residual = to_minor_units(amount)
+    if residual is None:
+        residual = np.zeros(len(amount))
+    positive = amount > 0
+    negative = amount < 0
+
+    columns = {
+        "pos_cents": np.where(positive, cents, 0),
+        "pos_residual": np.where(positive, residual, 0.0),
+        "neg_cents": np.where(negative, cents, 0),
+        "neg_residual": np.where(negative, residual, 0.0),
+        "count": (~np.isnan(amount)).astype(np.int64),
+        "pos_count": positive.astype(np.int64),
+        "neg_count": negative.astype(np.int64)
+    }
+    keys = [lines[col] if col in lines.columns else pd.Series(np.nan, index=lines.index) for col in dimensions]
+    cells = pd.DataFrame(columns, index=lines.index).groupby(keys, observed=True, dropna=False, sort=True).sum()
+    cells.index.names = dimensions
+    return cells[CUBE_CELL_COLUMNS]
+
+
+def _sum_cells(cells: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    """Cube cells summed per combination of the `by` index levels (one row when `by` is empty)."""
+    if not by:
+        return cells.sum().to_frame().T.astype(cells.dtypes.to_dict())
+    return cells.groupby(level=by, observed=True, dropna=False, sort=True).sum()
+
+
+def _cube_measures(cells: pd.DataFrame) -> pd.DataFrame:
+    """CUBE_MEASURES of summed cells: amounts from cents and residual, net and abs_total derived."""
+    positive = cells["pos_cents"].to_numpy() / MINOR_UNITS + cells["pos_residual"].to_numpy()
+    negative = cells["neg_cents"].to_numpy() / MINOR_UNITS + cells["neg_residual"].to_numpy()
+    net = (cells["pos_cents"] + cells["neg_cents"]).to_numpy() / MINOR_UNITS \
+        + (cells["pos_residual"] + cells["neg_residual"]).to_numpy()
+    absolute = (cells["pos_cents"] - cells["neg_cents"]).to_numpy() / MINOR_UNITS \
+        + (cells["pos_residual"] - cells["neg_residual"]).to_numpy()
+    return pd.DataFrame({
+        "gross_positive": positive,
+        "gross_negative": negative,
+        "net": net,
+        "abs_total": absolute,
+        "count": cells["count"].to_numpy(),
+        "pos_count": cells["pos_count"].to_numpy(),
+        "neg_count": cells["neg_count"].to_numpy()
+    }, index=cells.index)
+
+
+class ExpenseCube:
+    """
+    Gross / net / negative measures of the expense lines over the expense
+    hierarchy (see module docstring).
+
+    `key` identifies the normalized sheets and build logic the cells were
+    built from (None for a cube built from frames only); a cube whose key
+    differs from expense_cube_key() of the current sheets is stale.
+    """
+
+    def __init__(self, cells: pd.DataFrame, key: Optional[str] = None):
+        self.cells = cells
+        self.key = key
+        self.dimensions = list(cells.index.names)
+        self._summed: Dict[Tuple[str, ...], pd.DataFrame] = {}
+        self._rollups: Dict[Tuple[str, ...], pd.DataFrame] = {}
+        self._lookups: Dict[Tuple[str, ...], Tuple[Dict[Tuple, int], Dict[str, np.ndarray]]] = {}
+
+    def _summed_cells(self, dimensions: List[str]) -> pd.DataFrame:
+        """Cells summed per combination of `dimensions` (cube order), memoized."""
+        unknown = [dim for dim in dimensions if dim not in self.dimensions]
+        if unknown:
+            raise KeyError(f"Unknown cube dimensions {unknown} (expected some of {self.dimensions})")
+        dims = tuple(dim for dim in self.dimensions if dim in set(dimensions))
+        if dims not in self._summed:
+            self._summed[dims] = _sum_cells(self.cells, list(dims))
+        return self._summed[dims]
+
+    def rollup(self, by: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        CUBE_MEASURES per combination of the `by` dimensions (one unnamed
+        row when `by` is empty), in cube dimension order. Each set of
+        dimensions is rolled up from the cells once and memoized.
+        """
+        summed = self._summed_cells(list(by or []))
+        dims = tuple(summed.index.names) if by else ()
+        if dims not in self._rollups:
+            self._rollups[dims] = _cube_measures(summed)
+        return self._rollups[dims]
+
+    def slice(self, where: Dict[str, Any], by: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        CUBE_MEASURES per combination of the `by` dimensions, over the lines
+        whose dimensions match `where` (dimension -> value or list of values;
+        NaN selects the lines missing that dimension).
+
+        Returns:
+            DataFrame indexed by `by` in the order given, sorted (one
+            unnamed row when `by` is empty); empty when nothing matches
+        """
+        by = list(by or [])
+        summed = self._summed_cells(by + [dim for dim in where if dim not in by])
+
+        mask = np.ones(len(summed), dtype=bool)
+        for dim, value in where.items():
+            values = value if isinstance(value, (list, tuple, set, pd.Index, np.ndarray)) else [value]
+            mask &= summed.index.get_level_values(dim).isin(list(values))
+        selected = summed[mask]
+
+        if len(by) < selected.index.nlevels or not by:
+            selected = _sum_cells(selected, by)
+        if by and list(selected.index.names) != by:
+            selected = selected.reorder_levels(by).sort_index()
+        return _cube_measures(selected)
+
+    def value(self, measure: str, **where) -> Any:
+        """
+        One measure over the lines matching `where` (dimension=value keyword
+        arguments). A point query (one non-missing value per dimension) is a
+        dictionary lookup into the memoized rollup of those dimensions.
+        """
+        if measure not in CUBE_MEASURES:
+            raise KeyError(f"Unknown cube measure '{measure}' (expected one of {CUBE_MEASURES})")
+        if any(isinstance(v, (list, tuple, set, pd.Index, np.ndarray)) or pd.isna(v) for v in where.values()):
+            return self.slice(where)[measure].iloc[0]
+
+        dims = tuple(self._summed_cells(list(where)).index.names) if where else ()
+        if dims not in self._lookups:
+            rollup = self.rollup(list(dims))
+            keys = rollup.index if len(dims) > 1 else [(key,) for key in rollup.index]
+            self._lookups[dims] = (
+                {key: position for position, key in enumerate(keys)} if dims else {(): 0},
+                {col: rollup[col].to_numpy() for col in CUBE_MEASURES}
+            )
+        positions, measures = self._lookups[dims]
+        position = positions.get(tuple(where[dim] for dim in dims))
+        if position is None:
+            return 0 if measure.endswith("count") else 0.0
+        return measures[measure][position].item()
+
+
+def cube_definition(dimensions: List[str] = CUBE_DIMENSIONS) -> Dict:
+    """
+    Definition of the cube build, used as the cache key input.
+
+    Built from the source of the fact table and cube cell functions, so any
+    change to how the cells are computed invalidates cached cubes.
+    """
+    functions = [build_fact_table, build_cube_cells, to_minor_units]
+    return {
+        "stage": "expense_cube",
+        "logic": definition_fingerprint([inspect.getsource(fn) for fn in functions]),
+        "dimensions": list(dimensions),
+        "cell_columns": CUBE_CELL_COLUMNS
+    }
+
+
+def expense_cube_key(sheet_keys: Dict[str, str], sheets: List[str] = CUBE_SHEETS,
+                     dimensions: List[str] = CUBE_DIMENSIONS) -> str:
+    """
+    Cache key of the cube: the normalized frame cache key of each expense
+    sheet (ledger_io.sheet_cache_key: content hash + normalization
+    definition) + the cube definition.
+    """
+    return definition_fingerprint({
+        "sheets": {sheet: sheet_keys.get(sheet) for sheet in sheets},
+        "definition": cube_definition(dimensions)
+    })
+
+
+def expense_cube(fact: pd.DataFrame, key: Optional[str] = None, use_cache: bool = True,
+                 cache_dir: str = CUBE_CACHE_DIR) -> Tuple[ExpenseCube, bool]:
+    """
+    The expense cube of the fact table's lines: read from the cube cache
+    when an entry for `key` exists, otherwise built and cached under `key`.
+    Without a key the cube is built and not cached.
+
+    Returns:
+        Tuple of (cube, whether it was read from the cache)
+    """
+    if key is not None and use_cache:
+        cached = load_cached_sheet(key, cache_dir)
+        if cached is not None and cached[0] is not None:
+            return ExpenseCube(cached[0].set_index(CUBE_DIMENSIONS), key), True
+
+    cells = build_cube_cells(fact)
+    if key is not None and use_cache:
+        save_cached_sheet(key, cells.reset_index(), {"dimensions": CUBE_DIMENSIONS, "cells": len(cells)}, cache_dir)
+    return ExpenseCube(cells, key), False
+
+# =============================================================================
+# OFFSET RATIOS
+# =============================================================================
+
+def offset_bucket(ratio_pct: Any) -> Any:
+    """OFFSET_BUCKETS label of offset ratios (%), NO_GROSS_BUCKET where the ratio is undefined."""
+    ratios = np.asarray(ratio_pct, dtype=float)
+    labels = np.array([label for label, _ in OFFSET_BUCKETS] + [NO_GROSS_BUCKET], dtype=object)
+    bounds = np.array([bound for _, bound in OFFSET_BUCKETS[1:]])
+    codes = np.where(np.isnan(ratios), len(OFFSET_BUCKETS), np.searchsorted(bounds, ratios, side="right"))
+    return labels[codes] if ratios.ndim else labels[int(codes)]
+
+
+def offset_ratios(cube: ExpenseCube, by: List[str] = OFFSET_DIMENSIONS, sheets: List[str] = OFFSET_SHEETS,
+                  revenue: Optional[float] = None) -> pd.DataFrame:
+    """
+    Gross, offsets, net and offset ratio per source sheet and `by` cell,
+    all cells at once from the cube.
+
+    gross is the total of the positive lines and offsets the total of the
+    negative lines (<= 0); offset_ratio_pct is -offsets as a % of gross,
+    missing where there is no gross. gross_lines counts the non-negative
+    lines (zero lines add nothing to gross). With `revenue`, gross and net
+    are also given as a % of revenue.
+
+    Returns:
+        DataFrame with one row per cell (source_sheet, *by, then the
+        measures), in sheet order then `by` order
+    """
+    cells = cube.slice({"source_sheet": sheets}, ["source_sheet", *by])
+    gross = cells["gross_positive"].to_numpy()
+    offsets = cells["gross_negative"].to_numpy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(gross > 0, -offsets / gross * 100 + 0.0, np.nan)
+
+    table = pd.DataFrame({
+        "gross": gross,
+        "offsets": offsets,
+        "net": cells["net"].to_numpy(),
+        "offset_ratio_pct": ratio,
+        "offset_bucket": offset_bucket(ratio),
+        "gross_lines": (cells["count"] - cells["neg_count"]).to_numpy(),
+        "offset_lines": cells["neg_count"].to_numpy()
+    }, index=cells.index)
+    if revenue:
+        table["gross_pct_of_revenue"] = table["gross"] / revenue * 100
+        table["net_pct_of_revenue"] = table["net"] / revenue * 100
+
+    # Sheets in cube order (the source_sheet level sorts by name otherwise)
+    order = {sheet: position for position, sheet in enumerate(sheets)}
+    table = table.iloc[np.argsort([order[sheet] for sheet in table.index.get_level_values(0)], kind="stable")]
+    return table.reset_index()
+
+
+def offset_bucket_summary(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Gross and net of an offset_ratios() table per bucket, with each bucket's
+    share of the table's gross and net (%), buckets in OFFSET_BUCKETS order.
+    """
+    buckets = [label for label, _ in OFFSET_BUCKETS] + [NO_GROSS_BUCKET]
+    summary = table.groupby("offset_bucket")[["gross", "net", "gross_lines", "offset_lines"]].sum()
+    summary = summary.reindex([b for b in buckets if b in summary.index])
+    summary.insert(1, "pct_of_gross", summary["gross"] / table["gross"].sum() * 100)
+    summary.insert(3, "pct_of_net", summary["net"] / table["net"].sum() * 100)
+    return summary.reset_index()
+
+# =============================================================================
+# BENCHMARK EVALUATION
+# =============================================================================
+
+def evaluate_benchmarks(fact: pd.DataFrame, benchmarks: pd.DataFrame, benchmark_map: List[Dict],
+                        keys: Optional[List[str]] = None,
+                        money_mode: str = DEFAULT_MONEY_MODE) -> pd.DataFrame:
+    """
+    Actual vs benchmark % of revenue of every benchmark map entry, on net
+    and gross bases (see module docstring).
+
+    `keys` are fact table columns (e.g. entity, period) evaluated
+    separately; revenue is each key's revenue lines. `benchmarks` has the
+    Benchmarks sheet's category and benchmark (fraction) columns, plus the
+    `keys` columns when benchmarks differ per key. An area whose lines are
+    not all in `benchmarks` has no benchmark (NaN). Amounts and revenue are
+    totalled in `money_mode`: float64 sums, or with "exact" int64 cents
+    (see money.to_minor_units) summed per group and per key.
+
+    Returns:
+        DataFrame with one row per key, entry and basis: *keys, area,
+        benchmark_lines, basis, amount, revenue, actual_pct, benchmark_pct,
+        variance_pp (actual - benchmark) and adverse; "margin" entries
+        have a net row only
+    """
+    keys = list(keys or [])
+    filter_columns = sorted({col for entry in benchmark_map for col in entry.get("filters", {})})
+    if money_mode not in MONEY_MODES:
+        raise ValueError(f"Unknown money mode '{money_mode}' (expected one of {MONEY_MODES})")
+    amount = fact["amount"].to_numpy(dtype=float)
+    bases = {
+        "net": np.nan_to_num(amount, nan=0.0),
+        "gross": np.where(amount > 0, amount, 0.0),
+        "revenue": np.where(fact["line_type"].to_numpy() == "revenue", np.nan_to_num(amount, nan=0.0), 0.0)
+    }
+    if money_mode == "exact":
+        columns = {}
+        for basis, values in bases.items():
+            cents, residual = to_minor_units(values)
+            columns[f"{basis}_cents"] = cents
+            columns[f"{basis}_residual"] = residual if residual is not None else 0.0
+        lines = pd.DataFrame(columns)
+    else:
+        lines = pd.DataFrame(bases)
+
+    # One grouped pass over the lines
+    group_columns = [*keys, "source_sheet", *filter_columns]
+    groups = lines.groupby([fact[col] for col in group_columns], observed=True, dropna=False, sort=False).sum()
+    group_keys = groups.index.to_frame(index=False)
+
+    # Membership of each group in each entry (union entries: in any of their
+    # areas' entries), then per key totals of every entry at once
+    membership = np.zeros((len(groups), len(benchmark_map)), dtype=bool)
+    for i, entry in enumerate(benchmark_map):
+        if "union" not in entry:
+            membership[:, i] = np.logical_and.reduce([group_keys["source_sheet"].isin(entry["sheets"]).to_numpy()] + [
+                group_keys[col].isin(values).to_numpy() for col, values in entry.get("filters", {}).items()
+            ])
+    areas = {entry["area"]: i for i, entry in enumerate(benchmark_map)}
+    for i, entry in enumerate(benchmark_map):
+        if "union" in entry:
+            unknown = [area for area in entry["union"] if area not in areas or "union" in benchmark_map[areas[area]]]
+            if unknown:
+                raise ValueError(f"Benchmark map entry '{entry['area']}' unions unknown or union areas {unknown}")
+            membership[:, i] = membership[:, [areas[area] for area in entry["union"]]].any(axis=1)
+    key_frame = group_keys[keys] if keys else pd.DataFrame(index=group_keys.index)
+    key_codes = key_frame.groupby(keys, sort=False, dropna=False).ngroup().to_numpy() if keys \
+        else np.zeros(len(groups), dtype=np.int64)
+    key_values = key_frame.drop_duplicates().reset_index(drop=True) if keys else pd.DataFrame(index=[0])
+    n_keys = len(key_values)
+
+    def key_totals(basis: str, mask: np.ndarray) -> np.ndarray:
+        """Total of `basis` per key (rows) over the groups in each column of `mask`."""
+        if money_mode == "exact":
+            cents = np.zeros((n_keys, mask.shape[1]), dtype=np.int64)
+            np.add.at(cents, key_codes, np.where(mask, groups[f"{basis}_cents"].to_numpy()[:, None], 0))
+            residual = np.zeros((n_keys, mask.shape[1]))
+            np.add.at(residual, key_codes, np.where(mask, groups[f"{basis}_residual"].to_numpy()[:, None], 0.0))
+            return cents / MINOR_UNITS + residual
+        if not mask.shape[1]:
+            return np.zeros((n_keys, 0))
+        return np.stack([np.bincount(key_codes, weights=np.where(mask[:, i], groups[basis].to_numpy(), 0.0),
+                                     minlength=n_keys) for i in range(mask.shape[1])], axis=1)
+
+    revenue = key_totals("revenue", np.ones((len(groups), 1), dtype=bool))[:, 0]
+    totals = {basis: key_totals(basis, membership) for basis in ["net", "gross"]}
+
+    # Benchmark % of every entry per key: sum of its lines, NaN unless every line is present
+    benchmark_keys = [k for k in keys if k in benchmarks.columns]
+    by_line = benchmarks.drop_duplicates([*benchmark_keys, "category"]) \
+        .set_index([*benchmark_keys, "category"])["benchmark"]
+    by_line = by_line.unstack("category") if benchmark_keys else by_line.to_frame().T
+    composites = pd.DataFrame({
+        i: by_line.reindex(columns=entry["lines"]).sum(axis=1, min_count=len(entry["lines"])) * 100
+        for i, entry in enumerate(benchmark_map)
+    })
+    if benchmark_keys:
+        benchmark_pct = key_values[benchmark_keys].merge(
+            composites.reset_index(), on=benchmark_keys, how="left")[list(composites.columns)].to_numpy(dtype=float)
+    else:
+        benchmark_pct = np.tile(composites.to_numpy(dtype=float), (n_keys, 1))
+
+    # One row per key, entry and basis
+    margin = np.array([entry.get("measure", "share") == "margin" for entry in benchmark_map], dtype=bool)
+    frames = []
+    for basis in ["net", "gross"]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            share = np.where(revenue[:, None] != 0, totals[basis] / revenue[:, None] * 100, np.nan)
+        actual = np.where(margin, 100 - share, share)
+        variance = actual - benchmark_pct
+        frame = key_values.loc[np.repeat(np.arange(n_keys), len(benchmark_map))].reset_index(drop=True) \
+            if keys else pd.DataFrame(index=range(n_keys * len(benchmark_map)))
+        frame["area"] = np.tile([entry["area"] for entry in benchmark_map], n_keys)
+        frame["benchmark_lines"] = np.tile([" + ".join(entry["lines"]) for entry in benchmark_map], n_keys)
+        frame["basis"] = basis
+        frame["amount"] = totals[basis].ravel()
+        frame["revenue"] = np.repeat(revenue, len(benchmark_map))
+        frame["actual_pct"] = actual.ravel()
+        frame["benchmark_pct"] = benchmark_pct.ravel()
+        frame["variance_pp"] = variance.ravel()
+        frame["adverse"] = np.where(margin, variance < 0, variance > 0).ravel()
+        frame["_order"] = np.arange(len(frame)) * 2 + (basis == "gross")
+        frames.append(frame if basis == "net" else frame[~np.tile(margin, n_keys)])
+
+    return pd.concat(frames, ignore_index=True).sort_values("_order").drop(columns="_order").reset_index(drop=True)
+
+
+def unmapped_benchmark_lines(benchmarks: pd.DataFrame, benchmark_map: List[Dict]) -> List[str]:
+    """Benchmarks lines no map entry evaluates."""
+    mapped = {line for entry in benchmark_map for line in entry["lines"]}
+    return [line for line in benchmarks["category"].dropna().unique() if line not in mapped]
@@ -0,0 +1,843 @@
+"""
+Shared Ledger I/O: Streaming Reader & Normalized Frame Cache
+
+1. Streams workbook sheets with openpyxl read-only row iteration instead of
+   materializing the whole sheet through pd.read_excel. Cells are converted
+   exactly as pandas' openpyxl reader converts them (empty cells and pandas'
+   default NA strings become NaN, integral floats become int, trailing empty
+   rows are trimmed) so header detection, null counts and sums are identical
+   to the in-memory path.
+2. Caches per-sheet results in Parquet, keyed by the sheet's own content
+   hash plus its layout/normalization definitions, so a phase can skip
+   re-parsing a sheet another phase (or an earlier run) already processed,
+   even when other tabs of the workbook were edited. A manifest records the
+   sheet hashes each phase saw on its last run.
+3. Opens workbooks through a pluggable pd.read_excel backend: the
+   Rust-backed calamine engine when python-calamine is installed, openpyxl
+   otherwise. Both produce identical raw frames. CSV, Parquet and JSONL
+   ledger exports open through the same interface (TabularSource) and come
+   back as the same raw frames (header=None, column names on row 0), so
+   they go through the same header detection and normalization.
+4. Persists the schema-fingerprint registry: known sheet layouts (header row
+   and column mapping) keyed by a fingerprint of the sheet's leading rows.
+
+Used by:
+- scripts/01_ingestion_and_schema.py (streaming ingestion + QC, layout cache)
+- scripts/02_phase1c_normalization.py (streaming ingest_sheet, frame cache)
+- scripts/03_phase2_analysis.py (frame cache)
+
+Author: Pipeline Infrastructure
+Date: 2026-10-18
+
+IMPORTANT: This module does NOT modify raw data files.
+"""
+
+import ast
+import functools
+import hashlib
+import json
+import os
+import re
+import zipfile
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# pd.read_excel engines, fastest first, with the package each one needs.
+# "auto" picks the first installed one.
+READER_BACKENDS = {
+    "calamine": "python_calamine",
+    "openpyxl": "openpyxl"
+}
+DEFAULT_READER = "auto"
+
+# Ledger input formats by file extension. Every non-Excel file is one sheet
+# named after its file stem (e.g. "OPEX - NEmpl..csv" -> "OPEX - NEmpl.")
+INPUT_FORMATS = {
+    ".xlsx": "excel",
+    ".xlsm": "excel",
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".jsonl": "jsonl"
+}
+
+# Rows per chunk when reading CSV / JSONL / Parquet exports
+EXPORT_CHUNK_ROWS = 100_000
+
+# Default memory budget for one in-flight chunk of a streamed sheet
+STREAM_MEMORY_LIMIT_MB = 256
+
+# Rough in-memory cost of one object cell (pointer + boxed value), doubled to
+# leave headroom for the per-chunk conversion copies
+BYTES_PER_CELL = 128
+
+# Rows read ahead of the data for header detection (see detect_header_row)
+HEADER_SCAN_ROWS = 6
+
+# Normalized frame cache (Parquet + JSON sidecar per sheet)
+CACHE_DIR = ".cache/normalized"
+
+# Sheet content hashes seen by each phase on its last run
+MANIFEST_FILE = ".cache/manifest.json"
+
+# Known sheet layouts, resolved by fingerprint instead of header heuristics
+SCHEMA_REGISTRY_FILE = ".cache/schema_registry.json"
+
+# Functions that apply the approved rules (Rules 1/4/5) in each phase, by
+# script. Their source is fingerprinted into every normalized sheet's cache
+# key, so editing a rule in either phase invalidates the frames both share.
+NORMALIZATION_RULE_FUNCTIONS = {
+    "02_phase1c_normalization.py": ["apply_rule_1", "apply_rule_4", "apply_rule_5"],
+    "03_phase2_analysis.py": ["apply_normalization_rules"]
+}
+
+# Ways a sheet can be read into a cache entry: one full parse, streamed and
+# assembled (--stream), or normalized chunk by chunk (--chunked). Part of the
+# cache key, since the paths' cached metrics are not guaranteed identical
+# (chunked float sums are added per chunk).
+INGESTION_PATHS = ["full", "stream", "chunked"]
+
+# pandas' default na_values for read_excel / read_csv
+DEFAULT_NA_STRINGS = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null"
+])
+
+# =============================================================================
+# READER BACKENDS
+# =============================================================================
+
+def available_readers() -> List[str]:
+    """Installed reader backends, fastest first."""
+    import importlib.util
+
+    return [name for name, package in READER_BACKENDS.items() if importlib.util.find_spec(package) is not None]
+
+
+def resolve_reader(reader: str = DEFAULT_READER) -> str:
+    """
+    Map a reader option ("auto" or a backend name) to an installed pd.read_excel engine.
+
+    An unavailable backend falls back to openpyxl with a note, so a missing
+    optional dependency never stops a run.
+    """
+    installed = available_readers()
+    if reader == "auto":
+        return installed[0] if installed else "openpyxl"
+    if reader not in READER_BACKENDS:
+        raise ValueError(f"Unknown reader backend '{reader}' (expected auto or one of {list(READER_BACKENDS)})")
+    if reader not in installed:
+        print(f"  [reader] {reader} is not installed ({READER_BACKENDS[reader]}); falling back to openpyxl")
+        return "openpyxl"
+    return reader
+
+
+def input_format(file_path: str) -> str:
+    """Input format of a ledger file ("excel", "csv", "parquet", "jsonl"); directories hold exports."""
+    if os.path.isdir(file_path):
+        return "export_dir"
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in INPUT_FORMATS:
+        raise ValueError(f"Unsupported ledger input '{file_path}' (expected one of {list(INPUT_FORMATS)})")
+    return INPUT_FORMATS[ext]
+
+
+def open_workbook(file_path: str, reader: str = DEFAULT_READER):
+    """
+    Open a ledger input for sheet reads.
+
+    Excel workbooks open as pd.ExcelFile with the resolved reader backend;
+    CSV / Parquet / JSONL exports (or a directory of them) open as a
+    TabularSource. Both expose sheet_names and are read with read_raw_sheet().
+    """
+    if input_format(file_path) == "excel":
+        return pd.ExcelFile(file_path, engine=resolve_reader(reader))
+    return TabularSource(file_path)
+
+
+def read_raw_sheet(source, sheet_name: str, nrows: Optional[int] = None, dtype: Any = None) -> pd.DataFrame:
+    """Read a sheet without a header (header=None), from a workbook or a ledger export."""
+    if isinstance(source, TabularSource):
+        return source.read_raw(sheet_name, nrows=nrows, object_cells=dtype is object)
+    return pd.read_excel(source, sheet_name=sheet_name, header=None, nrows=nrows, dtype=dtype)
+
+# =============================================================================
+# LEDGER EXPORT ADAPTERS (CSV / PARQUET / JSONL)
+# =============================================================================
+
+def _coerce_text_column(values: pd.Series) -> np.ndarray:
+    """
+    Turn a column of CSV text cells into cells as read_excel returns them:
+    numbers become int (when integral) or float, other text stays str.
+    """
+    cells = values.to_numpy(dtype=object, copy=True)
+    parsed = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+    is_number = ~np.isnan(parsed) & values.notna().to_numpy()
+    if is_number.any():
+        # Re-parse with float() so the text round-trips exactly (to_numeric's
+        # fast parser can be off by one ulp)
+        numbers = [float(text) for text in cells[is_number]]
+        cells[is_number] = [int(v) if v.is_integer() else v for v in numbers]
+    return cells
+
+
+def _typed_block(chunk: pd.DataFrame) -> np.ndarray:
+    """Cells of a typed (Parquet / JSONL) chunk as Python objects, NaN for missing."""
+    block = chunk.astype(object).to_numpy()
+    block[pd.isna(block)] = np.nan
+    return block
+
+
+def iter_export_blocks(file_path: str, nrows: Optional[int] = None,
+                       chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[np.ndarray]:
+    """
+    Yield the raw rows of a ledger export as object blocks, chunk by chunk.
+
+    The first row is the export's header: CSV lines are read as-is
+    (header=None), Parquet / JSONL column names are emitted as row 0. At
+    most `nrows` raw rows are produced. Only one chunk is held at a time.
+    """
+    fmt = input_format(file_path)
+    remaining = nrows
+
+    if fmt == "csv":
+        chunks = (
+            np.column_stack([_coerce_text_column(chunk[col]) for col in chunk.columns])
+            for chunk in pd.read_csv(file_path, header=None, dtype=str, chunksize=chunk_rows, nrows=nrows)
+        )
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(file_path)
+        yield np.array([list(parquet.schema_arrow.names)], dtype=object)
+        remaining = None if nrows is None else nrows - 1
+        chunks = (_typed_block(batch.to_pandas()) for batch in parquet.iter_batches(batch_size=chunk_rows))
+    elif fmt == "jsonl":
+        reader = pd.read_json(file_path, lines=True, dtype=False, chunksize=chunk_rows)
+        first = next(iter(reader), None)
+        if first is None:
+            return
+        yield np.array([list(first.columns)], dtype=object)
+        remaining = None if nrows is None else nrows - 1
+        chunks = (_typed_block(chunk) for chunk in _chain_first(first, reader))
+    else:
+        raise ValueError(f"Not a ledger export: {file_path}")
+
+    for block in chunks:
+        if remaining is not None:
+            if remaining <= 0:
+                break
+            block = block[:remaining]
+            remaining -= len(block)
+        yield block
+
+
+def _chain_first(first: pd.DataFrame, rest) -> Iterator[pd.DataFrame]:
+    yield first
+    yield from rest
+
+
+class TabularSource:
+    """
+    pd.ExcelFile stand-in for CSV / Parquet / JSONL ledger exports.
+
+    Wraps one export file (a single sheet named after the file stem) or a
+    directory of exports (one sheet per file), so a tab exported by the ERP
+    as "OPEX - NEmpl..csv" is read as sheet "OPEX - NEmpl.". Exports carry
+    their column header on the first raw row.
+    """
+
+    header_row = 0
+
+    def __init__(self, path: str):
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if INPUT_FORMATS.get(os.path.splitext(name)[1].lower(), "excel") != "excel"
+            )
+        else:
+            files = [path]
+
+        self.path = path
+        self.sheet_paths = {os.path.splitext(os.path.basename(f))[0]: f for f in files}
+        self.sheet_names = list(self.sheet_paths)
+
+    def read_raw(self, sheet_name: str, nrows: Optional[int] = None, object_cells: bool = False) -> pd.DataFrame:
+        """
+        Raw frame of one export (header=None semantics), like read_excel's.
+
+        Columns are inferred the way read_excel infers them unless
+        object_cells=True (read_excel dtype=object).
+        """
+        blocks = list(iter_export_blocks(self.sheet_paths[sheet_name], nrows))
+        width = max((b.shape[1] for b in blocks), default=0)
+        block = np.concatenate(blocks) if blocks else np.empty((0, width), dtype=object)
+        df = pd.DataFrame({j: block[:, j] for j in range(width)}, columns=range(width))
+        return df if object_cells else df.infer_objects()
+
+# =============================================================================
+# CELL CONVERSION (mirrors pandas.io.excel._openpyxl.OpenpyxlReader)
+# =============================================================================
+
+def _convert_cell(cell) -> Any:
+    """Convert an openpyxl cell the same way pd.read_excel does."""
+    from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+    value = cell.value
+    if value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        as_int = int(value)
+        if as_int == value:
+            return as_int
+        return float(value)
+    return value
+
+
+def _to_na(value: Any) -> Any:
+    """Apply pandas' default NA string handling to a converted cell."""
+    if isinstance(value, str) and value in DEFAULT_NA_STRINGS:
+        return np.nan
+    return value
+
+
+def chunk_rows_for_budget(n_cols: int, memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB) -> int:
+    """Number of rows per chunk that keeps one chunk within the memory budget."""
+    budget_bytes = memory_limit_mb * 1024 * 1024
+    return max(1, int(budget_bytes // (max(n_cols, 1) * BYTES_PER_CELL)))
+
+# =============================================================================
+# STREAMING READER
+# =============================================================================
+
+def iter_sheet_rows(file_path: str, sheet_name: str) -> Iterator[List[Any]]:
+    """
+    Yield the raw rows of a sheet one at a time (header=None semantics).
+
+    Trailing empty cells are trimmed per row and trailing empty rows are
+    dropped at the end of the sheet, as pd.read_excel does. Rows are NOT
+    padded; callers pad to the width they need. Ledger exports (CSV /
+    Parquet / JSONL) are read chunk by chunk (see iter_export_blocks).
+    """
+    from openpyxl import load_workbook
+
+    if input_format(file_path) != "excel":
+        for block in iter_export_blocks(TabularSource(file_path).sheet_paths[sheet_name]):
+            for row in block.tolist():
+                yield row
+        return
+
+    wb = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet_name]
+        ws.reset_dimensions()
+        pending_blank_rows = 0
+
+        for row in ws.rows:
+            values = [_convert_cell(cell) for cell in row]
+            while values and values[-1] == "":
+                values.pop()
+
+            if not values:
+                # Only emit blank rows once a later row proves they are not trailing
+                pending_blank_rows += 1
+                continue
+
+            for _ in range(pending_blank_rows):
+                yield []
+            pending_blank_rows = 0
+
+            yield [_to_na(v) for v in values]
+    finally:
+        wb.close()
+
+
+def open_sheet_stream(file_path: str, sheet_name: str, prefix_rows: int = HEADER_SCAN_ROWS) -> Dict:
+    """
+    Open a sheet for streaming and read its leading rows for header detection.
+
+    Returns:
+        Dict with keys:
+            prefix: DataFrame of the first `prefix_rows` raw rows (header=None)
+            rows: iterator over the remaining raw rows
+            stats: running raw-sheet stats (row_count, col_count), final once
+                   the data chunks have been fully consumed
+    """
+    rows = iter_sheet_rows(file_path, sheet_name)
+    prefix = []
+    for row in rows:
+        prefix.append(row)
+        if len(prefix) >= prefix_rows:
+            break
+
+    width = max((len(r) for r in prefix), default=0)
+    prefix_df = pd.DataFrame(
+        [r + [np.nan] * (width - len(r)) for r in prefix],
+        columns=range(width),
+        dtype=object
+    )
+
+    return {
+        "prefix": prefix_df,
+        "rows": rows,
+        "stats": {"row_count": len(prefix), "col_count": width}
+    }
+
+
+def iter_data_chunks(stream: Dict, header_row: int, columns: List[str],
+                     chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Yield fixed-size chunks of the data rows that follow `header_row`.
+
+    Chunks carry `columns` as column names and the same dtypes as the frame
+    that normalize_dataframe() slices out of the full raw sheet; a sheet with
+    no data rows yields one empty chunk. The stream's stats are updated as
+    rows are consumed.
+    """
+    n_cols = len(columns)
+    stats = stream["stats"]
+    buffer = []
+
+    # read_excel infers each column's dtype with the header (and any rows
+    # above it) included, so an all-null data column under a text header is
+    # str, not object. Infer each chunk the same way, then drop those rows.
+    head = stream["prefix"].iloc[:header_row + 1].reindex(columns=range(n_cols)).to_numpy(dtype=object)
+    n_head = len(head)
+
+    def to_frame(batch):
+        block = np.full((n_head + len(batch), n_cols), np.nan, dtype=object)
+        block[:n_head] = head
+        for i, r in enumerate(batch, start=n_head):
+            r = r[:n_cols]
+            block[i, :len(r)] = r
+        # Column-wise construction lets pandas infer string columns the same
+        # way read_excel does, while numeric cells stay object-typed
+        frame = pd.DataFrame({col: block[:, j] for j, col in enumerate(columns)}, columns=columns)
+        return frame.iloc[n_head:].reset_index(drop=True)
+
+    # Data rows already read into the prefix
+    for idx in range(header_row + 1, len(stream["prefix"])):
+        buffer.append(stream["prefix"].iloc[idx].tolist())
+
+    n_chunks = 0
+    for row in stream["rows"]:
+        stats["row_count"] += 1
+        if len(row) > stats["col_count"]:
+            stats["col_count"] = len(row)
+        buffer.append(row)
+        if len(buffer) >= chunk_rows:
+            yield to_frame(buffer)
+            n_chunks += 1
+            buffer = []
+
+    # A sheet with no data rows still yields one (empty) chunk, so callers
+    # see its column dtypes
+    if buffer or n_chunks == 0:
+        yield to_frame(buffer)
+
+# =============================================================================
+# NORMALIZED FRAME CACHE
+# =============================================================================
+
+def file_content_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+_XLSX_NS = {
+    "main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "rel": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "pkg": "http://schemas.openxmlformats.org/package/2006/relationships"
+}
+
+# Shared-string cells: <c ... t="s"><v>index</v></c> (optionally namespace-prefixed)
+_SHARED_STRING_CELL = re.compile(rb'<(?:\w+:)?c\b[^>]*\bt="s"[^>]*>\s*<(?:\w+:)?v>(\d+)</')
+
+
+def _xlsx_sheet_hashes(file_path: str) -> Dict[str, str]:
+    """
+    Per-sheet content hashes of an .xlsx package.
+
+    A sheet's hash covers its worksheet XML, the shared strings its cells
+    reference (by value, so re-indexing the shared string table does not
+    matter unless the sheet XML itself changes) and the workbook styles
+    (number formats decide how cells convert, e.g. dates).
+    """
+    from xml.etree import ElementTree
+
+    with zipfile.ZipFile(file_path) as zf:
+        workbook = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+        rels = ElementTree.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels.findall("pkg:Relationship", _XLSX_NS)}
+
+        shared_strings = []
+        if "xl/sharedStrings.xml" in zf.namelist():
+            sst = ElementTree.fromstring(zf.read("xl/sharedStrings.xml"))
+            for si in sst.findall("main:si", _XLSX_NS):
+                shared_strings.append("".join(t.text or "" for t in si.iter(f"{{{_XLSX_NS['main']}}}t")))
+
+        styles = zf.read("xl/styles.xml") if "xl/styles.xml" in zf.namelist() else b""
+        styles_hash = hashlib.sha256(styles).hexdigest()
+
+        hashes = {}
+        for sheet in workbook.iter(f"{{{_XLSX_NS['main']}}}sheet"):
+            target = targets[sheet.get(f"{{{_XLSX_NS['rel']}}}id")]
+            part = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+            xml = zf.read(part)
+
+            digest = hashlib.sha256(xml)
+            for index in _SHARED_STRING_CELL.findall(xml):
+                digest.update(b"\x1f" + shared_strings[int(index)].encode("utf-8"))
+            digest.update(styles_hash.encode("ascii"))
+            hashes[sheet.get("name")] = digest.hexdigest()
+
+    return hashes
+
+
+def sheet_content_hashes(file_path: str, sheet_names: List[str]) -> Dict[str, str]:
+    """
+    Content hash of each sheet, so an edit to one tab only invalidates that tab.
+
+    Ledger exports hash each export file. Sheets whose hash cannot be taken
+    from the package (an unexpected layout) fall back to the whole file's
+    content hash.
+    """
+    if input_format(file_path) != "excel":
+        # Each export file is one sheet
+        paths = TabularSource(file_path).sheet_paths
+        return {sheet_name: file_content_hash(paths[sheet_name]) for sheet_name in sheet_names}
+
+    try:
+        hashes = _xlsx_sheet_hashes(file_path)
+    except (zipfile.BadZipFile, KeyError, IndexError, ValueError):
+        hashes = {}
+
+    file_hash = None
+    result = {}
+    for sheet_name in sheet_names:
+        if sheet_name not in hashes:
+            file_hash = file_hash or file_content_hash(file_path)
+            hashes[sheet_name] = file_hash
+        result[sheet_name] = hashes[sheet_name]
+    return result
+
+
+def definition_fingerprint(definition: Any) -> str:
+    """Stable SHA-256 of a JSON-serializable definition (dicts, lists, scalars)."""
+    payload = json.dumps(definition, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def normalization_rules_fingerprint() -> str:
+    """
+    Hash of the AST of every NORMALIZATION_RULE_FUNCTIONS function (unchanged
+    by comment and formatting edits). The scripts are parsed, not imported,
+    so each phase fingerprints both phases' rules without loading the other;
+    parsed once per process.
+    """
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    functions = []
+    for script, names in NORMALIZATION_RULE_FUNCTIONS.items():
+        with open(os.path.join(scripts_dir, script), encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        found = {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+        missing = [name for name in names if name not in found]
+        if missing:
+            raise ValueError(f"{script} does not define normalization rule functions {missing}")
+        functions.extend(ast.dump(found[name]) for name in names)
+    return definition_fingerprint(functions)
+
+
+def normalized_sheet_definition(header_row: int, columns: List[str], numeric_columns: List[str]) -> Dict:
+    """
+    Canonical definition of how one sheet is normalized.
+
+    Phases describe their sheets differently (HEADER_ROWS + COLUMN_NORMALIZATIONS
+    + COLUMN_RENAMES in Phase 1c, SHEET_CONFIG in Phase 2); both reduce to the
+    header row, the final column names and the Rule 1 numeric columns, plus
+    the fingerprint of both phases' rule functions, so the same sheet
+    resolves to the same cache entry in either phase.
+    """
+    return {
+        "header_row": int(header_row),
+        "columns": list(columns),
+        "numeric_columns": [col for col in columns if col in set(numeric_columns)],
+        "rules": normalization_rules_fingerprint()
+    }
+
+
+def sheet_cache_key(content_hash: str, sheet_name: str, definition: Dict,
+                    ingestion: str = INGESTION_PATHS[0]) -> str:
+    """
+    Cache key for one sheet: sheet content + sheet name + normalization
+    definition + the ingestion path that builds the entry (INGESTION_PATHS).
+    """
+    if ingestion not in INGESTION_PATHS:
+        raise ValueError(f"Unknown ingestion path '{ingestion}' (expected one of {INGESTION_PATHS})")
+    return definition_fingerprint({
+        "content": content_hash,
+        "sheet": sheet_name,
+        "definition": definition,
+        "ingestion": ingestion
+    })
+
+
+def parquet_available() -> bool:
+    """Whether pyarrow is installed (required for the Parquet cache)."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _cache_paths(key: str, cache_dir: str) -> Tuple[str, str]:
+    return os.path.join(cache_dir, f"{key}.parquet"), os.path.join(cache_dir, f"{key}.json")
+
+
+def load_cached_sheet(key: str, cache_dir: str = CACHE_DIR,
+                      load_frame: bool = True) -> Optional[Tuple[Optional[pd.DataFrame], Dict]]:
+    """
+    Load a cached sheet entry.
+
+    Returns:
+        (DataFrame or None, sidecar dict) on a hit, None on a miss. The frame
+        is None for metadata-only entries and when load_frame=False; with
+        load_frame=False only entries whose frame file exists are hits.
+    """
+    frame_path, meta_path = _cache_paths(key, cache_dir)
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if not load_frame and not meta.get("has_frame"):
+        return None
+
+    df = None
+    if meta.get("has_frame"):
+        if not os.path.exists(frame_path) or not parquet_available():
+            return None
+        if load_frame:
+            df = pd.read_parquet(frame_path)
+
+    return df, meta.get("payload", {})
+
+
+def _write_sidecar(meta_path: str, has_frame: bool, payload: Dict):
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump({"has_frame": has_frame, "payload": payload}, f, default=str)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def save_cached_sheet(key: str, df: Optional[pd.DataFrame], payload: Dict,
+                      cache_dir: str = CACHE_DIR) -> bool:
+    """
+    Store a sheet entry: the frame as Parquet (if given) plus a JSON sidecar.
+
+    The sidecar is written last so a partially written entry is never read
+    as a hit. Returns False (and stores nothing) when the frame cannot be
+    written, e.g. pyarrow is missing or a column mixes types.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    frame_path, meta_path = _cache_paths(key, cache_dir)
+
+    if df is not None:
+        if not parquet_available():
+            return False
+        try:
+            df.to_parquet(frame_path, index=False)
+        except (TypeError, ValueError, ImportError) as e:
+            print(f"  [cache] Frame not cached ({type(e).__name__}: {e})")
+            return False
+
+    _write_sidecar(meta_path, df is not None, payload)
+    return True
+
+
+class CachedFrameWriter:
+    """
+    Writes a sheet's normalized frame into its cache entry chunk by chunk.
+
+    Each chunk becomes a Parquet row group, so a frame larger than memory
+    can be cached. Numeric columns are stored as float64 and every other
+    column as strings; a chunk that does not fit that schema (e.g. a column
+    mixing numbers and text) abandons the frame, as save_cached_sheet() does
+    for frames that cannot be written. The sidecar is written by close(),
+    so an unfinished entry is never read as a hit.
+    """
+
+    def __init__(self, key: str, columns: List[str], numeric_columns: List[str], cache_dir: str = CACHE_DIR):
+        self.frame_path, self.meta_path = _cache_paths(key, cache_dir)
+        self.cache_dir = cache_dir
+        self.columns = list(columns)
+        self.numeric_columns = set(numeric_columns)
+        self.writer = None
+        self.ok = parquet_available()
+
+    def _schema(self):
+        import pyarrow as pa
+
+        return pa.schema([
+            (col, pa.float64() if col in self.numeric_columns else pa.large_string())
+            for col in self.columns
+        ])
+
+    def write(self, chunk: pd.DataFrame) -> bool:
+        """Append a chunk; returns False once the frame has been abandoned."""
+        if not self.ok:
+            return False
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        try:
+            table = pa.Table.from_pandas(chunk, schema=self._schema(), preserve_index=False)
+            if self.writer is None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self.writer = pq.ParquetWriter(self.frame_path + ".tmp", self._schema())
+            self.writer.write_table(table)
+        except (pa.ArrowException, TypeError, ValueError) as e:
+            print(f"  [cache] Frame not cached ({type(e).__name__}: {e})")
+            self.abandon()
+        return self.ok
+
+    def abandon(self):
+        """Drop the partially written frame."""
+        self.ok = False
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if os.path.exists(self.frame_path + ".tmp"):
+            os.remove(self.frame_path + ".tmp")
+
+    def close(self, payload: Dict) -> bool:
+        """Finish the frame and write the sidecar; returns False if the frame was abandoned."""
+        if not self.ok:
+            return False
+
+        if self.writer is None:
+            # No data rows: an empty frame with the sheet's columns
+            import pyarrow.parquet as pq
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pq.write_table(self._schema().empty_table(), self.frame_path + ".tmp")
+        else:
+            self.writer.close()
+            self.writer = None
+
+        os.replace(self.frame_path + ".tmp", self.frame_path)
+        _write_sidecar(self.meta_path, True, payload)
+        return True
+
+# =============================================================================
+# SCHEMA REGISTRY
+# =============================================================================
+
+def empty_schema_registry(logic: str) -> Dict:
+    """
+    A registry with no known layouts.
+
+    Structure:
+        logic: fingerprint of the layout logic the entries were derived with
+        layouts: layout fingerprint -> {header_row, detection_reasons}
+        columns: column signature -> normalized column names
+        sheets: sheet id -> {fingerprint, column_signature} last seen
+    """
+    return {"logic": logic, "layouts": {}, "columns": {}, "sheets": {}}
+
+
+def load_schema_registry(logic: str, path: str = SCHEMA_REGISTRY_FILE) -> Dict:
+    """
+    Load the schema registry.
+
+    Entries derived with different layout logic are discarded, so a change to
+    the header heuristics or column naming re-derives every layout.
+    """
+    if not os.path.exists(path):
+        return empty_schema_registry(logic)
+
+    with open(path) as f:
+        registry = json.load(f)
+
+    if registry.get("logic") != logic:
+        return empty_schema_registry(logic)
+    return registry
+
+
+def save_schema_registry(registry: Dict, path: str = SCHEMA_REGISTRY_FILE):
+    """Write the schema registry atomically (.tmp + rename)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(registry, f, indent=2, sort_keys=True, default=str)
+    os.replace(path + ".tmp", path)
+
+# =============================================================================
+# RUN MANIFEST
+# =============================================================================
+
+def load_manifest(phase: str, path: str = MANIFEST_FILE) -> Dict[str, str]:
+    """Sheet content hashes ("<workbook>/<sheet>" -> hash) a phase saw on its last run."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get(phase, {})
+
+
+def save_manifest(phase: str, sheet_hashes: Dict[str, str], path: str = MANIFEST_FILE):
+    """Record the sheet hashes of this run for a phase (other phases' entries are kept)."""
+    manifest = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+    manifest[phase] = sheet_hashes
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def manifest_changes(previous: Dict[str, str], current: Dict[str, str]) -> Dict[str, List[str]]:
+    """
+    Compare this run's sheet hashes with the previous run's.
+
+    Returns:
+        Dict with keys: dirty (new or changed sheets), clean (unchanged),
+        removed (sheets no longer present)
+    """
+    return {
+        "dirty": [sheet for sheet, h in current.items() if previous.get(sheet) != h],
+        "clean": [sheet for sheet, h in current.items() if previous.get(sheet) == h],
+        "removed": [sheet for sheet in previous if sheet not in current]
+    }
+
+
+def write_csv_if_changed(df: pd.DataFrame, path: str) -> bool:
+    """
+    Write a QC CSV only when its content differs from the file on disk.
+
+    Unchanged outputs keep their modification time, so an incremental run
+    that touched one sheet only rewrites the files that sheet affects.
+    Returns True when the file was written.
+    """
+    content = df.to_csv(index=False)
+    if os.path.exists(path):
+        with open(path, newline="") as f:
+            if f.read() == content:
+                return False
+    with open(path, "w", newline="") as f:
+        f.write(content)
+    return True
@@ -0,0 +1,218 @@
+"""
+Money Totals
+
+Totals of amount columns for the reconciliations (pre/post sum checks and
+P&L tie-outs in Phase 1c, the overview and reconciliation checks in Phase 2).
+
+Two modes:
+- "float":  float64 summation, as pandas' Series.sum() does (the default,
+            and the behavior every committed output was produced with).
+- "exact":  amounts are split into int64 minor units (cents) and a float
+            residual (zero for amounts that are whole cents). The cents are
+            summed exactly in int64 and the residuals, which are tiny, in
+            float64, so a total of tens of millions of lines is exact to the
+            cent instead of drifting with float rounding error.
+
+A single exact total converts and sums the column block by block, so the
+few vector passes per block stay in cache and the total is no slower than
+the float sum. A column that is totalled many times (masked or grouped) can
+be converted once with to_minor_units() and totalled with int64 sums;
+money_group_totals() does so for every key of a groupby at once. See
+`python scripts/benchmarks.py money`.
+
+A column read chunk by chunk is totalled with a running total
+(new_running_total / add_to_running_total): exact mode keeps adding int64
+cents, float mode adds the chunk totals with Neumaier compensation so the
+error does not grow with the number of chunks.
+
+Used by:
+- scripts/02_phase1c_normalization.py
+- scripts/03_phase2_analysis.py
+- scripts/qc_rules.py
+
+Author: Pipeline Infrastructure
+Date: 2026-10-18
+
+IMPORTANT: This module does NOT modify raw data files.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional, Tuple
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+MONEY_MODES = ["float", "exact"]
+DEFAULT_MONEY_MODE = "float"
+
+# Minor units per currency unit (cents)
+MINOR_UNITS = 100
+
+# Rows converted per block by exact_total(); small enough that the block's
+# buffers stay in CPU cache
+MONEY_BLOCK_ROWS = 16_384
+
+# =============================================================================
+# MINOR UNITS
+# =============================================================================
+
+def to_minor_units(values: Any) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Split amounts into int64 minor units and a float residual.
+
+    amount == cents / MINOR_UNITS + residual for every value; missing values
+    are (0, 0.0). The residual is None when every amount is a whole number
+    of minor units, which is the common case for ledger amounts.
+
+    Returns:
+        Tuple of (cents, residual)
+    """
+    amounts = np.asarray(values, dtype=float)
+    scaled = np.nan_to_num(amounts * MINOR_UNITS, nan=0.0)
+    np.rint(scaled, out=scaled)
+    cents = scaled.astype(np.int64)
+
+    residual = np.nan_to_num(amounts, nan=0.0) - scaled / MINOR_UNITS
+    if not residual.any():
+        residual = None
+    return cents, residual
+
+
+def minor_units_total(cents: np.ndarray, residual: Optional[np.ndarray] = None,
+                      mask: Optional[np.ndarray] = None) -> float:
+    """Total of amounts in minor units (optionally only where `mask` is True), as a float."""
+    if mask is not None:
+        cents = cents[mask]
+        residual = residual[mask] if residual is not None else None
+    total = int(cents.sum()) / MINOR_UNITS
+    if residual is not None:
+        total += float(residual.sum())
+    return total
+
+# =============================================================================
+# TOTALS
+# =============================================================================
+
+def exact_parts(values: Any, block_rows: int = MONEY_BLOCK_ROWS) -> Tuple[int, float]:
+    """
+    Exact total of amounts (missing values skipped) as (cents, residual).
+
+    Same result as minor_units_total(*to_minor_units(values)), computed block
+    by block with reused buffers instead of materializing the converted column.
+    """
+    amounts = np.asarray(values, dtype=float)
+    scaled = np.empty(block_rows)
+    back = np.empty(block_rows)
+    missing = np.empty(block_rows, dtype=bool)
+    cents_total = 0
+    residual_total = 0.0
+
+    for start in range(0, len(amounts), block_rows):
+        block = amounts[start:start + block_rows]
+        n = len(block)
+        s, b, m = scaled[:n], back[:n], missing[:n]
+
+        np.multiply(block, MINOR_UNITS, out=s)
+        np.rint(s, out=s)
+        np.isnan(s, out=m)
+        s[m] = 0
+        cents_total += int(s.astype(np.int64).sum())
+
+        np.divide(s, MINOR_UNITS, out=b)
+        np.subtract(block, b, out=b)
+        b[m] = 0
+        residual_total += float(b.sum())
+
+    return cents_total, residual_total
+
+
+def exact_total(values: Any, block_rows: int = MONEY_BLOCK_ROWS) -> float:
+    """Exact total of amounts (missing values skipped): int64 cents plus float residuals."""
+    cents, residual = exact_parts(values, block_rows)
+    return cents / MINOR_UNITS + residual
+
+
+def money_total(values: Any, mode: str = DEFAULT_MONEY_MODE) -> float:
+    """Total of an amount column (Series or array, missing values skipped) in the given mode."""
+    if mode == "float":
+        return float(pd.Series(values, copy=False).sum())
+    if mode != "exact":
+        raise ValueError(f"Unknown money mode '{mode}' (expected one of {MONEY_MODES})")
+    return exact_total(values)
+
+
+def money_group_parts(values: Any, keys: Any) -> pd.DataFrame:
+    """
+    Exact totals of an amount column per key (missing amounts skipped) as
+    int64 cents and float residual columns, indexed by key in order of first
+    appearance. The column is converted once and the cents summed per group.
+    """
+    cents, residual = to_minor_units(values)
+    parts = pd.DataFrame({"cents": cents, "residual": residual if residual is not None else 0.0})
+    return parts.groupby(np.asarray(keys), sort=False, dropna=False).sum()
+
+
+def money_group_totals(values: Any, keys: Any, mode: str = DEFAULT_MONEY_MODE) -> pd.Series:
+    """
+    Totals of an amount column per key (missing amounts skipped) in the
+    given mode, indexed by key in order of first appearance (a missing key
+    is a group of its own).
+
+    Float totals equal money_total() of each group's amounts: lines are
+    stably sorted by key and each group's contiguous run is summed as
+    Series.sum() sums it, so grouped and per-group totals agree to the bit.
+    """
+    if mode == "exact":
+        parts = money_group_parts(values, keys)
+        return parts["cents"] / MINOR_UNITS + parts["residual"]
+    if mode != "float":
+        raise ValueError(f"Unknown money mode '{mode}' (expected one of {MONEY_MODES})")
+
+    codes, uniques = pd.factorize(np.asarray(keys), use_na_sentinel=False)
+    order = np.argsort(codes, kind="stable")
+    amounts = np.nan_to_num(np.asarray(values, dtype=float)[order], nan=0.0)
+    starts = np.flatnonzero(np.diff(codes[order], prepend=-1))
+    ends = np.append(starts[1:], len(amounts))
+    return pd.Series([float(amounts[start:end].sum()) for start, end in zip(starts, ends)],
+                     index=uniques, dtype=float)
+
+# =============================================================================
+# RUNNING TOTALS
+# =============================================================================
+
+def _neumaier_add(running: Dict, key: str, value: float):
+    """Add `value` to running[key], carrying the lost low-order bits in running[key + '_compensation']."""
+    total = running[key]
+    new_total = total + value
+    if abs(total) >= abs(value):
+        running[key + "_compensation"] += (total - new_total) + value
+    else:
+        running[key + "_compensation"] += (value - new_total) + total
+    running[key] = new_total
+
+
+def new_running_total(mode: str = DEFAULT_MONEY_MODE) -> Dict:
+    """Empty running total of a column read chunk by chunk, in the given mode."""
+    if mode not in MONEY_MODES:
+        raise ValueError(f"Unknown money mode '{mode}' (expected one of {MONEY_MODES})")
+    return {"mode": mode, "cents": 0, "sum": 0.0, "sum_compensation": 0.0}
+
+
+def add_to_running_total(running: Dict, values: Any):
+    """Add one chunk of amounts (missing values skipped) to a running total."""
+    if running["mode"] == "exact":
+        cents, residual = exact_parts(values)
+        running["cents"] += cents
+        _neumaier_add(running, "sum", residual)
+    else:
+        _neumaier_add(running, "sum", money_total(values, "float"))
+
+
+def running_total_value(running: Dict) -> float:
+    """Current value of a running total."""
+    total = running["sum"] + running["sum_compensation"]
+    if running["mode"] == "exact":
+        total += running["cents"] / MINOR_UNITS
+    return total
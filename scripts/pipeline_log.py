@@ -0,0 +1,220 @@
+"""
+Structured Pipeline Log
+
+Execution log shared by the phase scripts and the pipeline runner. Each
+script keeps one PipelineLog:
+
+- message lines ("[timestamp] [LEVEL] message") are kept in memory and
+  echoed to the console; the Markdown execution logs are rendered from them
+- events are structured records (stage, event, sheet, seconds, rows, plus
+  any extra fields) written as JSON lines to outputs/logs/<stage>.jsonl in
+  batches, so a run over thousands of sheets does not write per line
+
+Console output is batched too: buffered_console() swaps stdout for a large
+block buffer, so print() and log() lines reach the terminal in a few large
+writes instead of one write per line.
+
+Event record:
+    {"ts": "2026-10-18T09:30:00.123456", "run": "2026-10-18T09:29:58",
+     "stage": "phase_1c", "event": "normalize_sheet", "sheet": "Empl.",
+     "seconds": 0.0123, "rows": 458, "from_cache": false}
+
+Used by:
+- scripts/01_ingestion_and_schema.py
+- scripts/02_phase1c_normalization.py
+- scripts/03_phase2_analysis.py
+- scripts/run_pipeline.py
+
+Author: Pipeline Infrastructure
+Date: 2026-10-18
+
+IMPORTANT: This module does NOT modify raw data files.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+LOG_DIR = "outputs/logs"
+
+# Events held in memory before they are appended to the JSON-lines file
+EVENT_BATCH_SIZE = 256
+
+# Console buffer: stdout is written when this many bytes are pending
+CONSOLE_BUFFER_BYTES = 1 << 16
+
+# Slowest per-sheet events listed in the rendered timing summary
+SLOWEST_EVENTS = 10
+
+# =============================================================================
+# CONSOLE
+# =============================================================================
+
+@contextlib.contextmanager
+def buffered_console(buffer_bytes: int = CONSOLE_BUFFER_BYTES) -> Iterator[None]:
+    """
+    Batch console writes for the duration of the block.
+
+    stdout is replaced by a block-buffered stream on the same file
+    descriptor (an interactive stdout is otherwise flushed on every line);
+    everything pending is written when the block exits. Does nothing when
+    stdout is not a real file (e.g. captured).
+    """
+    try:
+        fd = sys.stdout.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        yield
+        return
+
+    original = sys.stdout
+    original.flush()
+    buffered = io.TextIOWrapper(
+        open(fd, "wb", buffering=buffer_bytes, closefd=False),
+        encoding=original.encoding or "utf-8", errors=getattr(original, "errors", None) or "strict"
+    )
+    sys.stdout = buffered
+    try:
+        yield
+    finally:
+        buffered.flush()
+        sys.stdout = original
+
+# =============================================================================
+# PIPELINE LOG
+# =============================================================================
+
+class PipelineLog:
+    """
+    Message lines and structured events of one stage (script).
+
+    Call start_run() at the start of each run: it clears the message lines,
+    resets the lap clock and makes the run's first batch replace the events
+    file, so the lines and the file hold the latest run only (several runs
+    can share a process, e.g. portfolio entities).
+    """
+
+    def __init__(self, stage: str, log_dir: str = LOG_DIR, batch_size: int = EVENT_BATCH_SIZE):
+        self.stage = stage
+        self.events_path = os.path.join(log_dir, f"{stage}.jsonl")
+        self.batch_size = batch_size
+        self.lines: List[str] = []
+        self.events: List[Dict[str, Any]] = []
+        self._pending: List[Dict[str, Any]] = []
+        self.start_run()
+
+    def start_run(self):
+        """Begin a new run: new run id, lines cleared, lap clock reset, events file replaced on the next flush."""
+        self.flush()
+        self.run_id = datetime.now().isoformat(timespec="seconds")
+        self.lines.clear()
+        self.events = []
+        self._replace_file = True
+        self._lap_start = time.perf_counter()
+
+    # -------------------------------------------------------------------------
+    # Messages
+    # -------------------------------------------------------------------------
+
+    def log(self, message: str, level: str = "INFO"):
+        """Record a timestamped message line and echo it to the console."""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        entry = f"[{timestamp}] [{level}] {message}"
+        self.lines.append(entry)
+        print(entry)
+
+    # -------------------------------------------------------------------------
+    # Events
+    # -------------------------------------------------------------------------
+
+    def event(self, event: str, sheet: Optional[str] = None, seconds: Optional[float] = None,
+              rows: Optional[int] = None, **fields):
+        """Record one structured event; events are written in batches (see flush)."""
+        record = {
+            "ts": datetime.now().isoformat(),
+            "run": self.run_id,
+            "stage": self.stage,
+            "event": event,
+            "sheet": sheet,
+            "seconds": round(seconds, 6) if seconds is not None else None,
+            "rows": int(rows) if rows is not None else None
+        }
+        record.update(fields)
+        self.events.append(record)
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    @contextlib.contextmanager
+    def timed(self, event: str, sheet: Optional[str] = None, **fields) -> Iterator[Dict[str, Any]]:
+        """
+        Time the block and record it as one event.
+
+        Yields a dict the block can fill with event fields known only at the
+        end (e.g. fields["rows"] = len(df)).
+        """
+        info = dict(fields)
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            rows = info.pop("rows", None)
+            self.event(event, sheet, time.perf_counter() - start, rows, **info)
+
+    def lap(self, event: str, rows: Optional[int] = None, **fields):
+        """Record the time since the previous lap (or the start of the run) as one event."""
+        now = time.perf_counter()
+        self.event(event, None, now - self._lap_start, rows, **fields)
+        self._lap_start = now
+
+    def flush(self):
+        """Append the pending events to the JSON-lines file."""
+        if not self._pending:
+            return
+        os.makedirs(os.path.dirname(self.events_path) or ".", exist_ok=True)
+        with open(self.events_path, "w" if self._replace_file else "a") as f:
+            f.write("".join(json.dumps(record, default=str) + "\n" for record in self._pending))
+        self._pending = []
+        self._replace_file = False
+
+    # -------------------------------------------------------------------------
+    # Rendering
+    # -------------------------------------------------------------------------
+
+    def timing_markdown(self, slowest: int = SLOWEST_EVENTS) -> str:
+        """
+        Markdown timing summary of this run's events: totals per event type,
+        then the slowest per-sheet events.
+        """
+        timed_events = [e for e in self.events if e["seconds"] is not None]
+        if not timed_events:
+            return "No timed events recorded.\n"
+
+        totals: Dict[str, Dict[str, Any]] = {}
+        for e in timed_events:
+            total = totals.setdefault(e["event"], {"count": 0, "rows": 0, "seconds": 0.0})
+            total["count"] += 1
+            total["rows"] += e["rows"] or 0
+            total["seconds"] += e["seconds"]
+
+        lines = ["| Event | Count | Rows | Seconds |", "|---|---:|---:|---:|"]
+        for name, total in totals.items():
+            lines.append(f"| {name} | {total['count']} | {total['rows']:,} | {total['seconds']:.3f} |")
+
+        per_sheet = sorted((e for e in timed_events if e["sheet"]), key=lambda e: e["seconds"], reverse=True)
+        if per_sheet:
+            lines += ["", f"Slowest sheets (top {min(slowest, len(per_sheet))}):", "",
+                      "| Event | Sheet | Rows | Seconds |", "|---|---|---:|---:|"]
+            for e in per_sheet[:slowest]:
+                rows = f"{e['rows']:,}" if e["rows"] is not None else ""
+                lines.append(f"| {e['event']} | {e['sheet']} | {rows} | {e['seconds']:.4f} |")
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,266 @@
+"""
+Declarative QC Rule Engine
+
+Evaluates pre/post normalization invariants and P&L tie-outs for any number
+of sheets at once. Rules are declared as plain dicts (see
+02_phase1c_normalization.py: INVARIANT_RULES, PNL_TIEOUTS); the metrics of
+every sheet are flattened into one table and each rule is evaluated as a
+vectorized comparison over that table, so the cost is one pass over the
+metrics whatever the number of sheets.
+
+Invariant rule:
+    {"check": "null_count_", "metric": "null_count", "per_column": True,
+     "tolerance": 0, "report": "invariants"}
+
+    metric      one of METRICS
+    per_column  the check name is suffixed with the column name
+    tolerance   |post - pre| <= tolerance passes (0 = must be equal)
+    report      "invariants" (10_invariant_checks.csv) or
+                "sums" (09_pre_post_sum_reconciliation.csv)
+
+Tie-out rule:
+    {"category": "Recurring Revenue", "label": "Recurring",
+     "sheet": "RecurringRevenue", "column": "2018_total"}
+
+    The post-normalization sum of sheet/column must match the P&L Summary
+    value of `label` within the tie-out tolerance.
+
+Detail tie-out rule (evaluated on the frames themselves):
+    {"check": "G&A Opex", "label": "G&A", "sheet": "OPEX - NEmpl.",
+     "column": "2018_total", "filter_column": "function_l2", "filter_value": "G&A"}
+
+    sheet          a sheet name, or a list of sheets whose totals are added
+                   (e.g. the three revenue sheets for "Revenue")
+    filter_column  optional; only lines whose filter_column equals
+                   filter_value are totalled
+    Every sheet/filter column named by the map is grouped once, and the
+    group totals are joined to the map and to the P&L Summary by key, so
+    the cost does not grow with the number of tie-outs.
+
+Used by:
+- scripts/02_phase1c_normalization.py
+- scripts/03_phase2_analysis.py
+
+Author: Pipeline Infrastructure
+Date: 2026-10-18
+
+IMPORTANT: This module does NOT modify raw data files.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+from money import (
+    DEFAULT_MONEY_MODE, MINOR_UNITS, exact_parts, money_total, money_group_parts, money_group_totals
+)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# Metrics recorded per sheet by Phase 1c (pre_metrics / post_metrics dicts)
+METRICS = ["row_count", "column_count", "null_count", "sum"]
+
+# Sheet-level metrics have no column; they are keyed by this placeholder
+SHEET_LEVEL = ""
+
+# =============================================================================
+# METRICS TABLE
+# =============================================================================
+
+def _flatten_metrics(metrics: Dict[str, Dict], renames: Dict[str, str]) -> pd.DataFrame:
+    """One row per (sheet, metric, column) in sheet order, columns renamed with `renames`."""
+    sheets, names, columns, values = [], [], [], []
+    for sheet_name, m in metrics.items():
+        entries = [("row_count", SHEET_LEVEL, m["row_count"]), ("column_count", SHEET_LEVEL, m["column_count"])]
+        entries += [("null_count", renames.get(col, col), n) for col, n in m["null_counts"].items()]
+        entries += [("sum", renames.get(col, col), s) for col, s in m["sums"].items()]
+        sheets.extend([sheet_name] * len(entries))
+        for name, column, value in entries:
+            names.append(name)
+            columns.append(column)
+            values.append(value)
+
+    return pd.DataFrame({
+        "sheet": sheets,
+        "metric": names,
+        "column": columns,
+        "value": np.asarray(values, dtype=float)
+    })
+
+
+def metrics_table(pre_metrics: Dict[str, Dict], post_metrics: Dict[str, Dict],
+                  renames: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Pre and post metrics of every sheet side by side.
+
+    Pre-normalization column names are mapped through `renames` (Rule 4) so
+    they line up with the post-normalization names; metrics with no post
+    counterpart are dropped. Rows keep the order of the pre metrics.
+
+    Returns:
+        DataFrame with columns: sheet, metric, column, pre_value, post_value
+    """
+    pre = _flatten_metrics(pre_metrics, renames or {})
+    post = _flatten_metrics(post_metrics, {})
+    table = pre.merge(post, on=["sheet", "metric", "column"], how="inner", suffixes=("_pre", "_post"))
+    return table.rename(columns={"value_pre": "pre_value", "value_post": "post_value"})
+
+# =============================================================================
+# RULE EVALUATION
+# =============================================================================
+
+def evaluate_rules(metrics: pd.DataFrame, rules: List[Dict]) -> pd.DataFrame:
+    """
+    Evaluate every rule against every matching row of the metrics table.
+
+    Returns:
+        DataFrame with columns: sheet, check, column, pre_value, post_value,
+        difference, tolerance, status, report (in metrics table order)
+    """
+    rule_table = pd.DataFrame(rules)
+    results = metrics.merge(rule_table, on="metric", how="inner")
+
+    per_column = results["per_column"].to_numpy(dtype=bool)
+    results["check"] = np.where(per_column, results["check"] + results["column"], results["check"])
+    results["difference"] = (results["post_value"] - results["pre_value"]).abs()
+    results["status"] = np.where(results["difference"] <= results["tolerance"], "PASS", "FAIL")
+
+    return results[["sheet", "check", "column", "pre_value", "post_value",
+                    "difference", "tolerance", "status", "report"]]
+
+
+def invariant_report(results: pd.DataFrame) -> pd.DataFrame:
+    """10: count invariants (row count, column count, nulls per column)."""
+    rows = results[results["report"] == "invariants"]
+    return pd.DataFrame({
+        "sheet": rows["sheet"].to_numpy(),
+        "check": rows["check"].to_numpy(),
+        "pre_value": rows["pre_value"].to_numpy().astype("int64"),
+        "post_value": rows["post_value"].to_numpy().astype("int64"),
+        "status": rows["status"].to_numpy()
+    })
+
+
+def sum_report(results: pd.DataFrame) -> pd.DataFrame:
+    """09: pre/post sum reconciliation within tolerance."""
+    rows = results[results["report"] == "sums"]
+    return pd.DataFrame({
+        "sheet": rows["sheet"].to_numpy(),
+        "column": rows["column"].to_numpy(),
+        "pre_sum": rows["pre_value"].to_numpy(),
+        "post_sum": rows["post_value"].to_numpy(),
+        "difference": rows["difference"].to_numpy(),
+        "tolerance": rows["tolerance"].to_numpy(),
+        "status": rows["status"].to_numpy()
+    })
+
+
+def pnl_reference_values(pnl_summary: pd.DataFrame, label_column: str = "p_l_summary",
+                         value_column: str = "2018_total") -> pd.Series:
+    """P&L Summary value of each label (first occurrence of each label), indexed by label."""
+    first = pnl_summary.drop_duplicates(label_column)
+    return pd.Series(first[value_column].to_numpy(dtype=float), index=first[label_column].to_numpy())
+
+
+def evaluate_tieouts(metrics: pd.DataFrame, reference_values: pd.Series, tieouts: List[Dict],
+                     tolerance: float) -> pd.DataFrame:
+    """
+    11: tie each sheet/column post-normalization sum out to a reference value.
+
+    reference_values maps a P&L Summary label to its value (first occurrence
+    of each label). A tie-out passes when the reference exists, is non-zero
+    and differs from the computed sum by less than `tolerance`.
+    """
+    tie = pd.DataFrame(tieouts)
+    sums = metrics[metrics["metric"] == "sum"].set_index(["sheet", "column"])["post_value"]
+    computed = sums.reindex(pd.MultiIndex.from_arrays([tie["sheet"], tie["column"]])).to_numpy()
+    expected = reference_values.reindex(tie["label"]).to_numpy(dtype=float)
+
+    has_reference = ~np.isnan(expected) & (expected != 0)
+    difference = np.where(has_reference, np.abs(computed - expected), np.nan)
+
+    return pd.DataFrame({
+        "category": tie["category"].to_numpy(),
+        "pnl_summary_value": expected,
+        "computed_value": computed,
+        "difference": difference,
+        "status": np.where(has_reference & (difference < tolerance), "PASS", "FAIL")
+    })
+
+
+def detail_totals(frames: Dict[str, pd.DataFrame], tieouts: pd.DataFrame,
+                  money_mode: str = DEFAULT_MONEY_MODE) -> pd.DataFrame:
+    """
+    Totals of every slice a detail tie-out map refers to: one total per
+    sheet/column without a filter, one grouped total per sheet/column/filter
+    column otherwise (every value of the filter column at once).
+
+    Exact totals are kept as int64 cents plus a float residual, so totals
+    added across sheets are still exact.
+
+    Returns:
+        DataFrame with columns: sheet, column, filter_column, filter_value,
+        and total ("float") or cents, residual ("exact")
+    """
+    slices = tieouts[["sheet", "column", "filter_column"]].drop_duplicates()
+    parts = []
+    for sheet, column, filter_column in slices.itertuples(index=False):
+        amounts = frames[sheet][column]
+        if filter_column == SHEET_LEVEL and money_mode == "exact":
+            cents, residual = exact_parts(amounts)
+            totals = pd.DataFrame({"cents": [cents], "residual": [residual]}, index=[SHEET_LEVEL])
+        elif filter_column == SHEET_LEVEL:
+            totals = pd.DataFrame({"total": [money_total(amounts, money_mode)]}, index=[SHEET_LEVEL])
+        elif money_mode == "exact":
+            totals = money_group_parts(amounts, frames[sheet][filter_column])
+        else:
+            totals = money_group_totals(amounts, frames[sheet][filter_column], money_mode).to_frame("total")
+        totals = totals.rename_axis("filter_value").reset_index()
+        totals["filter_value"] = totals["filter_value"].astype(object)
+        parts.append(totals.assign(sheet=sheet, column=column, filter_column=filter_column))
+    return pd.concat(parts, ignore_index=True)
+
+
+def evaluate_detail_tieouts(frames: Dict[str, pd.DataFrame], reference_values: pd.Series, tieouts: List[Dict],
+                            tolerance: float, money_mode: str = DEFAULT_MONEY_MODE) -> pd.DataFrame:
+    """
+    Tie detail sheet totals (optionally filtered, optionally over several
+    sheets) out to P&L Summary values, for the whole map at once.
+
+    Totals are taken in `money_mode`; a slice with no lines totals 0. A
+    tie-out reconciles when the reference exists and differs from the
+    computed total by less than `tolerance`.
+
+    Returns:
+        DataFrame with columns: check, label, pnl_summary, computed,
+        difference, reconciled (in map order)
+    """
+    tie = pd.DataFrame(tieouts)
+    for col in ["filter_column", "filter_value"]:
+        tie[col] = tie[col].fillna(SHEET_LEVEL) if col in tie else SHEET_LEVEL
+    tie["tieout"] = np.arange(len(tie))
+
+    # One row per (tie-out, sheet), joined to the slice totals by key
+    parts = tie.explode("sheet", ignore_index=True)
+    totals = detail_totals(frames, parts, money_mode)
+    joined = parts.merge(totals, on=["sheet", "column", "filter_column", "filter_value"], how="left")
+    if money_mode == "exact":
+        summed = joined.groupby("tieout")[["cents", "residual"]].sum()
+        computed = summed["cents"] / MINOR_UNITS + summed["residual"]
+    else:
+        computed = joined.groupby("tieout")["total"].sum()
+    computed = computed.reindex(tie["tieout"]).to_numpy()
+
+    expected = reference_values.reindex(tie["label"]).to_numpy(dtype=float)
+    difference = np.abs(computed - expected)
+
+    return pd.DataFrame({
+        "check": tie["check"].to_numpy(),
+        "label": tie["label"].to_numpy(),
+        "pnl_summary": expected,
+        "computed": computed,
+        "difference": difference,
+        "reconciled": difference < tolerance
+    })
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Pipeline Runner
+
+Runs the phases in one process as a graph of stages:
+
+    ingestion      Phase 1: header detection, schema normalization, QC 01-06/12
+    normalization  Phase 1c: approved Rules 1/4/5 applied to every sheet
+    qc             Phase 1c: QC 08-11 and the execution log   (after normalization)
+    analysis       Phase 2: overview, flag register, aggregates (after normalization)
+    decisions      Phase 5: decision-safe / unsafe line and cell classification
+                   (after normalization)
+
+Each stage declares the modules it runs, the input files it reads, the
+stages it depends on and the files it writes. A stage is skipped when its
+key (code version + input hashes + parameters + upstream keys) matches the
+last successful run and its outputs are still the files that run wrote.
+Stages that run share frames in memory: normalization reuses the sheets
+ingestion just parsed, and analysis uses the normalized frames instead of
+loading them again.
+
+The code version of a module is the hash of its AST, so comment or
+formatting edits do not invalidate a stage. Stage keys and output hashes
+are kept in .cache/pipeline_state.json. Each stage's status and timing is
+also recorded in outputs/logs/pipeline.jsonl (see pipeline_log.py), next to
+the per-sheet events the phases write.
+
+Usage:
+    python scripts/run_pipeline.py [--force] [--quiet] [--stream | --chunked] [--no-cache] [--money-mode MODE]
+                                   [--dimension-storage MODE] [--reader NAME]
+                                   [--pnl-source PATH] [--cfr-source PATH]
+
+Author: Pipeline Infrastructure
+Date: 2026-10-18
+
+IMPORTANT: This script does NOT modify raw data files.
+"""
+
+import argparse
+import ast
+import contextlib
+import importlib
+import importlib.util
+import io
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from ledger_io import (
+    STREAM_MEMORY_LIMIT_MB, DEFAULT_READER, READER_BACKENDS, file_content_hash, definition_fingerprint
+)
+from money import MONEY_MODES, DEFAULT_MONEY_MODE
+from dimensions import STORAGE_MODES, DEFAULT_STORAGE_MODE
+from pipeline_log import PipelineLog, buffered_console
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+INPUT_PL_FILE = "data/Operational Leadership Real Work - Input P&L.xlsx"
+CENTRAL_FINANCE_FILE = "data/Central Finance Roles.xlsx"
+
+# Stage keys and output hashes of the last successful run of each stage
+PIPELINE_STATE_FILE = ".cache/pipeline_state.json"
+
+PHASE1 = "01_ingestion_and_schema"
+PHASE1C = "02_phase1c_normalization"
+PHASE2 = "03_phase2_analysis"
+PHASE5 = "04_decision_safety"
+
+# Stage events of each run (outputs/logs/pipeline.jsonl)
+PIPELINE_LOG = PipelineLog("pipeline")
+
+# Stages in execution (topological) order.
+#   modules:  code the stage runs; its AST hash is the stage's code version
+#   inputs:   source keys ("pnl", "cfr") whose file contents the stage reads
+#   params:   run options that change what the stage produces (dimension
+#             storage is not one: it changes memory and speed, not outputs)
+#   deps:     upstream stages whose results feed this stage
+#   requires: in-memory results the stage cannot run without
+#   outputs:  files (or directories of part files) the stage writes
+STAGES = [
+    {
+        "name": "ingestion",
+        "modules": [PHASE1, "ledger_io", "column_profile"],
+        "inputs": ["pnl", "cfr"],
+        "params": ["stream"],
+        "deps": [],
+        "requires": [],
+        "outputs": [
+            "outputs/qc/01_sheet_ingestion_summary.csv",
+            "outputs/qc/02_column_name_mapping.csv",
+            "outputs/qc/03_null_rate_summary.csv",
+            "outputs/qc/04_data_type_summary.csv",
+            "outputs/qc/06_numeric_pattern_summary.csv",
+            "outputs/qc/12_layout_registry_status.csv",
+            "notes/assumptions.md"
+        ]
+    },
+    {
+        "name": "normalization",
+        "modules": [PHASE1C, "ledger_io", "money", "column_profile"],
+        "inputs": ["pnl", "cfr"],
+        "params": ["stream", "chunked", "money_mode"],
+        "deps": [],
+        "requires": [],
+        "outputs": []
+    },
+    {
+        "name": "qc",
+        "modules": [PHASE1C, "qc_rules", "money", "pipeline_log"],
+        "inputs": [],
+        "params": [],
+        "deps": ["normalization"],
+        "requires": ["normalization"],
+        "outputs": [
+            "outputs/qc/08_post_normalization_dtype_summary.csv",
+            "outputs/qc/09_pre_post_sum_reconciliation.csv",
+            "outputs/qc/10_invariant_checks.csv",
+            "outputs/qc/11_pnl_cross_validation.csv",
+            "notes/phase_1c_execution_log.md"
+        ]
+    },
+    {
+        "name": "analysis",
+        "modules": [PHASE2, "ledger_io", "money", "dimensions", "qc_rules", "ledger_analytics"],
+        "inputs": ["pnl"],
+        "params": ["money_mode"],
+        "deps": ["normalization"],
+        "requires": [],
+        "outputs": [
+            "outputs/phase_2/01_pnl_overview_summary.md",
+            "outputs/phase_2/02_flag_register.csv",
+            "outputs/phase_2/03_supporting_aggregates.xlsx",
+            "outputs/phase_2/04_offset_ratios.csv",
+            "outputs/phase_2/05_benchmark_evaluation.csv"
+        ]
+    },
+    {
+        "name": "decisions",
+        "modules": [PHASE5, PHASE2, "ledger_io", "money", "ledger_analytics", "pipeline_log"],
+        "inputs": ["pnl"],
+        "params": [],
+        "deps": ["normalization"],
+        "requires": [],
+        "outputs": [
+            "outputs/phase_5/01_decision_safety_summary.csv",
+            "outputs/phase_5/decision_safety"
+        ]
+    }
+]
+
+# =============================================================================
+# STAGE KEYS
+# =============================================================================
+
+def module_code_version(module_name: str) -> str:
+    """Hash of a module's AST (unchanged by comment and formatting edits); read without importing it."""
+    spec = importlib.util.find_spec(module_name)
+    with open(spec.origin, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return definition_fingerprint(ast.dump(tree))
+
+
+def source_fingerprint(path: str) -> Optional[str]:
+    """Content hash of an input: a file, or every ledger export in a directory."""
+    if os.path.isdir(path):
+        return definition_fingerprint({
+            name: file_content_hash(os.path.join(path, name)) for name in sorted(os.listdir(path))
+            if os.path.isfile(os.path.join(path, name))
+        })
+    if os.path.exists(path):
+        return file_content_hash(path)
+    return None
+
+
+def output_fingerprint(path: str) -> Optional[str]:
+    """
+    Content hash of an output: a file, or every file under a directory (by
+    relative path, so a part file added, removed or modified changes it).
+    None if it does not exist.
+    """
+    if os.path.isdir(path):
+        return definition_fingerprint({
+            os.path.relpath(os.path.join(root, name), path): file_content_hash(os.path.join(root, name))
+            for root, _, names in os.walk(path) for name in names
+        })
+    if os.path.exists(path):
+        return file_content_hash(path)
+    return None
+
+
+def output_fingerprints(paths: List[str]) -> Dict[str, Optional[str]]:
+    """Content hash of each output file or directory (None if it does not exist)."""
+    return {path: output_fingerprint(path) for path in paths}
+
+
+def stage_keys(sources: Dict[str, str], params: Dict[str, Any]) -> Dict[str, Dict]:
+    """
+    Key components of every stage: code version, input hashes, parameters
+    and upstream keys. A stage's key changes whenever any upstream key does.
+    """
+    code_versions = {}
+    input_hashes = {name: source_fingerprint(path) for name, path in sources.items()}
+    keys = {}
+
+    for stage in STAGES:
+        for module_name in stage["modules"]:
+            if module_name not in code_versions:
+                code_versions[module_name] = module_code_version(module_name)
+
+        parts = {
+            "code": definition_fingerprint([code_versions[m] for m in stage["modules"]]),
+            "inputs": definition_fingerprint({name: input_hashes[name] for name in stage["inputs"]}),
+            "params": definition_fingerprint({name: params[name] for name in stage["params"]}),
+            "deps": definition_fingerprint([keys[dep]["key"] for dep in stage["deps"]])
+        }
+        parts["key"] = definition_fingerprint(parts)
+        keys[stage["name"]] = parts
+
+    return keys
+
+# =============================================================================
+# PIPELINE STATE
+# =============================================================================
+
+def load_pipeline_state(path: str = PIPELINE_STATE_FILE) -> Dict[str, Dict]:
+    """Stage entries ({key parts, outputs}) of the last successful run."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_pipeline_state(state: Dict[str, Dict], path: str = PIPELINE_STATE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def stale_reason(stage: Dict, parts: Dict, previous: Optional[Dict]) -> Optional[str]:
+    """Why a stage must run, or None when it can be skipped."""
+    if previous is None:
+        return "no previous run"
+    for component, reason in [("code", "code changed"), ("inputs", "inputs changed"),
+                              ("params", "parameters changed"), ("deps", "upstream changed")]:
+        if previous.get(component) != parts[component]:
+            return reason
+    # Recorded outputs plus any declared output that exists but was not recorded
+    recorded = previous.get("outputs", {})
+    current = output_fingerprints(sorted(set(recorded) | {path for path in stage["outputs"] if os.path.exists(path)}))
+    if current != recorded:
+        return "outputs missing or modified"
+    return None
+
+
+def plan_stages(keys: Dict[str, Dict], state: Dict[str, Dict], force: bool = False) -> Dict[str, str]:
+    """
+    Stages to run, with the reason for each.
+
+    Stale stages run; a skipped stage also runs when a stage that runs
+    requires its in-memory result (e.g. qc needs the normalized frames).
+    """
+    plan = {}
+    for stage in STAGES:
+        reason = "forced" if force else stale_reason(stage, keys[stage["name"]], state.get(stage["name"]))
+        if reason:
+            plan[stage["name"]] = reason
+
+    for stage in reversed(STAGES):
+        if stage["name"] in plan:
+            for name in stage["requires"]:
+                plan.setdefault(name, f"required by {stage['name']}")
+
+    return plan
+
+# =============================================================================
+# STAGES
+# =============================================================================
+
+def phase1_frames(frames: Dict[str, pd.DataFrame], qc_records: List[Dict],
+                  sources: Dict[str, str]) -> Dict[str, pd.DataFrame]:
+    """
+    Sheets Phase 1 ingested this run, keyed "<source>/<sheet>" for Phase 1c.
+
+    Only sheets whose detected header row is the one Phase 1c uses are
+    shared; Phase 1c re-reads the rest (and sheets Phase 1 took from cache).
+    """
+    phase1c = importlib.import_module(PHASE1C)
+    labels = {"Input P&L": "pnl", "Central Finance Roles": "cfr"}
+    shared = {}
+    for record in qc_records:
+        prefix = labels.get(record["file"])
+        key = f"{prefix}_{record['sheet_name']}"
+        if prefix is None or key not in frames:
+            continue
+        source = sources[prefix]
+        if record["detected_header_row"] == phase1c.sheet_header_row(source, record["sheet_name"]):
+            shared[f"{source}/{record['sheet_name']}"] = frames[key]
+    return shared
+
+
+def run_ingestion(context: Dict, options: Dict):
+    phase1 = importlib.import_module(PHASE1)
+    frames, qc_records, _ = phase1.main(
+        stream=options["stream"], memory_limit_mb=options["memory_limit_mb"], use_cache=options["use_cache"],
+        reader=options["reader"], pnl_source=options["sources"]["pnl"], cfr_source=options["sources"]["cfr"]
+    )
+    context["phase1_frames"] = phase1_frames(frames, qc_records, options["sources"])
+
+
+def run_normalization(context: Dict, options: Dict):
+    phase1c = importlib.import_module(PHASE1C)
+    context["normalization"] = phase1c.normalize_sources(
+        options["stream"], options["memory_limit_mb"], options["use_cache"], options["reader"],
+        options["sources"]["pnl"], options["sources"]["cfr"], context.get("phase1_frames"),
+        options["money_mode"], options["chunked"]
+    )
+
+
+def run_qc(context: Dict, options: Dict):
+    phase1c = importlib.import_module(PHASE1C)
+    results = phase1c.generate_qc_outputs(context["normalization"])
+    phase1c.write_execution_log(results)
+
+
+def run_analysis(context: Dict, options: Dict):
+    phase2 = importlib.import_module(PHASE2)
+    normalized = context.get("normalization")
+    # Chunked normalization leaves large sheets in the cache only; Phase 2 loads them from there
+    shared = normalized is not None and not options["chunked"]
+    results = phase2.main(use_cache=options["use_cache"], reader=options["reader"],
+                          source=options["sources"]["pnl"],
+                          data=normalized["normalized_dfs"] if shared else None,
+                          money_mode=options["money_mode"], dimension_storage=options["dimension_storage"])
+    phase2.write_overview_markdown(results)
+
+
+def run_decisions(context: Dict, options: Dict):
+    phase5 = importlib.import_module(PHASE5)
+    normalized = context.get("normalization")
+    shared = normalized is not None and not options["chunked"]
+    phase5.main(use_cache=options["use_cache"], reader=options["reader"], source=options["sources"]["pnl"],
+                data=normalized["normalized_dfs"] if shared else None)
+
+
+STAGE_RUNNERS = {
+    "ingestion": run_ingestion,
+    "normalization": run_normalization,
+    "qc": run_qc,
+    "analysis": run_analysis,
+    "decisions": run_decisions
+}
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def run_pipeline(stream: bool = False, memory_limit_mb: float = STREAM_MEMORY_LIMIT_MB,
+                 use_cache: bool = True, reader: str = DEFAULT_READER,
+                 pnl_source: str = INPUT_PL_FILE, cfr_source: str = CENTRAL_FINANCE_FILE,
+                 money_mode: str = DEFAULT_MONEY_MODE, dimension_storage: str = DEFAULT_STORAGE_MODE,
+                 chunked: bool = False, force: bool = False, quiet: bool = False) -> pd.DataFrame:
+    """
+    Run every stale stage in order and return the per-stage timing summary.
+
+    The state entry of a stage is saved as soon as it succeeds, so a failed
+    run resumes from the failed stage.
+    """
+    start = time.perf_counter()
+    PIPELINE_LOG.start_run()
+    sources = {"pnl": pnl_source, "cfr": cfr_source}
+    options = {"stream": stream, "memory_limit_mb": memory_limit_mb, "use_cache": use_cache,
+               "reader": reader, "sources": sources, "money_mode": money_mode,
+               "dimension_storage": dimension_storage, "chunked": chunked}
+
+    keys = stage_keys(sources, {"stream": stream, "chunked": chunked, "money_mode": money_mode})
+    state = load_pipeline_state()
+    plan = plan_stages(keys, state, force)
+    context = {}
+    records = []
+
+    for stage in STAGES:
+        name = stage["name"]
+        if name not in plan:
+            records.append({"stage": name, "status": "skipped", "reason": "unchanged", "seconds": 0.0})
+            PIPELINE_LOG.event("stage", seconds=0.0, name=name, status="skipped", reason="unchanged")
+            continue
+
+        print(f"\n>>> Stage: {name} ({plan[name]})")
+        stage_start = time.perf_counter()
+        if quiet:
+            with contextlib.redirect_stdout(io.StringIO()):
+                STAGE_RUNNERS[name](context, options)
+        else:
+            STAGE_RUNNERS[name](context, options)
+        elapsed = time.perf_counter() - stage_start
+
+        state[name] = dict(keys[name], outputs=output_fingerprints(
+            [path for path in stage["outputs"] if os.path.exists(path)]))
+        save_pipeline_state(state)
+        records.append({"stage": name, "status": "ran", "reason": plan[name], "seconds": round(elapsed, 3)})
+        PIPELINE_LOG.event("stage", seconds=elapsed, name=name, status="ran", reason=plan[name])
+
+    records.append({"stage": "TOTAL", "status": f"{len(plan)} of {len(STAGES)} ran", "reason": "",
+                    "seconds": round(time.perf_counter() - start, 3)})
+    PIPELINE_LOG.lap("pipeline", stages_run=len(plan), stages=len(STAGES))
+    PIPELINE_LOG.flush()
+    return pd.DataFrame(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the pipeline stages, skipping unchanged ones")
+    parser.add_argument("--force", action="store_true",
+                        help="Run every stage even if its code, inputs and outputs are unchanged")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Hide the output of the stages; print only the timing summary")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream sheets with openpyxl read-only iteration in bounded memory")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Normalize chunk by chunk with running metrics, writing normalized frames to the cache")
+    parser.add_argument("--memory-limit-mb", type=float, default=STREAM_MEMORY_LIMIT_MB,
+                        help="Memory budget per streamed chunk (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore and do not write the sheet layout and normalized frame caches")
+    parser.add_argument("--reader", default=DEFAULT_READER, choices=["auto"] + list(READER_BACKENDS),
+                        help="Excel reader backend (default: %(default)s = calamine if installed, else openpyxl)")
+    parser.add_argument("--pnl-source", default=INPUT_PL_FILE,
+                        help="Input P&L workbook, or a directory of CSV/Parquet/JSONL exports of its sheets")
+    parser.add_argument("--cfr-source", default=CENTRAL_FINANCE_FILE,
+                        help="Central Finance Roles workbook, or a CSV/Parquet/JSONL export of it")
+    parser.add_argument("--money-mode", default=DEFAULT_MONEY_MODE, choices=MONEY_MODES,
+                        help="How reconciliation totals are taken: float64, or exact int64 cents (default: %(default)s)")
+    parser.add_argument("--dimension-storage", default=DEFAULT_STORAGE_MODE, choices=STORAGE_MODES,
+                        help="How Phase 2 holds dimension columns: as strings, or dictionary-encoded (default: %(default)s)")
+    args = parser.parse_args()
+    if args.chunked and args.no_cache:
+        parser.error("--chunked writes normalized frames to the cache and cannot be combined with --no-cache")
+
+    with buffered_console():
+        summary = run_pipeline(stream=args.stream, memory_limit_mb=args.memory_limit_mb, use_cache=not args.no_cache,
+                               reader=args.reader, pnl_source=args.pnl_source, cfr_source=args.cfr_source,
+                               money_mode=args.money_mode, dimension_storage=args.dimension_storage,
+                               chunked=args.chunked, force=args.force, quiet=args.quiet)
+
+        print("\n" + "=" * 70)
+        print("PIPELINE STAGE SUMMARY")
+        print("=" * 70)
+        print(summary.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Portfolio Runner
+
+Runs the full pipeline (ingestion, Phase 1c normalization and QC, Phase 2
+analysis, Phase 5 classification; see run_pipeline.py) for every entity
+workbook of a portfolio, one entity per worker process, then compares the
+entities.
+
+Each entity is one Input P&L workbook (or directory of CSV/Parquet/JSONL
+exports of its sheets); the Central Finance Roles reference is shared. An
+entity runs inside its own partition, outputs/portfolio/<entity>/, which
+mirrors the repository layout:
+
+    outputs/portfolio/<entity>/outputs/qc/        Phase 1 / 1c QC files
+    outputs/portfolio/<entity>/outputs/phase_2/   overview, flag register, aggregates
+    outputs/portfolio/<entity>/outputs/phase_5/   decision-safe / unsafe classification
+    outputs/portfolio/<entity>/outputs/logs/      structured run events
+    outputs/portfolio/<entity>/notes/             assumptions, Phase 1c execution log
+    outputs/portfolio/<entity>/.cache/            frame cache, manifests, pipeline state
+
+so entities never share a file and each keeps its own stage skipping: an
+entity whose workbook did not change is skipped in seconds on the next run.
+
+The comparison (outputs/portfolio/portfolio_comparison.csv) has one row
+per entity, read from the files the entity's run wrote: revenue, expense,
+operating margin (revenue less all HC and non-HC expense), actual % and variance of every benchmark area (net and gross
+bases, from the Phase 2 benchmark evaluation) and flag counts by materiality.
+
+Entities are independent, so throughput grows with the number of worker
+processes up to the number of cores.
+
+Usage:
+    python scripts/run_portfolio.py --entities "data/portfolio/*.xlsx" [--workers N] [--force] [--quiet]
+                                    [--stream | --chunked] [--money-mode MODE] [--dimension-storage MODE]
+                                    [--reader NAME] [--cfr-source PATH] [--output-dir DIR]
+
+Author: Pipeline Infrastructure
+Date: 2026-10-18
+
+IMPORTANT: This script does NOT modify raw data files.
+"""
+
+import argparse
+import contextlib
+import glob
+import os
+import re
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import run_pipeline
+from ledger_io import STREAM_MEMORY_LIMIT_MB, DEFAULT_READER, READER_BACKENDS
+from money import MONEY_MODES, DEFAULT_MONEY_MODE
+from dimensions import STORAGE_MODES, DEFAULT_STORAGE_MODE
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+PORTFOLIO_DIR = "outputs/portfolio"
+COMPARISON_FILE = "portfolio_comparison.csv"
+
+# Files of an entity partition the comparison is read from
+AGGREGATES_FILE = "outputs/phase_2/03_supporting_aggregates.xlsx"
+FLAG_REGISTER_FILE = "outputs/phase_2/02_flag_register.csv"
+BENCHMARK_EVALUATION_FILE = "outputs/phase_2/05_benchmark_evaluation.csv"
+
+# Directories the stages write into, created in each partition up front
+PARTITION_DIRS = ["outputs/qc", "outputs/phase_2", "outputs/phase_5", "notes"]
+
+MATERIALITY_LEVELS = ["High", "Medium", "Low"]
+
+# =============================================================================
+# ENTITIES
+# =============================================================================
+
+def entity_name(path: str) -> str:
+    """Partition name of an entity: its file (or directory) name without extension, as a slug."""
+    stem = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+    return re.sub(r"[^A-Za-z0-9]+", "_", stem).strip("_").lower() or "entity"
+
+
+def discover_entities(pattern: str) -> List[Tuple[str, str]]:
+    """
+    (name, absolute path) of every entity workbook or export directory
+    matching the glob, in name order. Raises ValueError when two entities
+    would share a partition.
+    """
+    entities = {}
+    for path in sorted(glob.glob(pattern)):
+        name = entity_name(path)
+        if name in entities:
+            raise ValueError(f"Entities '{entities[name]}' and '{path}' map to the same partition '{name}'")
+        entities[name] = os.path.abspath(path)
+    return sorted(entities.items())
+
+
+@contextlib.contextmanager
+def entity_partition(root: str) -> Iterator[None]:
+    """Run the block inside an entity's partition directory (created if needed)."""
+    for subdir in PARTITION_DIRS:
+        os.makedirs(os.path.join(root, subdir), exist_ok=True)
+    previous = os.getcwd()
+    os.chdir(root)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+# =============================================================================
+# COMPARISON
+# =============================================================================
+
+def _total_row(frame: pd.DataFrame, label_column: str) -> float:
+    return float(frame.loc[frame[label_column] == "TOTAL", "amount"].iloc[0])
+
+
+def entity_comparison(root: str = ".") -> Dict[str, Any]:
+    """
+    Comparison metrics of one entity, read from the Phase 2 outputs of its
+    partition: revenue, expense and operating margin, actual % of revenue and
+    variance vs benchmark (percentage points) of every benchmark area, and
+    flag counts.
+    """
+    aggregates = pd.read_excel(os.path.join(root, AGGREGATES_FILE), sheet_name=None)
+    flags = pd.read_csv(os.path.join(root, FLAG_REGISTER_FILE))
+    evaluation = pd.read_csv(os.path.join(root, BENCHMARK_EVALUATION_FILE))
+
+    revenue = _total_row(aggregates["revenue_by_type"], "revenue_type")
+    expense = _total_row(aggregates["expense_by_category"], "expense_category")
+    row = {
+        "revenue": revenue,
+        "total_expense": expense,
+        # Revenue less all expense (HC, OPEX and COGS): an operating margin, not a gross margin
+        "operating_margin": revenue - expense,
+        "operating_margin_pct": (revenue - expense) / revenue * 100 if revenue else np.nan
+    }
+
+    for area in evaluation.itertuples(index=False):
+        key = re.sub(r"[^a-z0-9]+", "", area.area.lower())
+        suffix = "" if area.basis == "net" else f"_{area.basis}"
+        row[f"{key}{suffix}_pct"] = area.actual_pct
+        row[f"{key}{suffix}_variance_pp"] = area.variance_pp
+
+    materiality = flags["materiality"].value_counts() if "materiality" in flags else pd.Series(dtype=int)
+    row["flags"] = len(flags)
+    for level in MATERIALITY_LEVELS:
+        row[f"flags_{level.lower()}"] = int(materiality.get(level, 0))
+
+    return row
+
+# =============================================================================
+# ENTITY RUNS
+# =============================================================================
+
+def run_entity(task: Tuple[str, str, str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Pool entry point: run the pipeline for one entity in its partition and
+    return its comparison row. A failing entity is reported in the row
+    (status "failed") instead of stopping the portfolio.
+    """
+    name, pnl_source, root, options = task
+    start = time.perf_counter()
+    row = {"entity": name, "source": pnl_source, "status": "ok", "stages_run": 0, "error": ""}
+
+    try:
+        with entity_partition(root):
+            summary = run_pipeline.run_pipeline(pnl_source=pnl_source, **options)
+            row["stages_run"] = int((summary["status"] == "ran").sum())
+            row.update(entity_comparison())
+    except Exception as e:
+        row["status"] = "failed"
+        row["error"] = f"{type(e).__name__}: {e}"
+
+    row["seconds"] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def run_portfolio(entities: List[Tuple[str, str]], workers: int = 1, output_dir: str = PORTFOLIO_DIR,
+                  **options) -> pd.DataFrame:
+    """
+    Run every entity (one per worker process) and write the comparison.
+
+    `options` are passed to run_pipeline.run_pipeline() for every entity
+    (cfr_source must be absolute: each entity runs in its own directory).
+
+    Returns:
+        Comparison DataFrame, one row per entity in entity order
+    """
+    tasks = [(name, path, os.path.abspath(os.path.join(output_dir, name)), options) for name, path in entities]
+    print(f"Portfolio: {len(tasks)} entities, {workers} workers -> {output_dir}/")
+
+    if workers <= 1:
+        rows = [run_entity(task) for task in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        # One entity per task: entities are large and independent
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(run_entity, tasks))
+
+    comparison = pd.DataFrame(rows)
+    os.makedirs(output_dir, exist_ok=True)
+    comparison_path = os.path.join(output_dir, COMPARISON_FILE)
+    comparison.to_csv(comparison_path, index=False)
+    print(f"Saved: {comparison_path}")
+    return comparison
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the pipeline for every entity of a portfolio and compare them")
+    parser.add_argument("--entities", required=True,
+                        help="Glob of entity Input P&L workbooks (or directories of CSV/Parquet/JSONL exports)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes, one entity each (default: %(default)s = CPU count)")
+    parser.add_argument("--output-dir", default=PORTFOLIO_DIR,
+                        help="Directory of the entity partitions and the comparison (default: %(default)s)")
+    parser.add_argument("--cfr-source", default=run_pipeline.CENTRAL_FINANCE_FILE,
+                        help="Central Finance Roles workbook shared by every entity")
+    parser.add_argument("--force", action="store_true",
+                        help="Run every stage of every entity even if unchanged")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Hide the output of the stages; print only the comparison")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream sheets with openpyxl read-only iteration in bounded memory")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Normalize chunk by chunk with running metrics, writing normalized frames to the cache")
+    parser.add_argument("--memory-limit-mb", type=float, default=STREAM_MEMORY_LIMIT_MB,
+                        help="Memory budget per streamed chunk (default: %(default)s)")
+    parser.add_argument("--reader", default=DEFAULT_READER, choices=["auto"] + list(READER_BACKENDS),
+                        help="Excel reader backend (default: %(default)s = calamine if installed, else openpyxl)")
+    parser.add_argument("--money-mode", default=DEFAULT_MONEY_MODE, choices=MONEY_MODES,
+                        help="How reconciliation totals are taken: float64, or exact int64 cents (default: %(default)s)")
+    parser.add_argument("--dimension-storage", default=DEFAULT_STORAGE_MODE, choices=STORAGE_MODES,
+                        help="How Phase 2 holds dimension columns: as strings, or dictionary-encoded (default: %(default)s)")
+    args = parser.parse_args()
+
+    entities = discover_entities(args.entities)
+    if not entities:
+        parser.error(f"No entity workbooks match '{args.entities}'")
+
+    comparison = run_portfolio(
+        entities, workers=args.workers, output_dir=args.output_dir,
+        stream=args.stream, memory_limit_mb=args.memory_limit_mb, reader=args.reader,
+        cfr_source=os.path.abspath(args.cfr_source), money_mode=args.money_mode,
+        dimension_storage=args.dimension_storage, chunked=args.chunked, force=args.force, quiet=args.quiet
+    )
+
+    print("\n" + "=" * 70)
+    print("PORTFOLIO COMPARISON")
+    print("=" * 70)
+    print(comparison.drop(columns=["source"]).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()